@@ -1,61 +1,391 @@
 # agent/agent.py (Refactored)
-import google.generativeai as genai
-from google.generativeai.types import Tool
-from google.protobuf.json_format import MessageToDict
 
-from agent.tool_manager import ToolManager
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from agent.log import log_event
+from agent.metrics import get_metrics
+from agent.tool_manager import ToolManager, function_calls, stream_parts
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StepTiming:
+    """One model turn of the agent loop and the tool calls it requested."""
+    step: int
+    model_seconds: float
+    tool_seconds: float = 0.0
+    calls: List[str] = field(default_factory=list)
+
+
+@dataclass
+class AgentRun:
+    """Final answer plus how it was produced."""
+    answer: str
+    source: str  # "cache", "router" or "model"
+    steps: List[StepTiming] = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+class _ToolLoop:
+    """Per-step bookkeeping of one question's model/tool loop.
+
+    run, run_async and answer_stream only differ in how they call the model
+    and the tools; the step budget, deadline, follow-up conversation, error
+    fallback and caching all live here.
+    """
+
+    def __init__(self, agent: "Agent", question: str):
+        self.agent = agent
+        self.question = question
+        self.deadline_at = agent._deadline_at()
+        self.steps: List[StepTiming] = []
+        self.contents = [{"role": "user", "parts": [question]}]
+        self.all_calls, self.all_results, self.last_results = [], [], []
+        self.answer: Optional[str] = None
+
+    def remaining(self) -> Optional[float]:
+        return self.agent._remaining(self.deadline_at)
+
+    def step_numbers(self):
+        """Steps left within `max_steps`, stopping once the deadline passes."""
+        for step in range(1, self.agent.max_steps + 1):
+            remaining = self.remaining()
+            if remaining is not None and remaining <= 0:
+                return
+            yield step
+
+    def prompt(self, step: int):
+        return self.question if step == 1 else self.contents
+
+    def model_failed(self, step: int, timed_out: bool = False) -> bool:
+        """Count a failed model call; True if the error should propagate.
+
+        Later steps keep the tool results already gathered instead.
+        """
+        self.agent.metrics.inc("llm_errors_total", purpose="agent")
+        return step == 1 and not timed_out
+
+    def model_replied(self, step: int, seconds: float, calls, text: Optional[str]) -> bool:
+        """Record a model turn; True if it requested tool calls to run."""
+        timing = StepTiming(step, seconds)
+        self.steps.append(timing)
+        if not calls:
+            self.answer = text
+            return False
+        timing.calls = [name for name, _ in calls]
+        return True
+
+    def tools_ran(self, calls, results, response_content, seconds: float):
+        """Record tool results and extend the conversation for the next step."""
+        self.steps[-1].tool_seconds = seconds
+        self.all_calls += calls
+        self.all_results += results
+        self.last_results = results
+        self.agent._follow_up(self.contents, response_content, calls, results)
+
+    def finish(self) -> str:
+        """The final answer; only a final model text is cached.
+
+        Partial tool output or an error is not a final answer, so it is never cached.
+        """
+        if self.answer:
+            self.agent._store_answer(self.question, self.answer, self.all_calls, self.all_results)
+            return self.answer
+        return self.agent._give_up(self.deadline_at, self.last_results)
 
 
 class Agent:
-    def __init__(self, api_key: str):
-        """Initialize the agent with Gemini API key and tool manager."""
-        genai.configure(api_key=api_key)
-        self.tool_manager = ToolManager()
+    def __init__(self, api_key: str, response_cache=None, router=None, provider=None,
+                 max_steps: Optional[int] = None, deadline: Optional[float] = None):
+        """Initialize the agent with Gemini API key and tool manager.
+
+        `response_cache` (a ResponseCache) short-circuits repeated questions;
+        when omitted it is enabled by RESPONSE_CACHE=true in the environment.
+        `router` (an IntentRouter) answers trivially classifiable questions
+        without the model; it is on unless LOCAL_ROUTER=false.
+        `provider` (an LLMProvider from agent.llm) supplies the model, and
+        the models tools call themselves; it defaults to Gemini with `api_key`.
+
+        Tool results are fed back to the model for up to `max_steps` model
+        turns (AGENT_MAX_STEPS, default 5), all within `deadline` seconds of
+        wall-clock time (AGENT_DEADLINE, default 60; 0 disables it).
+        """
+        self.max_steps = max_steps if max_steps is not None else int(os.getenv("AGENT_MAX_STEPS", "5"))
+        if deadline is None:
+            deadline = float(os.getenv("AGENT_DEADLINE", "60"))
+        self.deadline = deadline or None
+        if response_cache is None and os.getenv("RESPONSE_CACHE", "false").lower() in ("1", "true", "yes"):
+            from agent.response_cache import ResponseCache
+            response_cache = ResponseCache(
+                os.getenv("RESPONSE_CACHE_PATH", ".cache/responses.sqlite"),
+                near_duplicates=os.getenv("RESPONSE_CACHE_NEAR_DUPLICATES", "false").lower() in ("1", "true", "yes"),
+            )
+        self.response_cache = response_cache
+        if router is None and os.getenv("LOCAL_ROUTER", "true").lower() in ("1", "true", "yes"):
+            from agent.router import IntentRouter
+            router = IntentRouter()
+        self.router = router
+        if provider is None:
+            from agent.llm import GeminiProvider
+            provider = GeminiProvider(api_key)
+        self.provider = provider
+        self.tool_manager = ToolManager(provider=provider)
+        self.metrics = get_metrics()
         
-        # Initialize model with tools from tool manager
-        self.model = genai.GenerativeModel(
-            model_name="gemini-1.5-flash",
-            tools=[Tool(function_declarations=self.tool_manager.get_tool_schemas_for_gemini())]
-        )
-
-    def _parse_args(self, raw_args):
-        """Safely parse function call arguments."""
-        try:
-            if hasattr(raw_args, 'fields'):
-                return MessageToDict(raw_args)
-            return dict(raw_args)
-        except Exception as e:
-            print(f"DEBUG: Error parsing function_call.args: {str(e)}")
-            return {}
+        # Shared model with tools from tool manager
+        self.model = provider.model("agent", self.tool_manager)
 
-    def _handle_tool_call(self, tool_name: str, args: dict, question: str) -> str:
-        """Handle execution of a tool call."""
-        print(f"DEBUG: Tool called: {tool_name}, Args: {args}")
+    def _format_results(self, results) -> str:
+        return "\n".join(str(result.data) if result.success else result.error for result in results)
+
+    def _cached_answer(self, question: str):
+        if self.response_cache is None:
+            return None
+        return self.response_cache.get(question)
+
+    def _store_answer(self, question: str, answer: str, calls=(), results=()):
+        """Cache an answer unless any tool call failed."""
+        if self.response_cache is None or not all(result.success for result in results):
+            return
+        self.response_cache.put(question, answer, [tool_name for tool_name, _ in calls])
+
+    def _route(self, question: str):
+        """Tool call chosen by the local router, as a calls list, or None."""
+        if self.router is None:
+            return None
+        route = self.router.route(question)
+        if route is None or route.tool not in self.tool_manager.tools:
+            return None
+        return [(route.tool, route.args)]
+
+    def _handle_tool_calls(self, calls, question: str, timeout: Optional[float] = None):
+        """Execute every tool call from one model turn concurrently."""
+        for tool_name, args in calls:
+            log_event(logger, logging.DEBUG, "tool_call", tool=tool_name, args=args)
         
         # Pass user question to tool for context-aware responses
-        result = self.tool_manager.execute_tool(tool_name, args, question)
-        
-        if not result.success:
-            return result.error
+        return self.tool_manager.execute_tools(calls, question, timeout=timeout)
+
+    async def _handle_tool_calls_async(self, calls, question: str, timeout: Optional[float] = None):
+        """Async variant of _handle_tool_calls."""
+        for tool_name, args in calls:
+            log_event(logger, logging.DEBUG, "tool_call", tool=tool_name, args=args)
         
-        return str(result.data)
+        return await self.tool_manager.execute_tools_async(calls, question, timeout=timeout)
+
+    def _deadline_at(self) -> Optional[float]:
+        return time.monotonic() + self.deadline if self.deadline else None
+
+    @staticmethod
+    def _remaining(deadline_at: Optional[float]) -> Optional[float]:
+        return None if deadline_at is None else deadline_at - time.monotonic()
+
+    def _request_options(self, deadline_at: Optional[float]):
+        remaining = self._remaining(deadline_at)
+        return {} if remaining is None else {"request_options": {"timeout": max(remaining, 0.1)}}
+
+    def _follow_up(self, contents, response_content, calls, results):
+        """Conversation for the next step: the model's calls, then their results."""
+        contents.append(response_content)
+        contents.append({"role": "user", "parts": self.tool_manager.function_responses_for_gemini(calls, results)})
+        return contents
+
+    def _give_up(self, deadline_at: Optional[float], last_results) -> str:
+        """Answer when the step budget or deadline runs out before a final text."""
+        if last_results:
+            return self._format_results(last_results)
+        remaining = self._remaining(deadline_at)
+        if remaining is not None and remaining <= 0:
+            return f"Error: no answer within the {self.deadline:g}s deadline"
+        return "Sorry, I couldn't process that request."
+
+    def _finish(self, question: str, response, calls, results) -> str:
+        """Turn a model response (and any tool results) into the final answer."""
+        if calls:
+            answer = self._format_results(results)
+        else:
+            answer = getattr(response, "text", None)
+            if not answer:
+                return "Sorry, I couldn't process that request."
+        self._store_answer(question, answer, calls, results)
+        return answer
+
+    def _record(self, run: AgentRun) -> AgentRun:
+        """Feed a finished run's stage timings into the metrics registry."""
+        if self.metrics.enabled:
+            for timing in run.steps:
+                self.metrics.observe("llm_request_seconds", timing.model_seconds, purpose="agent")
+                if timing.calls:
+                    self.metrics.observe("agent_tool_dispatch_seconds", timing.tool_seconds)
+            self.metrics.observe("agent_answer_seconds", run.elapsed, source=run.source)
+        return run
+
+    def run(self, question: str) -> AgentRun:
+        """Answer a question with the full tool loop, recording per-step timings.
+
+        Each step asks the model; any function calls it makes run
+        concurrently and their results are sent back for the next step,
+        until the model answers in text, `max_steps` is used up, or the
+        deadline passes (unfinished tool calls are then cancelled).
+        """
+        start = time.perf_counter()
+        cached = self._cached_answer(question)
+        if cached is not None:
+            return self._record(AgentRun(cached, "cache", elapsed=time.perf_counter() - start))
+
+        calls = self._route(question)
+        if calls:
+            results = self._handle_tool_calls(calls, question)
+            # A failed local route falls through to the model
+            if all(result.success for result in results):
+                answer = self._finish(question, None, calls, results)
+                return self._record(AgentRun(answer, "router", elapsed=time.perf_counter() - start))
+
+        loop = _ToolLoop(self, question)
+        for step in loop.step_numbers():
+            model_start = time.perf_counter()
+            try:
+                response = self.model.generate_content(
+                    loop.prompt(step), **self._request_options(loop.deadline_at)
+                )
+            except Exception:
+                if loop.model_failed(step):
+                    raise
+                break
+            seconds = time.perf_counter() - model_start
+            self.metrics.record_usage(response, "agent")
+            calls = function_calls(response)
+            if not loop.model_replied(step, seconds, calls, getattr(response, "text", None)):
+                break
+
+            tool_start = time.perf_counter()
+            results = self._handle_tool_calls(calls, question, timeout=loop.remaining())
+            loop.tools_ran(calls, results, response.candidates[0].content, time.perf_counter() - tool_start)
+
+        answer = loop.finish()
+        return self._record(AgentRun(answer, "model", loop.steps, time.perf_counter() - start))
+
+    async def run_async(self, question: str) -> AgentRun:
+        """Async variant of run; the deadline also cancels a pending model call."""
+        import asyncio
+
+        start = time.perf_counter()
+        cached = self._cached_answer(question)
+        if cached is not None:
+            return self._record(AgentRun(cached, "cache", elapsed=time.perf_counter() - start))
+
+        calls = self._route(question)
+        if calls:
+            results = await self._handle_tool_calls_async(calls, question)
+            if all(result.success for result in results):
+                answer = self._finish(question, None, calls, results)
+                return self._record(AgentRun(answer, "router", elapsed=time.perf_counter() - start))
+
+        loop = _ToolLoop(self, question)
+        for step in loop.step_numbers():
+            model_start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(loop.prompt(step)), loop.remaining()
+                )
+            except asyncio.TimeoutError:
+                loop.model_failed(step, timed_out=True)
+                break
+            except Exception:
+                if loop.model_failed(step):
+                    raise
+                break
+            seconds = time.perf_counter() - model_start
+            self.metrics.record_usage(response, "agent")
+            calls = function_calls(response)
+            if not loop.model_replied(step, seconds, calls, getattr(response, "text", None)):
+                break
+
+            tool_start = time.perf_counter()
+            results = await self._handle_tool_calls_async(calls, question, timeout=loop.remaining())
+            loop.tools_ran(calls, results, response.candidates[0].content, time.perf_counter() - tool_start)
+
+        answer = loop.finish()
+        return self._record(AgentRun(answer, "model", loop.steps, time.perf_counter() - start))
 
     def answer(self, question: str) -> str:
         """Generate an answer for the given question, using tools if needed."""
         try:
-            response = self.model.generate_content(question)
-
-            if response.candidates and response.candidates[0].content.parts:
-                for part in response.candidates[0].content.parts:
-                    if getattr(part, "function_call", None):
-                        tool_name = part.function_call.name
-                        args = self._parse_args(part.function_call.args)
-                        return self._handle_tool_call(tool_name, args, question)
+            return self.run(question).answer
+        except Exception as e:
+            return f"Error: {str(e)}"
 
-            return getattr(response, "text", None) or "Sorry, I couldn't process that request."
+    async def answer_async(self, question: str) -> str:
+        """Async variant of answer; waits on Gemini and tools without blocking the event loop."""
+        try:
+            return (await self.run_async(question)).answer
         except Exception as e:
             return f"Error: {str(e)}"
 
+    def answer_stream(self, question: str):
+        """Like answer, but yields the text as it is generated.
+
+        Text parts are yielded as soon as Gemini streams them. Function calls
+        found mid-stream run once that step's stream ends, and their results
+        are sent back for the next streamed step. If no final text arrives,
+        the last tool results are yielded instead.
+        """
+        cached = self._cached_answer(question)
+        if cached is not None:
+            yield cached
+            return
+
+        try:
+            calls = self._route(question)
+            if calls:
+                results = self._handle_tool_calls(calls, question)
+                if all(result.success for result in results):
+                    yield self._finish(question, None, calls, results)
+                    return
+
+            loop = _ToolLoop(self, question)
+            streamed = False
+            for step in loop.step_numbers():
+                model_start = time.perf_counter()
+                try:
+                    response = self.model.generate_content(
+                        loop.prompt(step), stream=True, **self._request_options(loop.deadline_at)
+                    )
+                    calls, parts, texts = [], [], []
+                    for kind, value, part in stream_parts(response):
+                        parts.append(part)
+                        if kind == "call":
+                            calls.append(value)
+                        else:
+                            texts.append(value)
+                            streamed = True
+                            yield value
+                except Exception:
+                    if loop.model_failed(step):
+                        raise
+                    break
+                # Includes the time the caller spends consuming each chunk
+                seconds = time.perf_counter() - model_start
+                self.metrics.observe("llm_stream_seconds", seconds, purpose="agent")
+                # Only the last step's text is the answer, as in run; earlier text was preamble
+                if not loop.model_replied(step, seconds, calls, "".join(texts)):
+                    break
+
+                tool_start = time.perf_counter()
+                results = self._handle_tool_calls(calls, question, timeout=loop.remaining())
+                loop.tools_ran(calls, results, {"role": "model", "parts": parts}, time.perf_counter() - tool_start)
+
+            answer = loop.finish()
+            if not loop.answer:
+                yield ("\n" if streamed else "") + answer
+        except Exception as e:
+            yield f"Error: {str(e)}"
+
     def list_available_tools(self) -> str:
         """List all available tools."""
         tools = self.tool_manager.list_tools()
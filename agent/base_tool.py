@@ -1,8 +1,12 @@
 # agent/base_tool.py
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Union
+from typing import TYPE_CHECKING, Dict, Any, Union
+from agent.metrics import get_metrics
 from agent.schemas import ToolSchema, ToolType
 
+if TYPE_CHECKING:
+    from agent.http_client import HTTPClient
+
 class ToolResult:
     """Represents the result of a tool execution."""
     def __init__(self, success: bool, data: Any = None, error: str = None):
@@ -22,21 +26,67 @@ class BaseTool(ABC):
         self.schema = schema
         self.name = schema.name
         self.tool_type = schema.tool_type
+        self._http_client = None
+        # LLMProvider for tools that call a model themselves; None uses Gemini
+        self.provider = None
+    
+    @property
+    def http(self) -> "HTTPClient":
+        """Pooled HTTP client for outbound calls, shared across tools by default."""
+        if self._http_client is None:
+            # Imported here so tools without network access never load requests
+            from agent.http_client import get_http_client
+            return get_http_client()
+        return self._http_client
+    
+    @http.setter
+    def http(self, client: "HTTPClient"):
+        self._http_client = client
     
     def validate_and_execute(self, args: Dict[str, Any], question: str = "") -> ToolResult:
         """Validate arguments and execute the tool."""
+        metrics = get_metrics()
         # Validate arguments
-        valid, error = self.schema.validate_args(args)
+        with metrics.timer("tool_validate_seconds", tool=self.name):
+            valid, error = self.schema.validate_args(args)
+        if not valid:
+            metrics.inc("tool_calls_total", tool=self.name, outcome="invalid")
+            return ToolResult(success=False, error=error)
+        
+        try:
+            with metrics.timer("tool_execute_seconds", tool=self.name):
+                result = self.execute(args, question)
+            metrics.inc("tool_calls_total", tool=self.name, outcome="success")
+            return ToolResult(success=True, data=result)
+        except Exception as e:
+            metrics.inc("tool_calls_total", tool=self.name, outcome="error")
+            return ToolResult(success=False, error=str(e))
+    
+    async def validate_and_execute_async(self, args: Dict[str, Any], question: str = "") -> ToolResult:
+        """Async variant of validate_and_execute."""
+        metrics = get_metrics()
+        with metrics.timer("tool_validate_seconds", tool=self.name):
+            valid, error = self.schema.validate_args(args)
         if not valid:
+            metrics.inc("tool_calls_total", tool=self.name, outcome="invalid")
             return ToolResult(success=False, error=error)
         
         try:
-            result = self.execute(args, question)
+            with metrics.timer("tool_execute_seconds", tool=self.name):
+                result = await self.execute_async(args, question)
+            metrics.inc("tool_calls_total", tool=self.name, outcome="success")
             return ToolResult(success=True, data=result)
         except Exception as e:
+            metrics.inc("tool_calls_total", tool=self.name, outcome="error")
             return ToolResult(success=False, error=str(e))
     
     @abstractmethod
     def execute(self, args: Dict[str, Any], question: str = "") -> Any:
         """Execute the tool with validated arguments and question context."""
-        pass
\ No newline at end of file
+        pass
+    
+    async def execute_async(self, args: Dict[str, Any], question: str = "") -> Any:
+        """Async execution hook. Sync tools run in a worker thread by default;
+        tools with native async I/O can override this."""
+        import asyncio
+        return await asyncio.to_thread(self.execute, args, question)
\ No newline at end of file
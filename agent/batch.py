@@ -0,0 +1,131 @@
+# agent/batch.py
+"""
+Batch question answering over JSONL files.
+
+Input lines look like {"id": "q1", "question": "What is 2 + 2?"} (a missing id
+falls back to the line number). Each result is appended to the output file as
+soon as it finishes, so a crashed run can be resumed: ids already answered in
+the output are skipped, and ids recorded with an "error" are asked again.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, Optional, Set
+
+
+class RateLimiter:
+    """Async token bucket allowing `rate` acquisitions per second."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def read_questions(input_path: str) -> Iterator[Dict[str, Any]]:
+    """Yield {"id", "question"} records from a JSONL file."""
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            yield {"id": str(record.get("id", line_no)), "question": record["question"]}
+
+
+def completed_ids(out_path: str) -> Set[str]:
+    """Ids answered successfully in an output file.
+
+    Records with an "error" and a truncated last line do not count, so those
+    questions are retried on resume.
+    """
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and "id" in record and "answer" in record and "error" not in record:
+                done.add(str(record["id"]))
+    return done
+
+
+async def _answer(llm, question: str) -> str:
+    if hasattr(llm, "answer_async"):
+        return await llm.answer_async(question)
+    return await asyncio.to_thread(llm.answer, question)
+
+
+async def run_batch_async(llm, input_path: str, out_path: str, concurrency: int = 8,
+                          rate_limit: Optional[float] = None) -> Dict[str, int]:
+    """Answer every question in input_path with one shared llm, streaming results to out_path."""
+    done = completed_ids(out_path)
+    limiter = RateLimiter(rate_limit) if rate_limit else None
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"answered": 0, "skipped": 0, "errors": 0}
+
+    # Repair a partial last line left by a crash so appended records stay parseable
+    if os.path.exists(out_path) and os.path.getsize(out_path):
+        with open(out_path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    with open(out_path, "a", encoding="utf-8") as out:
+        async def handle(record: Dict[str, Any]):
+            async with semaphore:
+                if limiter:
+                    await limiter.acquire()
+                start = time.perf_counter()
+                result = {"id": record["id"], "question": record["question"]}
+                try:
+                    answer = await _answer(llm, record["question"])
+                    # Agent.answer_async reports failures as "Error: ..." text rather than raising
+                    if isinstance(answer, str) and answer.startswith("Error:"):
+                        result["error"] = answer[len("Error:"):].strip()
+                    else:
+                        result["answer"] = answer
+                except Exception as e:
+                    result["error"] = str(e)
+                result["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                stats["errors" if "error" in result else "answered"] += 1
+
+        pending = set()
+        for record in read_questions(input_path):
+            if record["id"] in done:
+                stats["skipped"] += 1
+                continue
+            done.add(record["id"])
+            pending.add(asyncio.ensure_future(handle(record)))
+            # Keep the number of scheduled tasks bounded for very large inputs
+            if len(pending) >= concurrency * 4:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        if pending:
+            await asyncio.gather(*pending)
+
+    return stats
+
+
+def run_batch(llm, input_path: str, out_path: str, concurrency: int = 8,
+              rate_limit: Optional[float] = None) -> Dict[str, int]:
+    """Blocking wrapper around run_batch_async."""
+    return asyncio.run(run_batch_async(llm, input_path, out_path, concurrency, rate_limit))
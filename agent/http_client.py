@@ -0,0 +1,98 @@
+# agent/http_client.py
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from agent.log import log_event
+from agent.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HTTPClient:
+    """Pooled, keep-alive HTTP client shared by network tools.
+
+    Wraps a single requests.Session with bounded per-host connection pools,
+    default timeouts, and retries with jittered exponential backoff on
+    429/5xx responses and connection errors.
+    """
+
+    def __init__(self, timeout: Tuple[float, float] = (3.05, 5.0), max_retries: int = 2,
+                 backoff: float = 0.3, max_backoff: float = 5.0,
+                 pool_connections: int = 10, pool_maxsize: int = 20):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                              pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        """Backoff before the next attempt, honouring Retry-After when given."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+        # Full jitter: uniform in [0, backoff * 2^attempt]
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """Send a request, retrying transient failures."""
+        kwargs.setdefault("timeout", self.timeout)
+        metrics = get_metrics()
+        host = urlsplit(url).hostname or ""
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                with metrics.timer("http_request_seconds", host=host, method=method):
+                    response = self.session.request(method, url, **kwargs)
+                metrics.inc("http_responses_total", host=host, status=response.status_code)
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.inc("http_responses_total", host=host, status=type(e).__name__)
+                if attempt == self.max_retries:
+                    raise
+            if response is not None:
+                response.close()
+            delay = self._delay(attempt, response)
+            metrics.inc("http_retries_total", host=host)
+            log_event(logger, logging.INFO, "http_retry", host=host, attempt=attempt + 1,
+                      status=response.status_code if response is not None else None, delay=round(delay, 3))
+            time.sleep(delay)
+        raise RuntimeError("unreachable")
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, params=params, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_shared_client: Optional[HTTPClient] = None
+_shared_lock = threading.Lock()
+
+
+def get_http_client() -> HTTPClient:
+    """Return the process-wide HTTP client, creating it on first use."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            timeout = float(os.getenv("HTTP_TIMEOUT", "5"))
+            _shared_client = HTTPClient(
+                timeout=(min(3.05, timeout), timeout),
+                max_retries=int(os.getenv("HTTP_MAX_RETRIES", "2")),
+            )
+        return _shared_client
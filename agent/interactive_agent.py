@@ -1,92 +1,220 @@
 # agent/interactive_agent.py
-import google.generativeai as genai
-from google.generativeai.types import Tool
-from google.protobuf.json_format import MessageToDict
-from agent.tool_manager import ToolManager
+
+import asyncio
+import logging
+import os
+import time
+
+from agent.log import log_event
+from agent.memory import ConversationMemory, ModelSummarizer, tool_record
+from agent.metrics import get_metrics
+from agent.tool_manager import ToolManager, function_calls, stream_parts
+
+logger = logging.getLogger(__name__)
 
 class InteractiveAgent:
-    def __init__(self, api_key: str):
-        """Initialize agent with conversation memory."""
-        genai.configure(api_key=api_key)
-        self.tool_manager = ToolManager()
-        self.chat_history = []  # Store conversation history
+    def __init__(self, api_key: str, memory: ConversationMemory = None,
+                 tool_manager: ToolManager = None, model=None, provider=None,
+                 max_steps: int = None, on_tool=None):
+        """Initialize agent with conversation memory.
+
+        Only `memory` (the last CHAT_MEMORY_TURNS turns plus a running summary,
+        within CHAT_TOKEN_BUDGET) is sent with each message, so per-turn cost
+        stays flat over long sessions. CHAT_LLM_SUMMARY=true summarizes with
+        the "summary" model instead of clipping old turns locally.
+
+        `tool_manager` and `model` let many sessions share one of each;
+        otherwise the model comes from `provider` (Gemini by default).
+        `max_steps` caps model calls per question (AGENT_MAX_STEPS, default 5).
+        `on_tool(tool_name)` is called before each tool runs, e.g. to show
+        progress in a terminal.
+        """
+        self.on_tool = on_tool
+        self.metrics = get_metrics()
+        self.max_steps = max_steps if max_steps is not None else int(os.getenv("AGENT_MAX_STEPS", "5"))
+        llm_summary = os.getenv("CHAT_LLM_SUMMARY", "false").lower() in ("1", "true", "yes")
+        if provider is None and (model is None or (memory is None and llm_summary)):
+            from agent.llm import GeminiProvider
+            provider = GeminiProvider(api_key)
+        self.provider = provider
+        self.tool_manager = tool_manager or ToolManager(provider=provider)
+        if memory is None:
+            memory = ConversationMemory(
+                max_turns=int(os.getenv("CHAT_MEMORY_TURNS", "6")),
+                token_budget=int(os.getenv("CHAT_TOKEN_BUDGET", "2000")),
+                summarizer=ModelSummarizer(provider.model("summary")) if llm_summary else None,
+            )
+        self.memory = memory
         
-        # Initialize model with tools
-        self.model = genai.GenerativeModel(
-            model_name="gemini-1.5-flash",
-            tools=[Tool(function_declarations=self.tool_manager.get_tool_schemas_for_gemini())]
-        )
+        # Shared model with tools
+        self.model = model or provider.model("agent", self.tool_manager)
         
         # Start chat session
         self.chat = self.model.start_chat(history=[])
 
-    def _parse_args(self, raw_args):
-        """Safely parse function call arguments."""
+    def _announce(self, calls):
+        for tool_name, args in calls:
+            log_event(logger, logging.DEBUG, "tool_call", tool=tool_name, args=args)
+            if self.on_tool is not None:
+                self.on_tool(tool_name)
+
+    def _handle_tool_calls(self, calls, question: str):
+        """Execute all tool calls from one turn concurrently and return the results."""
+        self._announce(calls)
+        return self.tool_manager.execute_tools(calls)
+
+    async def _handle_tool_calls_async(self, calls, question: str):
+        """Async variant of _handle_tool_calls."""
+        self._announce(calls)
+        return await self.tool_manager.execute_tools_async(calls)
+
+    def _send(self, message):
+        """chat.send_message, timed and counted in the metrics registry."""
+        start = time.perf_counter()
         try:
-            if hasattr(raw_args, 'fields'):
-                return MessageToDict(raw_args)
-            return dict(raw_args)
-        except Exception as e:
-            print(f"DEBUG: Error parsing function_call.args: {str(e)}")
-            return {}
+            response = self.chat.send_message(message)
+        except Exception:
+            self.metrics.inc("llm_errors_total", purpose="chat")
+            raise
+        self.metrics.observe("llm_request_seconds", time.perf_counter() - start, purpose="chat")
+        self.metrics.record_usage(response, "chat")
+        return response
 
-    def _handle_tool_call(self, tool_name: str, args: dict, question: str) -> str:
-        """Handle execution of a tool call."""
-        print(f"🔧 Using tool: {tool_name}")
-        
-        result = self.tool_manager.execute_tool(tool_name, args)
-        
-        if not result.success:
-            return result.error
-        
-        # Special handling for weather tool
-        if tool_name == "weather" and result.success:
-            try:
-                weather_data = result.data
-                return f"The temperature in {weather_data['city'].title()} is {weather_data['temp']}°C with {weather_data['description']}."
-            except Exception:
-                return str(result.data)
-        
-        # Special handling for unit converter
-        if tool_name == "unit_converter":
-            celsius = args.get("celsius")
-            return f"{celsius}°C = {result.data}°F"
+    async def _send_async(self, message):
+        start = time.perf_counter()
+        try:
+            response = await self.chat.send_message_async(message)
+        except Exception:
+            self.metrics.inc("llm_errors_total", purpose="chat")
+            raise
+        self.metrics.observe("llm_request_seconds", time.perf_counter() - start, purpose="chat")
+        self.metrics.record_usage(response, "chat")
+        return response
+
+    @staticmethod
+    def _response_text(response):
+        try:
+            return response.text
+        except (AttributeError, ValueError):
+            # Gemini raises ValueError when a response has no text parts
+            return None
+
+    def _finish_turn(self, question: str, response, calls=(), results=(), last_results=()) -> str:
+        """Pick the answer text and remember the turn.
+
+        When the model gives no text (e.g. the step budget ran out), the
+        results of the last tool step stand in for it.
+        """
+        answer = self._response_text(response)
+        if not answer:
+            if not last_results:
+                return "Sorry, I couldn't process that request."
+            answer = "\n".join(str(result) for result in last_results)
         
-        return str(result.data)
+        records = [tool_record(name, args, result) for (name, args), result in zip(calls, results)]
+        self.memory.add_turn(question, answer, records)
+        return answer
 
     def ask(self, question: str) -> str:
-        """Ask a question and get response with memory."""
+        """Ask a question and get response with memory.
+
+        Tool results are sent back to the model until it answers in text,
+        for at most `max_steps` model calls.
+        """
         try:
-            # Send message to chat (maintains history automatically)
-            response = self.chat.send_message(question)
+            # Start from the bounded memory instead of the ever-growing chat history
+            self.chat.history = self.memory.history()
+            response = self._send(question)
             
-            # Check if tools were called
-            if response.candidates and response.candidates[0].content.parts:
-                for part in response.candidates[0].content.parts:
-                    if getattr(part, "function_call", None):
-                        tool_name = part.function_call.name
-                        args = self._parse_args(part.function_call.args)
-                        tool_result = self._handle_tool_call(tool_name, args, question)
-                        
-                        # Send tool result back to continue conversation
-                        response = self.chat.send_message(f"Tool result: {tool_result}")
-                        return getattr(response, "text", tool_result)
+            all_calls, all_results, results = [], [], []
+            for _ in range(self.max_steps - 1):
+                calls = function_calls(response)
+                if not calls:
+                    break
+                results = self._handle_tool_calls(calls, question)
+                all_calls += calls
+                all_results += results
+                # Send all tool results back together to continue conversation
+                response = self._send(self.tool_manager.function_responses_for_gemini(calls, results))
+            return self._finish_turn(question, response, all_calls, all_results, results)
             
-            return getattr(response, "text", "Sorry, I couldn't process that request.")
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    async def ask_async(self, question: str) -> str:
+        """Async variant of ask; waits on Gemini and tools without blocking the event loop."""
+        try:
+            self.chat.history = self.memory.history()
+            response = await self._send_async(question)
+            
+            all_calls, all_results, results = [], [], []
+            for _ in range(self.max_steps - 1):
+                calls = function_calls(response)
+                if not calls:
+                    break
+                results = await self._handle_tool_calls_async(calls, question)
+                all_calls += calls
+                all_results += results
+                response = await self._send_async(self.tool_manager.function_responses_for_gemini(calls, results))
+            if isinstance(self.memory.summarizer, ModelSummarizer):
+                # Rolling turns into the summary may call the model; keep that off the event loop
+                return await asyncio.to_thread(self._finish_turn, question, response, all_calls, all_results, results)
+            return self._finish_turn(question, response, all_calls, all_results, results)
             
         except Exception as e:
             return f"Error: {str(e)}"
     
+    def ask_stream(self, question: str):
+        """Like ask, but yields the reply text as it is generated.
+
+        Function calls found mid-stream are run when that stream ends, their
+        results are sent back, and the model's follow-up is streamed too.
+        """
+        try:
+            self.chat.history = self.memory.history()
+            message = question
+            texts, all_calls, all_results, results = [], [], [], []
+            for step in range(self.max_steps):
+                calls = []
+                for kind, value, _ in stream_parts(self.chat.send_message(message, stream=True)):
+                    if kind == "call":
+                        calls.append(value)
+                    else:
+                        texts.append(value)
+                        yield value
+                if not calls or step == self.max_steps - 1:
+                    break
+                results = self._handle_tool_calls(calls, question)
+                all_calls += calls
+                all_results += results
+                message = self.tool_manager.function_responses_for_gemini(calls, results)
+
+            if not texts:
+                if not results:
+                    yield "Sorry, I couldn't process that request."
+                    return
+                fallback = "\n".join(str(result) for result in results)
+                texts.append(fallback)
+                yield fallback
+
+            records = [tool_record(name, args, result) for (name, args), result in zip(all_calls, all_results)]
+            self.memory.add_turn(question, "".join(texts), records)
+        except Exception as e:
+            yield f"Error: {str(e)}"
+    
     def show_history(self):
         """Show conversation history."""
-        if not self.chat.history:
+        if not self.memory.turns and not self.memory.summary:
             print("No conversation history yet.")
             return
         
         print("\n📜 Conversation History:")
         print("-" * 40)
-        for i, message in enumerate(self.chat.history):
-            role = "🤖 Assistant" if message.role == "model" else "👤 You"
-            content = message.parts[0].text if message.parts else "[No text content]"
-            print(f"{role}: {content}")
+        if self.memory.summary:
+            print(f"📝 Earlier: {self.memory.summary}")
+        for turn in self.memory.turns:
+            print(f"👤 You: {turn.question}")
+            for record in turn.tools:
+                print(f"🔧 {record}")
+            print(f"🤖 Assistant: {turn.answer}")
         print("-" * 40 + "\n")
\ No newline at end of file
@@ -1,27 +1,420 @@
 # agent/llm.py
+"""
+LLM front end and pluggable model providers.
+
+Agents talk to models through a small Gemini-shaped protocol, so any backend
+that speaks it can be swapped in:
+
+    model.generate_content(prompt, stream=False)      -> response (or chunks)
+    await model.generate_content_async(prompt)        -> response
+    chat = model.start_chat(history=[...])
+    chat.send_message(message, stream=False)          -> response (or chunks)
+    await chat.send_message_async(message)            -> response
+    chat.history                                      (readable and writable)
+
+A response has `.text` and `.candidates[0].content.parts`, each part carrying
+either `text` or a `function_call` with `name` and `args`. Function results
+are sent back as a list of parts with `function_response`.
+
+Providers hand out such models: GeminiProvider (the real API), FakeProvider
+(deterministic, offline, optionally slow) and ReplayProvider (records a real
+provider's responses to disk and replays them without network).
+"""
+import asyncio
+import hashlib
+import json
 import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
 from dotenv import load_dotenv
 from agent.agent import Agent
 
 load_dotenv()
 
+
+def make_response(text: Optional[str] = None, calls: Sequence[Tuple[str, Dict[str, Any]]] = ()):
+    """Gemini-shaped response with optional function_call parts."""
+    parts = [SimpleNamespace(function_call=SimpleNamespace(name=name, args=dict(args)), text="") for name, args in calls]
+    if text:
+        parts.append(SimpleNamespace(function_call=None, text=text))
+    content = SimpleNamespace(parts=parts, role="model")
+    return SimpleNamespace(candidates=[SimpleNamespace(content=content)], text=text or None)
+
+
+def _chunks(text: Optional[str], calls=()) -> List[Any]:
+    """Split a reply into word-sized streamed chunks; calls arrive in the last one."""
+    words = re.findall(r"\S+\s*", text or "")
+    chunks = [make_response(word) for word in words[:-1]]
+    chunks.append(make_response(words[-1] if words else None, calls))
+    return chunks
+
+
+def _proto_dict(message) -> Dict[str, Any]:
+    to_dict = getattr(type(message), "to_dict", None)
+    return to_dict(message) if to_dict else dict(message)
+
+
+def _canonical(obj):
+    """JSON-safe form of a prompt, message or history, for recording keys."""
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, dict):
+        return {str(key): _canonical(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(item) for item in obj]
+    if hasattr(type(obj), "to_dict"):
+        return _canonical(_proto_dict(obj))
+    if isinstance(obj, SimpleNamespace):
+        return _canonical(vars(obj))
+    return repr(obj)
+
+
+def _plain_contents(obj):
+    """Replayed (SimpleNamespace) contents and parts as dicts a real model accepts.
+
+    Agents echo the model's last response back in the next request, so when
+    recording, those echoes are our make_response objects rather than protos.
+    """
+    if isinstance(obj, SimpleNamespace):
+        if hasattr(obj, "parts"):
+            return {"role": getattr(obj, "role", "model"), "parts": _plain_contents(obj.parts)}
+        call = getattr(obj, "function_call", None)
+        if call:
+            return {"function_call": {"name": call.name, "args": _canonical(call.args)}}
+        return {"text": getattr(obj, "text", None) or ""}
+    if isinstance(obj, dict):
+        return {key: _plain_contents(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_plain_contents(item) for item in obj]
+    return obj
+
+
+def normalize_response(response) -> Dict[str, Any]:
+    """Provider-neutral {"text", "calls"} form of a (possibly streamed) response."""
+    if getattr(response, "_iterator", None) is not None:
+        # A real Gemini stream: .candidates raises until every chunk has arrived
+        response.resolve()
+        chunks = [response]
+    else:
+        chunks = response if not hasattr(response, "candidates") else [response]
+    texts, calls = [], []
+    for chunk in chunks:
+        if not chunk.candidates or not chunk.candidates[0].content.parts:
+            continue
+        for part in chunk.candidates[0].content.parts:
+            call = getattr(part, "function_call", None)
+            if call:
+                args = _proto_dict(call).get("args", {}) if hasattr(type(call), "to_dict") else dict(call.args)
+                calls.append([call.name, _canonical(args)])
+            elif getattr(part, "text", None):
+                texts.append(part.text)
+    return {"text": "".join(texts) or None, "calls": calls}
+
+
+def function_results(message) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+    """(name, response) pairs if the message is a list of function_response parts,
+    or a conversation whose last content is one."""
+    if not isinstance(message, (list, tuple)) or not message:
+        return None
+    if isinstance(message[-1], dict) and "parts" in message[-1]:
+        message = message[-1]["parts"]
+    results = []
+    for part in message:
+        response = getattr(part, "function_response", None)
+        if not response:
+            return None
+        payload = _proto_dict(response).get("response", {}) if hasattr(type(response), "to_dict") else dict(response.response)
+        results.append((response.name, payload))
+    return results
+
+
+class LLMProvider(ABC):
+    """Source of Gemini-compatible model objects (see module docstring)."""
+
+    name = "base"
+
+    @abstractmethod
+    def model(self, purpose: str = "agent", tool_manager=None):
+        """Model for a purpose; with a ToolManager it may request those tools."""
+        pass
+
+
+class GeminiProvider(LLMProvider):
+    """The real Gemini API, through the shared model pool."""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str):
+        from agent.models import get_model_pool
+
+        self.api_key = api_key
+        self.pool = get_model_pool()
+        self.pool.configure(api_key)
+
+    def model(self, purpose: str = "agent", tool_manager=None):
+        if tool_manager is None:
+            return self.pool.get(purpose)
+        from google.generativeai.types import Tool
+
+        return self.pool.get(
+            purpose,
+            tools=[Tool(function_declarations=tool_manager.get_tool_schemas_for_gemini())],
+            tools_key=tuple(sorted(tool_manager.tools)),
+        )
+
+
+Reply = Union[str, Sequence[Tuple[str, Dict[str, Any]]], Callable[[re.Match], Any]]
+
+
+class FakeProvider(LLMProvider):
+    """Deterministic offline model.
+
+    `rules` is a sequence of (regex, reply) pairs tried in order against the
+    prompt; a reply is text, a list of (tool_name, args) calls, or a callable
+    taking the match and returning either. Unmatched prompts are echoed.
+    Function results sent back in a chat are answered with their values.
+    Every call waits `latency` seconds first.
+    """
+
+    name = "fake"
+
+    def __init__(self, rules: Iterable[Tuple[str, Reply]] = (), latency: float = 0.0):
+        self.rules = [(re.compile(pattern, re.IGNORECASE), reply) for pattern, reply in rules]
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def model(self, purpose: str = "agent", tool_manager=None):
+        return _FakeModel(self)
+
+    def respond(self, message) -> Dict[str, Any]:
+        """The {"text", "calls"} reply to a prompt or function results."""
+        with self._lock:
+            self.calls += 1
+        results = function_results(message)
+        if results is not None:
+            values = [str(payload.get("result", payload.get("error", ""))) for _, payload in results]
+            return {"text": "\n".join(values), "calls": []}
+
+        text = message if isinstance(message, str) else json.dumps(_canonical(message))
+        for pattern, reply in self.rules:
+            match = pattern.search(text)
+            if not match:
+                continue
+            if callable(reply):
+                reply = reply(match)
+            if isinstance(reply, str):
+                return {"text": reply, "calls": []}
+            return {"text": None, "calls": [[name, dict(args)] for name, args in reply]}
+        return {"text": f"echo: {text}", "calls": []}
+
+
+class _FakeModel:
+    def __init__(self, provider: FakeProvider):
+        self.provider = provider
+
+    def _reply(self, message, stream: bool):
+        reply = self.provider.respond(message)
+        if stream:
+            return _chunks(reply["text"], reply["calls"])
+        return make_response(reply["text"], reply["calls"])
+
+    def generate_content(self, prompt, stream: bool = False, **kwargs):
+        if self.provider.latency:
+            time.sleep(self.provider.latency)
+        return self._reply(prompt, stream)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        if self.provider.latency:
+            await asyncio.sleep(self.provider.latency)
+        return self._reply(prompt, False)
+
+    def start_chat(self, history=None):
+        return _FakeChat(self, history)
+
+
+class _FakeChat:
+    def __init__(self, model: _FakeModel, history=None):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, message, stream: bool = False, **kwargs):
+        return self.model.generate_content(message, stream=stream)
+
+    async def send_message_async(self, message, **kwargs):
+        return await self.model.generate_content_async(message)
+
+
+class ReplayProvider(LLMProvider):
+    """Records another provider's responses to a JSON file, or replays them.
+
+    In "record" mode every call goes to `inner` and its normalized response
+    is saved under a hash of (purpose, chat history, prompt). In "replay"
+    mode responses come from the file only, and an unrecorded prompt raises
+    LookupError.
+    """
+
+    name = "replay"
+
+    def __init__(self, path: str, inner: Optional[LLMProvider] = None, mode: str = "replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown replay mode: {mode}")
+        if mode == "record" and inner is None:
+            raise ValueError("record mode needs an inner provider")
+        self.path = path
+        self.inner = inner
+        self.mode = mode
+        self._lock = threading.Lock()
+        self.recordings: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.recordings = json.load(f)
+
+    def model(self, purpose: str = "agent", tool_manager=None):
+        inner = self.inner.model(purpose, tool_manager) if self.inner else None
+        return _ReplayModel(self, purpose, inner)
+
+    def key(self, purpose: str, history, prompt) -> str:
+        payload = json.dumps([purpose, _canonical(history or []), _canonical(prompt)], sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, key: str, prompt) -> Dict[str, Any]:
+        reply = self.recordings.get(key)
+        if reply is None:
+            raise LookupError(f"No recorded response for prompt: {str(_canonical(prompt))[:80]}")
+        return reply
+
+    def save(self, key: str, prompt, reply: Dict[str, Any]):
+        with self._lock:
+            self.recordings[key] = {**reply, "prompt": _canonical(prompt)}
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.recordings, f, indent=1, sort_keys=True, ensure_ascii=False)
+            os.replace(tmp, self.path)
+
+
+class _ReplayModel:
+    def __init__(self, provider: ReplayProvider, purpose: str, inner, chat=None):
+        self.provider = provider
+        self.purpose = purpose
+        self.inner = inner
+        self.chat = chat
+
+    def _history(self):
+        return self.chat.history if self.chat is not None else []
+
+    def _call(self, prompt, stream: bool, send):
+        key = self.provider.key(self.purpose, self._history(), prompt)
+        if self.provider.mode == "replay":
+            reply = self.provider.lookup(key, prompt)
+        else:
+            reply = normalize_response(send(_plain_contents(prompt), stream))
+            self.provider.save(key, prompt, reply)
+        if stream:
+            return _chunks(reply["text"], reply["calls"])
+        return make_response(reply["text"], reply["calls"])
+
+    async def _call_async(self, prompt, send_async):
+        key = self.provider.key(self.purpose, self._history(), prompt)
+        if self.provider.mode == "replay":
+            reply = self.provider.lookup(key, prompt)
+        else:
+            reply = normalize_response(await send_async(_plain_contents(prompt)))
+            self.provider.save(key, prompt, reply)
+        return make_response(reply["text"], reply["calls"])
+
+    def generate_content(self, prompt, stream: bool = False, **kwargs):
+        return self._call(prompt, stream, lambda p, s: self.inner.generate_content(p, stream=s))
+
+    async def generate_content_async(self, prompt, **kwargs):
+        return await self._call_async(prompt, lambda p: self.inner.generate_content_async(p))
+
+    def start_chat(self, history=None):
+        return _ReplayChat(self, history)
+
+
+class _ReplayChat:
+    def __init__(self, model: _ReplayModel, history=None):
+        self._inner = model.inner.start_chat(history=history or []) if model.inner else None
+        self._history = list(history or [])
+        self.model = _ReplayModel(model.provider, model.purpose, model.inner, chat=self)
+
+    @property
+    def history(self):
+        return self._history
+
+    @history.setter
+    def history(self, history):
+        self._history = list(history)
+        if self._inner is not None:
+            self._inner.history = history
+
+    def _record_turn(self, message, response):
+        # Keep our own history in step so later keys depend on the conversation so far
+        self._history.append(_canonical(message))
+        self._history.append(normalize_response(response))
+
+    def send_message(self, message, stream: bool = False, **kwargs):
+        response = self.model._call(message, stream, lambda m, s: self._inner.send_message(m, stream=s))
+        self._record_turn(message, response)
+        return response
+
+    async def send_message_async(self, message, **kwargs):
+        response = await self.model._call_async(message, lambda m: self._inner.send_message_async(m))
+        self._record_turn(message, response)
+        return response
+
+
+def get_provider(name: str, api_key: Optional[str] = None, recordings: Optional[str] = None) -> LLMProvider:
+    """Provider by name: gemini, fake, replay, or record (gemini, saved to disk)."""
+    name = name.lower()
+    recordings = recordings or os.getenv("LLM_RECORDINGS", "tests/recordings/llm.json")
+    if name == "gemini":
+        if not api_key:
+            raise ValueError("Error: GEMINI_API_KEY not set in .env file")
+        return GeminiProvider(api_key)
+    if name == "fake":
+        return FakeProvider()
+    if name == "replay":
+        return ReplayProvider(recordings)
+    if name == "record":
+        return ReplayProvider(recordings, inner=get_provider("gemini", api_key), mode="record")
+    raise ValueError(f"Unsupported LLM provider: {name}")
+
+
 class LLM:
-    def __init__(self, provider: str = "gemini"):
-        """Initialize LLM handler. Currently supports only Gemini."""
-        self.provider = provider.lower()
-        self.api_key = None
-        self.agent = None
-
-        if self.provider == "gemini":
-            self.api_key = os.getenv("GEMINI_API_KEY")
-            if not self.api_key:
-                raise ValueError("Error: GEMINI_API_KEY not set in .env file")
-            self.agent = Agent(api_key=self.api_key)
+    def __init__(self, provider: Union[str, LLMProvider] = "gemini"):
+        """Initialize LLM handler with a provider name or LLMProvider instance."""
+        self.api_key = os.getenv("GEMINI_API_KEY")
+        if isinstance(provider, LLMProvider):
+            self.backend = provider
         else:
-            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+            self.backend = get_provider(provider, self.api_key)
+        self.provider = self.backend.name
+        self.agent = Agent(api_key=self.api_key, provider=self.backend)
 
     def answer(self, question: str) -> str:
         """Route the question to the respective provider/agent."""
         if not self.agent:
             return "Error: No LLM agent initialized"
         return self.agent.answer(question)
+
+    async def answer_async(self, question: str) -> str:
+        """Async variant of answer."""
+        if not self.agent:
+            return "Error: No LLM agent initialized"
+        return await self.agent.answer_async(question)
+
+    def answer_stream(self, question: str):
+        """Yield the answer in chunks as they are generated."""
+        if not self.agent:
+            yield "Error: No LLM agent initialized"
+            return
+        yield from self.agent.answer_stream(question)
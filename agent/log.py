@@ -0,0 +1,63 @@
+# agent/log.py
+"""
+Leveled, structured logging for the agent package.
+
+Modules log events with key/value fields:
+
+    log_event(logger, logging.DEBUG, "tool_call", tool="calc", args={...})
+
+which renders as `tool_call tool=calc args={...}` by default or as one JSON
+object per line with LOG_FORMAT=json. LOG_LEVEL (default WARNING) controls
+what is shown; fields are only formatted when the level is enabled.
+"""
+import json
+import logging
+import os
+import sys
+from typing import Optional
+
+_configured = False
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields):
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+class KeyValueFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", {})
+        parts = [f"{record.levelname.lower():<7} {record.name}: {record.getMessage()}"]
+        parts += [f"{key}={value}" for key, value in fields.items()]
+        text = " ".join(parts)
+        if record.exc_info:
+            text += "\n" + self.formatException(record.exc_info)
+        return text
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None):
+    """Attach a stderr handler to the `agent` logger (once per process)."""
+    global _configured
+    logger = logging.getLogger("agent")
+    logger.setLevel((level or os.getenv("LOG_LEVEL", "WARNING")).upper())
+    if _configured:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JSONFormatter() if (fmt or os.getenv("LOG_FORMAT", "text")) == "json" else KeyValueFormatter())
+    logger.addHandler(handler)
+    logger.propagate = False
+    _configured = True
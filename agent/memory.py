@@ -0,0 +1,154 @@
+# agent/memory.py
+"""
+Bounded conversation memory for InteractiveAgent.
+
+The last `max_turns` turns are kept verbatim; older turns are rolled into a
+running summary so the history sent with every message stays within a token
+budget instead of growing with the session. Tool calls are kept as one-line
+records ("calc(expr=15 + 25) -> 40") rather than full function-call and
+function-response messages.
+"""
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Rough size of a token in characters; good enough for budgeting English text
+CHARS_PER_TOKEN = 4
+MAX_RESULT_CHARS = 200
+MAX_SUMMARY_LINE_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def tool_record(tool_name: str, args: Dict[str, Any], result) -> str:
+    """One-line record of a tool call and its ToolResult."""
+    arg_text = ", ".join(f"{key}={value}" for key, value in args.items())
+    outcome = str(result.data) if result.success else f"error: {result.error}"
+    return f"{tool_name}({arg_text}) -> {_clip(outcome, MAX_RESULT_CHARS)}"
+
+
+@dataclass
+class Turn:
+    question: str
+    answer: str
+    tools: List[str] = field(default_factory=list)
+
+    def tokens(self) -> int:
+        return estimate_tokens(self.question) + estimate_tokens(self.answer) + sum(
+            estimate_tokens(record) for record in self.tools
+        )
+
+
+def local_summarizer(summary: str, turns: Sequence[Turn]) -> str:
+    """Append one clipped line per rolled-off turn to the running summary."""
+    lines = [summary] if summary else []
+    for turn in turns:
+        line = f"User asked: {turn.question} | Answer: {turn.answer}"
+        if turn.tools:
+            line += f" | Tools: {'; '.join(turn.tools)}"
+        lines.append(_clip(line, MAX_SUMMARY_LINE_CHARS))
+    return "\n".join(lines)
+
+
+class ModelSummarizer:
+    """Summarizer that asks a model to fold old turns into the summary."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def __call__(self, summary: str, turns: Sequence[Turn]) -> str:
+        transcript = "\n".join(
+            f"User: {turn.question}\nAssistant: {turn.answer}"
+            + (f"\nTools: {'; '.join(turn.tools)}" if turn.tools else "")
+            for turn in turns
+        )
+        prompt = (
+            "Update the running summary of a conversation with the new exchanges below. "
+            "Keep facts, names, numbers and user preferences; drop pleasantries. "
+            "Reply with the updated summary only.\n\n"
+            f"Current summary:\n{summary or '(empty)'}\n\nNew exchanges:\n{transcript}"
+        )
+        try:
+            text = getattr(self.model.generate_content(prompt), "text", None)
+        except Exception:
+            text = None
+        # Never lose the rolled-off turns because the summary call failed
+        return text.strip() if text else local_summarizer(summary, turns)
+
+
+class ConversationMemory:
+    """Recent turns verbatim plus a running summary, within a token budget."""
+
+    def __init__(self, max_turns: int = 6, token_budget: int = 2000,
+                 summary_budget: Optional[int] = None,
+                 summarizer: Optional[Callable[[str, Sequence[Turn]], str]] = None):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget if summary_budget is not None else token_budget // 4
+        self.summarizer = summarizer or local_summarizer
+        self.turns: List[Turn] = []
+        self.summary = ""
+        self.total_turns = 0
+
+    def tokens(self) -> int:
+        return estimate_tokens(self.summary) + sum(turn.tokens() for turn in self.turns)
+
+    def add_turn(self, question: str, answer: str, tools: Sequence[str] = ()):
+        """Record a finished turn, rolling old turns into the summary if needed."""
+        self.turns.append(Turn(question, answer, list(tools)))
+        self.total_turns += 1
+
+        # The summary gets its own share of the budget; recent turns get the rest
+        turn_budget = self.token_budget - self.summary_budget
+        rolled = []
+        while len(self.turns) > self.max_turns or (
+            len(self.turns) > 1 and sum(turn.tokens() for turn in self.turns) > turn_budget
+        ):
+            rolled.append(self.turns.pop(0))
+        if rolled:
+            self.summary = self._trim_summary(self.summarizer(self.summary, rolled))
+
+    def _trim_summary(self, summary: str) -> str:
+        """Drop the oldest summary lines until the summary fits its budget."""
+        lines = summary.splitlines()
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_budget:
+            lines.pop(0)
+        summary = "\n".join(lines)
+        return summary[:self.summary_budget * CHARS_PER_TOKEN]
+
+    def history(self) -> List[Dict[str, Any]]:
+        """Gemini chat history: summary first, then the verbatim recent turns."""
+        contents = []
+        if self.summary:
+            contents.append({"role": "user", "parts": [f"Summary of our earlier conversation:\n{self.summary}"]})
+            contents.append({"role": "model", "parts": ["Noted."]})
+        for turn in self.turns:
+            contents.append({"role": "user", "parts": [turn.question]})
+            parts = [f"[tools used: {'; '.join(turn.tools)}]"] if turn.tools else []
+            contents.append({"role": "model", "parts": parts + [turn.answer or "(no answer)"]})
+        return contents
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable snapshot, for persisting a session."""
+        return {
+            "summary": self.summary,
+            "total_turns": self.total_turns,
+            "turns": [asdict(turn) for turn in self.turns],
+        }
+
+    def load(self, data: Dict[str, Any]):
+        """Restore a snapshot made by to_dict, keeping this memory's limits."""
+        self.summary = data.get("summary", "")
+        self.total_turns = data.get("total_turns", 0)
+        self.turns = [Turn(**turn) for turn in data.get("turns", [])]
+
+    def clear(self):
+        self.turns.clear()
+        self.summary = ""
+        self.total_turns = 0
@@ -0,0 +1,247 @@
+# agent/metrics.py
+"""
+In-process latency histograms and counters.
+
+Stages are timed into HDR-style histograms: log-linear buckets with 16
+sub-buckets per power of two, so any recorded value is kept within ~6% with
+constant memory and O(1) recording. Counters track outcomes and LLM token
+usage. Everything can be dumped as JSON (with percentiles) or in the
+Prometheus text format.
+
+Recording is off unless METRICS=true (or `get_metrics().enabled = True`);
+when off, `timer()` hands back a shared no-op context manager and the other
+calls return immediately.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Values are recorded in microseconds
+UNIT = 1e-6
+PERCENTILES = (50, 90, 99, 99.9)
+# `le` bounds (seconds) used for the Prometheus export
+PROMETHEUS_BOUNDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                     1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _bucket_index(value: int) -> int:
+    if value < 2 * SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return shift * SUB_BUCKETS + (value >> shift)
+
+
+def _bucket_bounds(index: int) -> Tuple[int, int]:
+    """[lower, upper) of a bucket, in recorded units."""
+    if index < 2 * SUB_BUCKETS:
+        return index, index + 1
+    shift = index // SUB_BUCKETS - 1
+    mantissa = index - shift * SUB_BUCKETS
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class Histogram:
+    """Log-linear histogram of durations in seconds."""
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        value = max(int(seconds / UNIT), 0)
+        index = _bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p: float) -> float:
+        """Approximate p-th percentile in seconds (0 when empty)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(p / 100 * self.count)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                lower, upper = _bucket_bounds(index)
+                midpoint = (lower + upper) / 2 * UNIT
+                return min(max(midpoint, self.min), self.max)
+        return self.max
+
+    def cumulative(self, bounds: Iterable[float]):
+        """(bound, count of values <= bound) pairs, bucket-accurate."""
+        items = sorted(self.counts.items())
+        result, seen, i = [], 0, 0
+        for bound in bounds:
+            while i < len(items) and _bucket_bounds(items[i][0])[1] * UNIT <= bound:
+                seen += items[i][1]
+                i += 1
+            result.append((bound, seen))
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "min": round(self.min, 6) if self.count else 0.0,
+            "max": round(self.max, 6),
+            **{f"p{p:g}": round(self.percentile(p), 6) for p in PERCENTILES},
+        }
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics: "Metrics", name: str, labels: Dict[str, Any]):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Registry of labelled histograms and counters."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+        self.counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, LabelKey]:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Record a duration into the `name` histogram."""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.record(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add `value` to the `name` counter."""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def timer(self, name: str, **labels):
+        """Context manager timing its block into the `name` histogram."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def record_usage(self, response, purpose: str = "agent"):
+        """Count tokens in/out from a Gemini response's usage_metadata."""
+        if not self.enabled:
+            return
+        usage = getattr(response, "usage_metadata", None)
+        if not usage:
+            return
+        self.inc("llm_tokens_total", getattr(usage, "prompt_token_count", 0) or 0, purpose=purpose, direction="input")
+        self.inc("llm_tokens_total", getattr(usage, "candidates_token_count", 0) or 0, purpose=purpose, direction="output")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable view: histogram summaries and counter values."""
+        with self._lock:
+            histograms = [
+                {"name": name, "labels": dict(labels), **histogram.summary()}
+                for (name, labels), histogram in sorted(self.histograms.items())
+            ]
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+        return {"histograms": histograms, "counters": counters}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        def fmt(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+            pairs = list(labels) + ([extra] if extra else [])
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+
+        seen = set()
+        for (name, labels), histogram in histograms:
+            if name not in seen:
+                lines.append(f"# TYPE {name} histogram")
+                seen.add(name)
+            for bound, count in histogram.cumulative(PROMETHEUS_BOUNDS):
+                lines.append(f"{name}_bucket{fmt(labels, ('le', f'{bound:g}'))} {count}")
+            lines.append(f"{name}_bucket{fmt(labels, ('le', '+Inf'))} {histogram.count}")
+            lines.append(f"{name}_sum{fmt(labels)} {histogram.total:.6f}")
+            lines.append(f"{name}_count{fmt(labels)} {histogram.count}")
+        for (name, labels), value in counters:
+            if name not in seen:
+                lines.append(f"# TYPE {name} counter")
+                seen.add(name)
+            lines.append(f"{name}{fmt(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+
+_shared_metrics: Optional[Metrics] = None
+_shared_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Return the process-wide registry, creating it on first use."""
+    global _shared_metrics
+    if _shared_metrics is not None:
+        return _shared_metrics
+    with _shared_lock:
+        if _shared_metrics is None:
+            _shared_metrics = Metrics(enabled=os.getenv("METRICS", "false").lower() in ("1", "true", "yes"))
+        return _shared_metrics
@@ -0,0 +1,103 @@
+# agent/models.py
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+DEFAULT_MODEL = "gemini-1.5-flash"
+
+
+@dataclass(frozen=True)
+class ModelConfig:
+    """Generation settings for one purpose (agent, KB disambiguation, ...)."""
+    model_name: str = DEFAULT_MODEL
+    temperature: Optional[float] = None
+    max_output_tokens: Optional[int] = None
+
+    def generation_config(self) -> Optional[Dict[str, Any]]:
+        config = {}
+        if self.temperature is not None:
+            config["temperature"] = self.temperature
+        if self.max_output_tokens is not None:
+            config["max_output_tokens"] = self.max_output_tokens
+        return config or None
+
+
+# Per-purpose defaults; the model name can be overridden with GEMINI_<PURPOSE>_MODEL
+MODEL_CONFIGS: Dict[str, ModelConfig] = {
+    "agent": ModelConfig(),
+    # KB disambiguation only has to answer with an index number
+    "kb": ModelConfig(temperature=0.0, max_output_tokens=8),
+    "weather": ModelConfig(temperature=0.7, max_output_tokens=256),
+    # Rolling older chat turns into a running summary
+    "summary": ModelConfig(temperature=0.0, max_output_tokens=256),
+}
+
+
+class ModelPool:
+    """Process-wide cache of configured Gemini models.
+
+    Each (purpose, settings, tool set) combination is constructed once and
+    shared, so agents, the KB agent and tools stop building their own
+    GenerativeModel objects. The settings include the model name, so a
+    GEMINI_*_MODEL override set after first use gets its own model.
+    """
+
+    def __init__(self, configs: Optional[Dict[str, ModelConfig]] = None):
+        self.configs = dict(configs or MODEL_CONFIGS)
+        self._models: Dict[Tuple[str, ModelConfig, Tuple[str, ...]], Any] = {}
+        self._api_key: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def configure(self, api_key: str):
+        """Configure the Gemini client once per API key."""
+        with self._lock:
+            if api_key and api_key != self._api_key:
+                import google.generativeai as genai
+                genai.configure(api_key=api_key)
+                self._api_key = api_key
+                self._models.clear()
+
+    def config_for(self, purpose: str) -> ModelConfig:
+        config = self.configs.get(purpose, self.configs["agent"])
+        model_name = os.getenv(f"GEMINI_{purpose.upper()}_MODEL") or os.getenv("GEMINI_MODEL")
+        if model_name and model_name != config.model_name:
+            config = ModelConfig(model_name, config.temperature, config.max_output_tokens)
+        return config
+
+    def get(self, purpose: str = "agent", tools: Optional[Sequence[Any]] = None,
+            tools_key: Tuple[str, ...] = ()):
+        """Shared model for a purpose; `tools_key` identifies the tool set passed in `tools`."""
+        config = self.config_for(purpose)
+        key = (purpose, config, tools_key)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                import google.generativeai as genai
+                model = genai.GenerativeModel(
+                    model_name=config.model_name,
+                    generation_config=config.generation_config(),
+                    tools=list(tools) if tools else None,
+                )
+                self._models[key] = model
+            return model
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+
+_shared_pool: Optional[ModelPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_model_pool() -> ModelPool:
+    """Return the process-wide model pool, creating it on first use."""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = ModelPool()
+        return _shared_pool
@@ -0,0 +1,194 @@
+# agent/response_cache.py
+"""
+Persistent cache of final answers, consulted before any model call.
+
+Entries are keyed on the normalized question plus a hash of the tool schemas,
+so changing a tool definition invalidates old answers. How long an answer
+stays valid depends on the tools that produced it: pure computations never
+expire, weather expires after minutes, KB answers expire when the KB file
+changes, and answers the model gave without any tool expire after minutes.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Sequence
+
+from agent.schemas import TOOL_SCHEMAS
+from agent.tools.kb.index import DEFAULT_KB_PATH
+
+# Seconds an answer stays valid per tool; None means no time limit
+TTL_RULES: Dict[str, Optional[float]] = {
+    "calc": None,
+    "unit_converter": None,
+    "text_analyzer": None,
+    "weather": 600.0,
+    "kb": None,
+}
+# Answers that used a tool with no rule above
+DEFAULT_TTL = 24 * 3600.0
+# Answers that used no tool at all: the model's own wording and knowledge
+MODEL_ONLY_TTL = 300.0
+
+# Files whose modification invalidates answers produced by a tool
+FILE_DEPENDENCIES: Dict[str, Sequence[str]] = {
+    "kb": (DEFAULT_KB_PATH,),
+}
+
+_FILLER_WORDS = {
+    "a", "an", "the", "is", "are", "was", "what", "whats", "who", "whos", "s",
+    "please", "tell", "me", "about", "can", "you", "could",
+}
+_TOKEN = re.compile(r"\w+(?:\.\w+)?|[^\w\s]")
+_UNIT_WORD = re.compile(r"[^\W\d_]+(?:/[^\W\d_]+)?")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation.
+
+    Units whose meaning depends on case keep it, so "convert 8 Mb to MB" and
+    "convert 8 MB to Mb" are cached separately.
+    """
+    # Imported lazily, like the router: the registry is only built once a question is cached
+    from agent.tools.unit_converter.units import get_unit_registry
+
+    registry = get_unit_registry()
+    text = " ".join(question.split()).rstrip("?!. ")
+    return _UNIT_WORD.sub(
+        lambda m: m.group() if registry.is_ambiguous(m.group().lower()) else m.group().lower(), text
+    )
+
+
+def question_signature(question: str) -> str:
+    """Order-preserving content tokens, used for near-duplicate lookups.
+
+    Operators and numbers are kept, so "2 - 3" and "2 + 3" never collide.
+    """
+    tokens = _TOKEN.findall(normalize_question(question).replace("'", ""))
+    return " ".join(t for t in tokens if t not in _FILLER_WORDS)
+
+
+def schema_version(schemas=None) -> str:
+    """Short hash of the tool schemas the answers were produced with."""
+    schemas = schemas if schemas is not None else TOOL_SCHEMAS
+    payload = [
+        (s.name, s.description, [(p.name, p.param_type, p.description, p.required) for p in s.parameters])
+        for s in sorted(schemas.values(), key=lambda s: s.name)
+    ]
+    return hashlib.sha1(json.dumps(payload).encode()).hexdigest()[:12]
+
+
+def _file_mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class ResponseCache:
+    """SQLite-backed answer cache with per-tool expiry rules."""
+
+    def __init__(self, path: str = ".cache/responses.sqlite", near_duplicates: bool = False,
+                 ttl_rules: Optional[Dict[str, Optional[float]]] = None,
+                 file_dependencies: Optional[Dict[str, Sequence[str]]] = None,
+                 version: Optional[str] = None):
+        self.path = path
+        self.near_duplicates = near_duplicates
+        self.ttl_rules = dict(TTL_RULES if ttl_rules is None else ttl_rules)
+        self.file_dependencies = dict(FILE_DEPENDENCIES if file_dependencies is None else file_dependencies)
+        self.version = version or schema_version()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, signature TEXT, question TEXT, answer TEXT,"
+            " tools TEXT, created REAL, expires REAL, deps TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_signature ON responses (signature)")
+        self._db.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.version}\x00{text}".encode()).hexdigest()
+
+    def _ttl(self, tools: Iterable[str]) -> Optional[float]:
+        tools = list(tools)
+        if not tools:
+            return MODEL_ONLY_TTL
+        limits = [self.ttl_rules.get(tool, DEFAULT_TTL) for tool in tools]
+        limits = [limit for limit in limits if limit is not None]
+        return min(limits) if limits else None
+
+    def _fresh(self, expires: Optional[float], deps: str) -> bool:
+        if expires is not None and expires <= time.time():
+            return False
+        return all(_file_mtime(path) == mtime for path, mtime in json.loads(deps).items())
+
+    def get(self, question: str) -> Optional[str]:
+        """Cached answer for the question, or None on a miss."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT answer, expires, deps FROM responses WHERE key = ?",
+                (self._key(normalize_question(question)),),
+            ).fetchone()
+            if row is None and self.near_duplicates:
+                row = self._db.execute(
+                    "SELECT answer, expires, deps FROM responses WHERE signature = ?"
+                    " ORDER BY created DESC LIMIT 1",
+                    (self._key(question_signature(question)),),
+                ).fetchone()
+
+            if row is not None and self._fresh(row[1], row[2]):
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, question: str, answer: str, tools: Sequence[str] = ()):
+        """Store an answer along with the tools that produced it."""
+        ttl = self._ttl(tools)
+        now = time.time()
+        deps = {}
+        for tool in tools:
+            for path in self.file_dependencies.get(tool, ()):
+                deps[path] = _file_mtime(path)
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self._key(normalize_question(question)),
+                    self._key(question_signature(question)),
+                    question,
+                    answer,
+                    json.dumps(sorted(set(tools))),
+                    now,
+                    None if ttl is None else now + ttl,
+                    json.dumps(deps),
+                ),
+            )
+            self._db.commit()
+
+    def purge_expired(self) -> int:
+        """Delete entries past their TTL; returns the number removed."""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM responses WHERE expires IS NOT NULL AND expires <= ?", (time.time(),)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"size": size, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,175 @@
+# agent/router.py
+"""
+Deterministic local intent router.
+
+Questions that are trivially classifiable ("15 + 25", "convert 100 km/h to
+m/s") are dispatched straight to a tool instead of paying a model round
+trip just to pick it. Each rule is a strict full-question regex that also
+extracts the tool arguments; a tiny bag-of-words classifier built from the
+tool schema descriptions vetoes routes when the wording points at another tool.
+Anything not matched with high confidence falls back to the model.
+"""
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Pattern
+
+from agent.schemas import TOOL_SCHEMAS
+
+_WORD = re.compile(r"[a-z]+")
+_STOP_WORDS = {
+    "a", "an", "the", "to", "of", "for", "in", "and", "or", "is", "what", "with",
+    "type", "text", "name", "get", "given", "one", "per", "same", "it",
+}
+
+_NUMBER = r"[-+]?\d+(?:\.\d+)?"
+_ARITHMETIC = r"[\d\s.+\-*/%()^]*\d[\d\s.+\-*/%()^]*"
+
+
+@dataclass
+class Route:
+    """A tool call chosen locally, without the model."""
+    tool: str
+    args: Dict[str, Any]
+    confidence: float
+    rule: str
+
+
+@dataclass
+class RouteRule:
+    name: str
+    tool: str
+    pattern: Pattern
+    build_args: Callable[[re.Match], Optional[Dict[str, Any]]]
+    confidence: float = 0.95
+
+
+def _arithmetic_args(match: re.Match) -> Optional[Dict[str, Any]]:
+    expr = match.group("expr").strip().replace("^", "**")
+    # Plain numbers ("2024") are not calculations
+    if not re.search(r"\d\s*[-+*/%^]|\)\s*[-+*/%]", expr):
+        return None
+    return {"expr": expr}
+
+
+def _conversion_args(match: re.Match) -> Optional[Dict[str, Any]]:
+    # Imported lazily: the registry (and NumPy) is only needed once a conversion shows up
+    from agent.tools.unit_converter.units import get_unit_registry
+
+    registry = get_unit_registry()
+    # The question has been lowercased, so "mb" may have been "Mb" (megabit) or "MB"
+    if registry.is_ambiguous(match.group("from")) or registry.is_ambiguous(match.group("to")):
+        return None
+    try:
+        source, target = registry.parse(match.group("from")), registry.parse(match.group("to"))
+    except ValueError:
+        return None
+    if source.dimension != target.dimension:
+        return None
+    # Canonical symbols restore the case lost to lowercasing ("gib" -> "GiB")
+    return {"value": float(match.group("value")), "from_unit": source.symbol, "to_unit": target.symbol}
+
+
+DEFAULT_RULES: List[RouteRule] = [
+    RouteRule(
+        "percent_of", "calc",
+        re.compile(rf"^(?:what is|what's|calculate|compute)?\s*(?P<expr>{_NUMBER}\s*% of\s*{_NUMBER})\s*\??$"),
+        lambda m: {"expr": m.group("expr")},
+    ),
+    RouteRule(
+        "arithmetic", "calc",
+        re.compile(rf"^(?:what is|what's|calculate|compute|evaluate)?\s*(?P<expr>{_ARITHMETIC})\s*[?=]?$"),
+        _arithmetic_args,
+    ),
+    RouteRule(
+        "celsius_to_fahrenheit", "unit_converter",
+        re.compile(rf"^(?:convert\s+)?(?P<value>{_NUMBER})\s*(?:°\s*|degrees?\s+)?(?:c|celsius)\s+(?:to|in|into)\s+(?:°\s*)?(?:f|fahrenheit)\s*\??$"),
+        lambda m: {"celsius": float(m.group("value"))},
+    ),
+    RouteRule(
+        "unit_conversion", "unit_converter",
+        re.compile(rf"^(?:convert\s+|what is\s+|what's\s+)?(?P<value>{_NUMBER})\s*(?P<from>[^\s?][^?]*?)\s+(?:to|in|into)\s+(?P<to>[^\s?][^?]*?)\s*\??$"),
+        _conversion_args,
+    ),
+    RouteRule(
+        "weather_in_city", "weather",
+        re.compile(r"^(?:what is|what's|how is|how's)?\s*(?:the\s+)?(?:current\s+)?weather\s+(?:like\s+)?in\s+(?P<city>[a-z][a-z .'-]{1,60}?)\s*(?:right now|today|now)?\s*\??$"),
+        lambda m: {"city": m.group("city").strip().title()},
+        confidence=0.9,
+    ),
+]
+
+
+def _tokens(text: str) -> List[str]:
+    return [t for t in _WORD.findall(text.lower()) if t not in _STOP_WORDS and len(t) > 2]
+
+
+class IntentRouter:
+    """Routes high-confidence questions directly to tools and counts hits."""
+
+    def __init__(self, schemas=None, rules: Optional[List[RouteRule]] = None, threshold: float = 0.8,
+                 veto_penalty: float = 0.3):
+        schemas = schemas if schemas is not None else TOOL_SCHEMAS
+        self.rules = list(DEFAULT_RULES if rules is None else rules)
+        self.threshold = threshold
+        self.veto_penalty = veto_penalty
+        self.vocabulary = self._build_vocabulary(schemas)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build_vocabulary(schemas) -> Dict[str, set]:
+        """Keyword set per tool from its name, description and parameter descriptions."""
+        vocabulary = {}
+        for schema in schemas.values():
+            words = set(_tokens(schema.name.replace("_", " ")))
+            words.update(_tokens(schema.description))
+            for param in schema.parameters:
+                words.update(_tokens(param.description))
+            vocabulary[schema.name] = words
+        return vocabulary
+
+    def classify(self, question: str) -> Dict[str, float]:
+        """Share of the question's keywords found in each tool's vocabulary."""
+        tokens = set(_tokens(question))
+        if not tokens:
+            return {}
+        return {tool: len(tokens & words) / len(tokens) for tool, words in self.vocabulary.items()}
+
+    def _confidence(self, rule: RouteRule, question: str) -> float:
+        scores = self.classify(question)
+        own = scores.get(rule.tool, 0.0)
+        # A tie or a stronger signal for another tool means the question is ambiguous
+        if any(score > 0 and score >= own for tool, score in scores.items() if tool != rule.tool):
+            return rule.confidence - self.veto_penalty
+        return rule.confidence
+
+    def route(self, question: str) -> Optional[Route]:
+        """A Route when a rule matches with enough confidence, else None."""
+        text = " ".join(question.lower().split())
+        for rule in self.rules:
+            if rule.tool not in self.vocabulary:
+                continue
+            match = rule.pattern.match(text)
+            if not match:
+                continue
+            args = rule.build_args(match)
+            if args is None:
+                continue
+            confidence = self._confidence(rule, text)
+            if confidence >= self.threshold:
+                with self._lock:
+                    self.hits += 1
+                return Route(rule.tool, args, confidence, rule.name)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hit_rate, 4)}
@@ -17,6 +17,7 @@ class ToolParameter:
     description: str
     required: bool = True
     default: Any = None
+    items: Optional[str] = None  # element type for "array" parameters
 
 @dataclass
 class ToolSchema:
@@ -37,6 +38,11 @@ class ToolSchema:
                     return False, f"Parameter {param.name} must be a string"
                 elif param.param_type == "number" and not isinstance(value, (int, float)):
                     return False, f"Parameter {param.name} must be a number"
+                elif param.param_type == "array":
+                    if not isinstance(value, (list, tuple)):
+                        return False, f"Parameter {param.name} must be an array"
+                    if param.items == "number" and not all(isinstance(v, (int, float)) for v in value):
+                        return False, f"Parameter {param.name} must be an array of numbers"
         
         return True, None
 
@@ -45,9 +51,12 @@ TOOL_SCHEMAS = {
     ToolType.CALC: ToolSchema(
         name="calc",
         tool_type=ToolType.CALC,
-        description="Evaluate a mathematical expression",
+        description="Evaluate a mathematical expression. To apply the same expression to many numbers, "
+                    "write it in terms of the variable x and pass the numbers as values",
         parameters=[
-            ToolParameter("expr", "string", "Mathematical expression to evaluate")
+            ToolParameter("expr", "string", "Mathematical expression to evaluate"),
+            ToolParameter("values", "array", "Numbers to substitute for x, one result per value",
+                          False, None, items="number")
         ]
     ),
     ToolType.WEATHER: ToolSchema(
@@ -69,9 +78,17 @@ TOOL_SCHEMAS = {
     ToolType.UNIT_CONVERTER: ToolSchema(
         name="unit_converter",
         tool_type=ToolType.UNIT_CONVERTER,
-        description="Convert Celsius to Fahrenheit",
+        description="Convert a value between units of length, mass, volume, time, speed, data size "
+                    "or temperature, including compound units such as km/h to m/s. To convert many "
+                    "numbers between the same units, pass them as values",
         parameters=[
-            ToolParameter("celsius", "number", "Temperature in Celsius")
+            ToolParameter("value", "number", "Number to convert", False),
+            ToolParameter("from_unit", "string", "Unit to convert from, e.g. km/h, lb, GiB, °C", False),
+            ToolParameter("to_unit", "string", "Unit to convert to, e.g. m/s, kg, MB, °F", False),
+            ToolParameter("values", "array", "Numbers to convert instead of value, one result per number",
+                          False, None, items="number"),
+            ToolParameter("celsius", "number", "Shorthand: temperature in Celsius to convert to Fahrenheit",
+                          False)
         ]
     ),
     ToolType.TEXT_ANALYZER: ToolSchema(
@@ -0,0 +1,418 @@
+# agent/server.py
+"""
+Multi-session HTTP chat server.
+
+    python -m agent.server [--port 8080] [--provider fake] [--fake-model-ms 200]
+
+One InteractiveAgent per session, all sharing one ToolManager and one model.
+Sessions are evicted least-recently-used past `max_sessions` and after
+`idle_timeout` seconds without traffic; with `store_dir` set their memory is
+written to disk on eviction and restored on the next message.
+
+Endpoints (JSON in, JSON out):
+    POST   /chat                 {"session": optional id, "message": "..."}
+    GET    /sessions/<id>        recent turns and summary
+    DELETE /sessions/<id>        forget a session (and its stored copy)
+    GET    /stats                session and load counters
+    GET    /metrics              latency histograms and counters, Prometheus text
+    GET    /metrics.json         the same as JSON with percentiles
+
+Backpressure: at most `max_inflight` model calls run at once, at most
+`max_pending` requests may wait behind them (503 past that), and a session
+may queue at most `max_session_pending` messages (429 past that). A new
+session is refused with 503 when the table is full and no session can be
+evicted because each has a message in flight.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from agent.log import log_event
+from agent.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 64 * 1024
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+_ENDPOINTS = {"/chat", "/stats", "/metrics", "/metrics.json"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Session:
+    def __init__(self, session_id: str, agent):
+        self.id = session_id
+        self.agent = agent
+        self.lock = asyncio.Lock()
+        self.pending = 0
+        self.last_used = time.monotonic()
+
+
+class SessionStore:
+    """LRU table of sessions with idle expiry and optional on-disk spill."""
+
+    def __init__(self, agent_factory: Callable[[], Any], max_sessions: int = 1000,
+                 idle_timeout: float = 1800.0, store_dir: Optional[str] = None):
+        self.agent_factory = agent_factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.store_dir = store_dir
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.created = 0
+        self.restored = 0
+        self.evicted = 0
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.store_dir, f"{session_id}.json")
+
+    def get(self, session_id: str) -> Session:
+        """Existing, restored or new session; marks it most recently used.
+
+        Raises HTTPError(503) when the table is full and every session has a
+        message in flight.
+        """
+        session = self.sessions.get(session_id)
+        if session is None:
+            # Make room first, so the new session can never be the one evicted
+            self._evict_over_capacity(reserve=1)
+            if len(self.sessions) >= self.max_sessions:
+                raise HTTPError(503, "too many active sessions")
+            session = Session(session_id, self.agent_factory())
+            if self.store_dir and os.path.exists(self._path(session_id)):
+                with open(self._path(session_id), encoding="utf-8") as f:
+                    session.agent.memory.load(json.load(f))
+                self.restored += 1
+            else:
+                self.created += 1
+            self.sessions[session_id] = session
+        self.sessions.move_to_end(session_id)
+        session.last_used = time.monotonic()
+        return session
+
+    def peek(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Memory snapshot of a live or stored session, without loading it."""
+        session = self.sessions.get(session_id)
+        if session is not None:
+            return session.agent.memory.to_dict()
+        if self.store_dir and os.path.exists(self._path(session_id)):
+            with open(self._path(session_id), encoding="utf-8") as f:
+                return json.load(f)
+        return None
+
+    def delete(self, session_id: str) -> bool:
+        found = self.sessions.pop(session_id, None) is not None
+        if self.store_dir and os.path.exists(self._path(session_id)):
+            os.remove(self._path(session_id))
+            found = True
+        return found
+
+    def _evict(self, session: Session):
+        del self.sessions[session.id]
+        self.evicted += 1
+        if self.store_dir:
+            tmp = self._path(session.id) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(session.agent.memory.to_dict(), f)
+            os.replace(tmp, self._path(session.id))
+
+    def _evict_over_capacity(self, reserve: int = 0):
+        # Oldest first, skipping sessions with a message in flight
+        for session in list(self.sessions.values()):
+            if len(self.sessions) + reserve <= self.max_sessions:
+                break
+            if not session.pending:
+                self._evict(session)
+
+    def evict_idle(self) -> int:
+        deadline = time.monotonic() - self.idle_timeout
+        idle = [s for s in self.sessions.values() if s.last_used < deadline and not s.pending]
+        for session in idle:
+            self._evict(session)
+        return len(idle)
+
+    def flush(self):
+        """Spill every idle session to disk (used on shutdown)."""
+        if self.store_dir:
+            for session in [s for s in self.sessions.values() if not s.pending]:
+                self._evict(session)
+
+
+class ChatServer:
+    """asyncio HTTP/1.1 front end over a SessionStore."""
+
+    def __init__(self, agent_factory: Callable[[], Any], max_sessions: int = 1000,
+                 idle_timeout: float = 1800.0, store_dir: Optional[str] = None,
+                 max_inflight: int = 32, max_pending: int = 256, max_session_pending: int = 4):
+        self.store = SessionStore(agent_factory, max_sessions, idle_timeout, store_dir)
+        self.max_inflight = max_inflight
+        self.max_pending = max_pending
+        self.max_session_pending = max_session_pending
+        self.metrics = get_metrics()
+        self.requests = 0
+        self.rejected = 0
+        self.waiting = 0
+        self._inflight: Optional[asyncio.Semaphore] = None
+        self._server = None
+        self._sweeper = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080):
+        self._inflight = asyncio.Semaphore(self.max_inflight)
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        self._sweeper = asyncio.create_task(self._sweep_idle())
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        self.store.flush()
+
+    async def _sweep_idle(self):
+        interval = max(1.0, min(60.0, self.store.idle_timeout / 4))
+        while True:
+            await asyncio.sleep(interval)
+            self.store.evict_idle()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self.store.sessions),
+            "created": self.store.created,
+            "restored": self.store.restored,
+            "evicted": self.store.evicted,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "waiting": self.waiting,
+        }
+
+    async def chat(self, session_id: Optional[str], message: str) -> Tuple[str, str]:
+        """Answer one message in a session, applying the backpressure limits."""
+        if session_id is None:
+            session_id = uuid.uuid4().hex
+        elif not isinstance(session_id, str) or not _SESSION_ID.match(session_id):
+            raise HTTPError(400, "invalid session id")
+        if self.waiting >= self.max_pending:
+            self.rejected += 1
+            raise HTTPError(503, "server busy")
+
+        try:
+            session = self.store.get(session_id)
+        except HTTPError:
+            self.rejected += 1
+            raise
+        if session.pending >= self.max_session_pending:
+            self.rejected += 1
+            raise HTTPError(429, "too many messages queued for this session")
+
+        session.pending += 1
+        self.waiting += 1
+        started = False
+        try:
+            # Messages in one session are answered in order; sessions run in parallel
+            async with session.lock:
+                async with self._inflight:
+                    self.waiting -= 1
+                    started = True
+                    answer = await session.agent.ask_async(message)
+        finally:
+            if not started:
+                self.waiting -= 1
+            session.pending -= 1
+            session.last_used = time.monotonic()
+        return session_id, answer
+
+    async def _route(self, method: str, path: str, body: bytes) -> Union[Dict[str, Any], str]:
+        if path == "/chat":
+            if method != "POST":
+                raise HTTPError(405, "use POST")
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                raise HTTPError(400, "body must be JSON")
+            message = payload.get("message") if isinstance(payload, dict) else None
+            if not isinstance(message, str) or not message.strip():
+                raise HTTPError(400, "missing 'message'")
+            session_id, answer = await self.chat(payload.get("session"), message.strip())
+            return {"session": session_id, "answer": answer}
+
+        if path == "/stats" and method == "GET":
+            return self.stats()
+
+        if path == "/metrics" and method == "GET":
+            return self.metrics.prometheus()
+
+        if path == "/metrics.json" and method == "GET":
+            return self.metrics.snapshot()
+
+        if path.startswith("/sessions/"):
+            session_id = path[len("/sessions/"):]
+            if not _SESSION_ID.match(session_id):
+                raise HTTPError(400, "invalid session id")
+            if method == "GET":
+                snapshot = self.store.peek(session_id)
+                if snapshot is None:
+                    raise HTTPError(404, "unknown session")
+                return {"session": session_id, **snapshot}
+            if method == "DELETE":
+                if not self.store.delete(session_id):
+                    raise HTTPError(404, "unknown session")
+                return {"session": session_id, "deleted": True}
+            raise HTTPError(405, "use GET or DELETE")
+
+        raise HTTPError(404, "not found")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "malformed request line"}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close")
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {"error": "invalid content-length"}, keep_alive=False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "body too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                self.requests += 1
+                path = target.split("?", 1)[0]
+                start = time.perf_counter()
+                try:
+                    status, payload = 200, await self._route(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    log_event(logger, logging.ERROR, "request_failed", method=method, path=path, error=repr(e))
+                    status, payload = 500, {"error": "internal server error"}
+                if self.metrics.enabled:
+                    # One label per endpoint, not per session id
+                    endpoint = "/sessions" if path.startswith("/sessions/") else path if path in _ENDPOINTS else "other"
+                    self.metrics.observe("server_request_seconds", time.perf_counter() - start,
+                                         endpoint=endpoint, status=status)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Union[Dict[str, Any], str],
+                       keep_alive: bool):
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        headers = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if status in (429, 503):
+            headers.append("Retry-After: 1")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+
+def agent_factory(provider) -> Callable[[], Any]:
+    """Factory for InteractiveAgents that share one ToolManager and one model."""
+    from agent.interactive_agent import InteractiveAgent
+    from agent.tool_manager import ToolManager
+
+    tool_manager = ToolManager(provider=provider)
+    model = provider.model("agent", tool_manager)
+    return lambda: InteractiveAgent(None, tool_manager=tool_manager, model=model, provider=provider)
+
+
+def main():
+    # Imported first: it loads .env, which may set LLM_PROVIDER
+    from agent.llm import FakeProvider, get_provider
+    from agent.log import configure_logging
+
+    parser = argparse.ArgumentParser(description="Multi-session chat server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-sessions", type=int, default=1000)
+    parser.add_argument("--idle-timeout", type=float, default=1800.0, help="seconds before an idle session is evicted")
+    parser.add_argument("--store-dir", help="persist evicted sessions here")
+    parser.add_argument("--max-inflight", type=int, default=32, help="model calls running at once")
+    parser.add_argument("--max-pending", type=int, default=256, help="requests allowed to wait (503 past that)")
+    parser.add_argument("--provider", default=os.getenv("LLM_PROVIDER", "gemini"),
+                        help="gemini, fake, replay or record (see agent/llm.py)")
+    parser.add_argument("--fake-model-ms", type=float, default=None,
+                        help="serve the offline fake model with this latency")
+    parser.add_argument("--metrics", action="store_true", help="record latency metrics (same as METRICS=true)")
+    args = parser.parse_args()
+
+    configure_logging()
+    if args.metrics:
+        get_metrics().enabled = True
+    if args.fake_model_ms is not None:
+        provider = FakeProvider(latency=args.fake_model_ms / 1000)
+    else:
+        try:
+            provider = get_provider(args.provider, os.getenv("GEMINI_API_KEY"))
+        except ValueError as e:
+            parser.error(str(e))
+    factory = agent_factory(provider)
+
+    server = ChatServer(factory, max_sessions=args.max_sessions, idle_timeout=args.idle_timeout,
+                        store_dir=args.store_dir, max_inflight=args.max_inflight, max_pending=args.max_pending)
+
+    async def serve():
+        host, port = await server.start(args.host, args.port)
+        print(f"Serving chat on http://{host}:{port}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
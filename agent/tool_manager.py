@@ -1,29 +1,96 @@
 # agent/tool_manager.py (Updated)
-from typing import Dict, Optional
+import dataclasses
+import logging
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
 from agent.base_tool import BaseTool, ToolResult
-from agent.tools import discover_tools
+from agent.tools import lazy_tools
+
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args(raw_args) -> Dict[str, Any]:
+    """Safely parse function call arguments (a proto Struct or a mapping)."""
+    try:
+        if hasattr(raw_args, 'fields'):
+            from google.protobuf.json_format import MessageToDict
+            return MessageToDict(raw_args)
+        return dict(raw_args)
+    except Exception as e:
+        logger.warning("Could not parse function_call.args: %s", e)
+        return {}
+
+
+def function_calls(response) -> List[Tuple[str, Dict[str, Any]]]:
+    """All (tool_name, args) function calls requested in a response."""
+    calls = []
+    if response.candidates and response.candidates[0].content.parts:
+        for part in response.candidates[0].content.parts:
+            if getattr(part, "function_call", None):
+                calls.append((part.function_call.name, parse_args(part.function_call.args)))
+    return calls
+
+
+def stream_parts(response) -> Iterator[Tuple[str, Any, Any]]:
+    """Yield ("text", str, part) and ("call", (tool_name, args), part) items from a streamed response."""
+    for chunk in response:
+        if not chunk.candidates or not chunk.candidates[0].content.parts:
+            continue
+        for part in chunk.candidates[0].content.parts:
+            if getattr(part, "function_call", None):
+                yield "call", (part.function_call.name, parse_args(part.function_call.args)), part
+            elif getattr(part, "text", None):
+                yield "text", part.text, part
+
+
+def json_safe(value):
+    """Plain JSON types for a tool result, so it converts to a proto Struct.
+
+    NumPy scalars and arrays become Python numbers and lists, tuples and sets
+    become lists, dataclasses become dicts, and anything else becomes str.
+    """
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        return {str(key): json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [json_safe(item) for item in value]
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return json_safe(dataclasses.asdict(value))
+    # NumPy arrays (tolist) and scalars (item), without importing NumPy
+    for method in ("tolist", "item"):
+        if callable(getattr(value, method, None)):
+            try:
+                return json_safe(getattr(value, method)())
+            except (TypeError, ValueError):
+                break
+    return str(value)
+
 
 class ToolManager:
     """Manages all available tools and their execution."""
     
-    def __init__(self):
+    def __init__(self, max_workers: int = 8, provider=None):
+        """`provider` (an LLMProvider) supplies the models tools call themselves,
+        such as KB disambiguation, so fake and replay providers cover them too."""
         self.tools: Dict[str, BaseTool] = {}
+        self.max_workers = max_workers
+        self.provider = provider
+        self._executor: Optional["ThreadPoolExecutor"] = None
         self._register_discovered_tools()
     
     def _register_discovered_tools(self):
-        """Auto-register all discovered tools."""
-        tool_classes = discover_tools()
-        
-        for tool_class in tool_classes:
-            try:
-                tool_instance = tool_class()
-                self.register_tool(tool_instance)
-                print(f"✅ Registered tool: {tool_instance.name}")
-            except Exception as e:
-                print(f"❌ Failed to register {tool_class.__name__}: {e}")
+        """Register all known tools; their modules are imported on first use."""
+        for tool_instance in lazy_tools():
+            self.register_tool(tool_instance)
+            logger.debug("Registered tool: %s", tool_instance.name)
     
     def register_tool(self, tool: BaseTool):
         """Register a new tool."""
+        if self.provider is not None:
+            tool.provider = self.provider
         self.tools[tool.name] = tool
     
     def get_tool(self, name: str) -> Optional[BaseTool]:
@@ -38,6 +105,77 @@ class ToolManager:
         
         return tool.validate_and_execute(args, question)
     
+    async def execute_tool_async(self, name: str, args: Dict, question: str = "") -> ToolResult:
+        """Async variant of execute_tool."""
+        tool = self.get_tool(name)
+        if not tool:
+            return ToolResult(success=False, error=f"Unknown tool: {name}")
+        
+        return await tool.validate_and_execute_async(args, question)
+    
+    def execute_tools(self, calls: List[Tuple[str, Dict]], question: str = "",
+                      timeout: Optional[float] = None) -> List[ToolResult]:
+        """Execute several (name, args) tool calls concurrently; results keep call order.
+        
+        With a `timeout` (seconds), calls still unfinished when it runs out are
+        cancelled if not yet started, abandoned otherwise, and reported as
+        failed results.
+        """
+        if len(calls) <= 1 and timeout is None:
+            return [self.execute_tool(name, args, question) for name, args in calls]
+        
+        from concurrent.futures import wait
+        
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tool")
+        futures = [self._executor.submit(self.execute_tool, name, args, question) for name, args in calls]
+        wait(futures, timeout=max(timeout, 0.0) if timeout is not None else None)
+        
+        results = []
+        for future in futures:
+            if future.done():
+                results.append(future.result())
+            else:
+                future.cancel()
+                results.append(self._timed_out(timeout))
+        return results
+    
+    def close(self):
+        """Shut down the worker threads used for concurrent tool calls."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _timed_out(self, timeout: float) -> ToolResult:
+        return ToolResult(success=False, error=f"Tool call timed out after {max(timeout, 0.0):.1f}s")
+    
+    async def execute_tools_async(self, calls: List[Tuple[str, Dict]], question: str = "",
+                                  timeout: Optional[float] = None) -> List[ToolResult]:
+        """Async variant of execute_tools, bounded by max_workers; unfinished calls are cancelled at `timeout`."""
+        import asyncio
+        
+        semaphore = asyncio.Semaphore(self.max_workers)
+        
+        async def run(name: str, args: Dict) -> ToolResult:
+            async with semaphore:
+                return await self.execute_tool_async(name, args, question)
+        
+        if timeout is None:
+            return list(await asyncio.gather(*(run(name, args) for name, args in calls)))
+        
+        tasks = [asyncio.ensure_future(run(name, args)) for name, args in calls]
+        if tasks:
+            await asyncio.wait(tasks, timeout=max(timeout, 0.0))
+        results = []
+        for task in tasks:
+            if task.done():
+                results.append(task.result())
+            else:
+                task.cancel()
+                results.append(self._timed_out(timeout))
+        return results
+    
     def list_tools(self) -> Dict[str, str]:
         """List all available tools and their descriptions."""
         return {name: tool.schema.description for name, tool in self.tools.items()}
@@ -57,6 +195,8 @@ class ToolManager:
                     "type": param.param_type,
                     "description": param.description
                 }
+                if param.items:
+                    properties[param.name]["items"] = {"type": param.items}
                 if param.required:
                     required.append(param.name)
             
@@ -70,4 +210,14 @@ class ToolManager:
                 }
             ))
         
-        return declarations
\ No newline at end of file
+        return declarations
+    
+    def function_responses_for_gemini(self, calls: List[Tuple[str, Dict]], results: List[ToolResult]):
+        """Format tool results as Gemini function_response parts, one per call."""
+        from google.generativeai import protos
+        
+        parts = []
+        for (name, _), result in zip(calls, results):
+            response = {"result": json_safe(result.data)} if result.success else {"error": str(result.error)}
+            parts.append(protos.Part(function_response=protos.FunctionResponse(name=name, response=response)))
+        return parts
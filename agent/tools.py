@@ -1,4 +1,3 @@
-import json
 from typing import Any, Dict
 
 
@@ -33,11 +32,10 @@ def temp(city: str):
 
 def kb_lookup(q: str) -> str:
     try:
-        with open("data/kb.json","r") as f:
-            data = json.load(f)
-        for item in data.get("entries", []):
-            if q in item.get("name",""):
-                return item.get("summary","")
-        return "No entry found."
+        from agent.tools.kb.index import get_kb_index
+        item = get_kb_index().lookup(q)
+        if item is None:
+            return "No entry found."
+        return item.get("summary","")
     except Exception as e:
         return f"KB error: {e}"
@@ -1,55 +1,163 @@
 # agent/tools/__init__.py
 """
-Auto-discovery system for tools.
-This module automatically imports all tool classes from subdirectories.
+Tool registry.
+
+Built-in tools are listed in a static manifest, so the tool manager can
+advertise their names and schemas without importing any tool module; each
+module is imported the first time its tool runs. Tool directories missing from
+the manifest are still picked up by auto-discovery.
 """
 
 import os
 import importlib
-from typing import List, Type
-from agent.base_tool import BaseTool
+import logging
+import threading
+from typing import Any, Dict, List, Type
+from agent.base_tool import BaseTool, ToolResult
+from agent.schemas import TOOL_SCHEMAS, ToolType
+
+logger = logging.getLogger(__name__)
+
+# tool name -> "module:Class"
+TOOL_MANIFEST: Dict[str, str] = {
+    ToolType.CALC.value: "agent.tools.calculator.tool:CalculatorTool",
+    ToolType.KB.value: "agent.tools.kb.tool:KnowledgeBaseTool",
+    ToolType.TEXT_ANALYZER.value: "agent.tools.text_analyzer.tool:TextAnalyzerTool",
+    ToolType.UNIT_CONVERTER.value: "agent.tools.unit_converter.tool:UnitConverterTool",
+    ToolType.WEATHER.value: "agent.tools.weather.tool:WeatherTool",
+}
+
+
+def _import_target(target: str) -> Type[BaseTool]:
+    module_name, class_name = target.split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+class LazyTool(BaseTool):
+    """Stand-in that exposes a tool's schema and imports the tool on first use."""
+
+    def __init__(self, name: str, target: str):
+        super().__init__(TOOL_SCHEMAS[ToolType(name)])
+        self.target = target
+        self._tool = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._tool is not None
+
+    @property
+    def provider(self):
+        return self._provider
+
+    @provider.setter
+    def provider(self, provider):
+        # Set before the tool loads too, so it reaches the real tool either way
+        self._provider = provider
+        if getattr(self, "_tool", None) is not None:
+            self._tool.provider = provider
+
+    def load(self) -> BaseTool:
+        """Import and instantiate the real tool (once)."""
+        if self._tool is None:
+            with self._load_lock:
+                if self._tool is None:
+                    tool = _import_target(self.target)()
+                    tool.provider = self._provider
+                    self._tool = tool
+        return self._tool
+
+    def validate_and_execute(self, args: Dict[str, Any], question: str = "") -> ToolResult:
+        try:
+            tool = self.load()
+        except Exception as e:
+            return ToolResult(success=False, error=f"Failed to load tool {self.name}: {e}")
+        return tool.validate_and_execute(args, question)
+
+    async def validate_and_execute_async(self, args: Dict[str, Any], question: str = "") -> ToolResult:
+        try:
+            tool = self.load()
+        except Exception as e:
+            return ToolResult(success=False, error=f"Failed to load tool {self.name}: {e}")
+        return await tool.validate_and_execute_async(args, question)
+
+    def execute(self, args: Dict[str, Any], question: str = "") -> Any:
+        return self.load().execute(args, question)
+
+    def __getattr__(self, attr: str):
+        # Tool-specific helpers (e.g. WeatherTool.cache_stats) live on the real tool
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.load(), attr)
+
+
+def _tool_directories() -> List[str]:
+    current_dir = os.path.dirname(__file__)
+    return sorted(
+        item for item in os.listdir(current_dir)
+        if os.path.isdir(os.path.join(current_dir, item)) and not item.startswith('__')
+    )
+
+
+def _discover_module(item: str) -> List[Type[BaseTool]]:
+    """Import agent.tools.<item>.tool and return its BaseTool subclasses."""
+    tools = []
+    try:
+        # Import the tool module
+        module = importlib.import_module(f'agent.tools.{item}.tool')
+
+        # Find all classes that end with 'Tool' and inherit from BaseTool
+        for attr_name in dir(module):
+            attr = getattr(module, attr_name)
+
+            if (isinstance(attr, type) and
+                issubclass(attr, BaseTool) and
+                attr != BaseTool and
+                attr_name.endswith('Tool')):
+                tools.append(attr)
+
+    except (ImportError, AttributeError) as e:
+        logger.warning("Could not load tool from %s: %s", item, e)
+    return tools
+
 
 def discover_tools() -> List[Type[BaseTool]]:
     """
     Automatically discover all tool classes in subdirectories.
     Each tool directory should have tool.py with a class ending in 'Tool'.
+    This imports every tool module; prefer lazy_tools() on hot paths.
     """
     tools = []
-    current_dir = os.path.dirname(__file__)
-    
-    # Get all subdirectories in tools/
-    for item in os.listdir(current_dir):
-        item_path = os.path.join(current_dir, item)
-        
-        # Skip files and __pycache__
-        if not os.path.isdir(item_path) or item.startswith('__'):
-            continue
-            
-        try:
-            # Import the tool module
-            module = importlib.import_module(f'agent.tools.{item}.tool')
-            
-            # Find all classes that end with 'Tool' and inherit from BaseTool
-            for attr_name in dir(module):
-                attr = getattr(module, attr_name)
-                
-                if (isinstance(attr, type) and 
-                    issubclass(attr, BaseTool) and 
-                    attr != BaseTool and
-                    attr_name.endswith('Tool')):
-                    tools.append(attr)
-                    
-        except (ImportError, AttributeError) as e:
-            print(f"Warning: Could not load tool from {item}: {e}")
+    for item in _tool_directories():
+        tools.extend(_discover_module(item))
+    return tools
+
+
+def lazy_tools() -> List[BaseTool]:
+    """
+    Tool instances for the tool manager: manifest tools as LazyTool stand-ins,
+    plus eagerly discovered tools from directories not in the manifest.
+    """
+    tools: List[BaseTool] = [LazyTool(name, target) for name, target in TOOL_MANIFEST.items()]
+
+    manifest_packages = {target.split(":")[0].rsplit(".", 1)[0] for target in TOOL_MANIFEST.values()}
+    for item in _tool_directories():
+        if f"agent.tools.{item}" in manifest_packages:
             continue
-    
+        for tool_class in _discover_module(item):
+            try:
+                tools.append(tool_class())
+            except Exception as e:
+                logger.error("Failed to register %s: %s", tool_class.__name__, e)
     return tools
 
-# Auto-discover and expose all tools
-__all__ = []
-_discovered_tools = discover_tools()
 
-# Export tool classes
-for tool_class in _discovered_tools:
-    globals()[tool_class.__name__] = tool_class
-    __all__.append(tool_class.__name__)
\ No newline at end of file
+_CLASS_TARGETS = {target.split(":")[1]: target for target in TOOL_MANIFEST.values()}
+__all__ = sorted(_CLASS_TARGETS) + ["LazyTool", "TOOL_MANIFEST", "discover_tools", "lazy_tools"]
+
+
+def __getattr__(name: str):
+    # Tool classes are exported lazily so importing agent.tools stays cheap
+    if name in _CLASS_TARGETS:
+        return _import_target(_CLASS_TARGETS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
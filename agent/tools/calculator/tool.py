@@ -1,54 +1,266 @@
 # agent/tools/calculator/tool.py
 import ast
+import math
 import operator as op
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # batch evaluation falls back to a scalar loop
+    np = None
+
 from agent.base_tool import BaseTool
 from agent.schemas import TOOL_SCHEMAS, ToolType
 
+# Results larger than this many bits are refused instead of computed
+MAX_POWER_BITS = 100_000
+
+def _safe_pow(base, exponent):
+    """Power with a guard against results too large to compute (e.g. 9**9**9)."""
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1:
+        if exponent * math.log2(abs(base)) > MAX_POWER_BITS:
+            raise ValueError("Exponent too large")
+    return op.pow(base, exponent)
+
 # Safe operators mapping for math evaluation
 SAFE_OPERATORS = {
     ast.Add: op.add,
     ast.Sub: op.sub,
     ast.Mult: op.mul,
     ast.Div: op.truediv,
-    ast.Pow: op.pow,
+    ast.FloorDiv: op.floordiv,
+    ast.Pow: _safe_pow,
     ast.USub: op.neg,
+    ast.UAdd: op.pos,
     ast.Mod: op.mod,
 }
 
+SAFE_COMPARISONS = {
+    ast.Lt: op.lt,
+    ast.LtE: op.le,
+    ast.Gt: op.gt,
+    ast.GtE: op.ge,
+    ast.Eq: op.eq,
+    ast.NotEq: op.ne,
+}
+
+SAFE_FUNCTIONS = {
+    "sqrt": math.sqrt,
+    "log": math.log,
+    "log10": math.log10,
+    "exp": math.exp,
+    "abs": abs,
+    "round": round,
+    "min": min,
+    "max": max,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+}
+
+SAFE_CONSTANTS = {
+    "pi": math.pi,
+    "e": math.e,
+}
+
+def _vector_functions() -> Dict[Any, Any]:
+    """Element-wise NumPy equivalents of the whitelisted scalar functions."""
+    def reduce_with(ufunc):
+        return lambda *arrays: ufunc.reduce(np.broadcast_arrays(*arrays))
+
+    return {
+        _safe_pow: np.power,
+        op.truediv: np.true_divide,
+        math.sqrt: np.sqrt,
+        math.log: lambda x, base=None: np.log(x) if base is None else np.log(x) / np.log(base),
+        math.log10: np.log10,
+        math.exp: np.exp,
+        abs: np.abs,
+        round: np.round,
+        min: reduce_with(np.minimum),
+        max: reduce_with(np.maximum),
+        math.sin: np.sin,
+        math.cos: np.cos,
+        math.tan: np.tan,
+    }
+
+_VECTOR_FUNCTIONS = _vector_functions() if np is not None else {}
+
+# Opcodes of the compiled postfix program
+_CONST, _VAR, _BINOP, _UNARY, _CALL, _COMPARE = range(6)
+
+
+class CompiledExpression:
+    """An expression compiled once to a postfix program and evaluated with a stack.
+
+    Evaluation is a flat loop, so deeply nested expressions cannot hit the
+    recursion limit. Expressions without variables memoize their result.
+    """
+
+    def __init__(self, program: List[Tuple[int, Any]], variables: frozenset):
+        self.program = program
+        self.variables = variables
+        self._result: Optional[Any] = None
+
+    def evaluate(self, variables: Optional[Dict[str, Any]] = None) -> Any:
+        if not self.variables and self._result is not None:
+            return self._result
+
+        stack: List[Any] = []
+        push, pop = stack.append, stack.pop
+        for opcode, arg in self.program:
+            if opcode == _CONST:
+                push(arg)
+            elif opcode == _VAR:
+                if not variables or arg not in variables:
+                    raise ValueError(f"Unknown variable: {arg}")
+                push(variables[arg])
+            elif opcode == _BINOP:
+                right = pop()
+                stack[-1] = arg(stack[-1], right)
+            elif opcode == _UNARY:
+                stack[-1] = arg(stack[-1])
+            elif opcode == _CALL:
+                func, nargs = arg
+                values = stack[len(stack) - nargs:]
+                del stack[len(stack) - nargs:]
+                push(func(*values))
+            else:  # _COMPARE: chained comparison over len(ops) + 1 operands
+                n = len(arg) + 1
+                values = stack[len(stack) - n:]
+                del stack[len(stack) - n:]
+                push(all(cmp(values[i], values[i + 1]) for i, cmp in enumerate(arg)))
+
+        result = stack[0]
+        if not self.variables:
+            self._result = result
+        return result
+
+    def evaluate_batch(self, columns: Dict[str, Sequence[float]]):
+        """Evaluate over arrays of variable bindings in one vectorized pass.
+
+        Each variable maps to a sequence of values; the result is a float64
+        array with one entry per row. Without NumPy, rows are evaluated one
+        by one with the scalar evaluator.
+        """
+        if np is None:
+            rows = len(next(iter(columns.values()))) if columns else 1
+            return [self.evaluate({k: v[i] for k, v in columns.items()}) for i in range(rows)]
+
+        arrays = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+        stack: List[Any] = []
+        push, pop = stack.append, stack.pop
+        with np.errstate(all="ignore"):
+            for opcode, arg in self.program:
+                if opcode == _CONST:
+                    # As floats: NumPy rejects integers raised to negative integer powers
+                    push(np.float64(arg))
+                elif opcode == _VAR:
+                    if arg not in arrays:
+                        raise ValueError(f"Unknown variable: {arg}")
+                    push(arrays[arg])
+                elif opcode == _BINOP:
+                    right = pop()
+                    stack[-1] = _VECTOR_FUNCTIONS.get(arg, arg)(stack[-1], right)
+                elif opcode == _UNARY:
+                    stack[-1] = arg(stack[-1])
+                elif opcode == _CALL:
+                    func, nargs = arg
+                    values = stack[len(stack) - nargs:]
+                    del stack[len(stack) - nargs:]
+                    push(_VECTOR_FUNCTIONS[func](*values))
+                else:
+                    n = len(arg) + 1
+                    values = stack[len(stack) - n:]
+                    del stack[len(stack) - n:]
+                    push(np.logical_and.reduce([cmp(values[i], values[i + 1]) for i, cmp in enumerate(arg)]))
+
+        shape = np.broadcast_shapes(*(a.shape for a in arrays.values())) if arrays else ()
+        return np.broadcast_to(np.asarray(stack[0], dtype=np.float64), shape)
+
+
+def _compile(node: ast.AST) -> CompiledExpression:
+    """Translate a whitelisted AST into a postfix program without recursion."""
+    program: List[Tuple[int, Any]] = []
+    names = set()
+    # (node, expanded): children are emitted before their parent's instruction
+    work = [(node, False)]
+    while work:
+        current, expanded = work.pop()
+        if isinstance(current, ast.Constant):
+            if isinstance(current.value, bool) or not isinstance(current.value, (int, float)):
+                raise ValueError("Unsupported expression")
+            program.append((_CONST, current.value))
+        elif isinstance(current, ast.Name):
+            if current.id in SAFE_CONSTANTS:
+                program.append((_CONST, SAFE_CONSTANTS[current.id]))
+            else:
+                names.add(current.id)
+                program.append((_VAR, current.id))
+        elif isinstance(current, ast.BinOp) and type(current.op) in SAFE_OPERATORS:
+            if expanded:
+                program.append((_BINOP, SAFE_OPERATORS[type(current.op)]))
+            else:
+                work.extend([(current, True), (current.right, False), (current.left, False)])
+        elif isinstance(current, ast.UnaryOp) and type(current.op) in SAFE_OPERATORS:
+            if expanded:
+                program.append((_UNARY, SAFE_OPERATORS[type(current.op)]))
+            else:
+                work.extend([(current, True), (current.operand, False)])
+        elif (isinstance(current, ast.Call) and isinstance(current.func, ast.Name)
+              and current.func.id in SAFE_FUNCTIONS and not current.keywords):
+            if expanded:
+                program.append((_CALL, (SAFE_FUNCTIONS[current.func.id], len(current.args))))
+            else:
+                work.append((current, True))
+                work.extend((arg, False) for arg in reversed(current.args))
+        elif isinstance(current, ast.Compare) and all(type(o) in SAFE_COMPARISONS for o in current.ops):
+            if expanded:
+                program.append((_COMPARE, [SAFE_COMPARISONS[type(o)] for o in current.ops]))
+            else:
+                work.append((current, True))
+                work.extend((operand, False) for operand in reversed([current.left] + current.comparators))
+        else:
+            raise ValueError("Unsupported expression")
+    return CompiledExpression(program, frozenset(names))
+
+
+def normalize_expression(expr: str) -> str:
+    """Rewrite natural-language phrasing into a plain arithmetic expression."""
+    e = expr.lower().replace("what is", "").strip().rstrip("?").strip()
+
+    # Handle percentage calculations
+    if "% of" in e:
+        left, right = e.split("% of", 1)
+        return f"({left.strip()}) / 100.0 * ({right.strip()})"
+
+    # Normalize common phrases
+    return e.replace("add ", "").replace("plus ", "+").replace(" to the ", " + ").strip()
+
+
+@lru_cache(maxsize=2048)
+def compile_expression(expr: str) -> CompiledExpression:
+    """Parse and compile a normalized expression; repeated expressions hit the LRU."""
+    return _compile(ast.parse(expr, mode='eval').body)
+
+
 class CalculatorTool(BaseTool):
     """Calculator tool for mathematical expressions."""
-    
+
     def __init__(self):
         super().__init__(TOOL_SCHEMAS[ToolType.CALC])
-    
-    def _safe_eval(self, node):
-        """Safely evaluate arithmetic expressions using AST."""
-        if isinstance(node, ast.Num):  # <number>
-            return node.n
-        elif isinstance(node, ast.BinOp):
-            return SAFE_OPERATORS[type(node.op)](self._safe_eval(node.left), self._safe_eval(node.right))
-        elif isinstance(node, ast.UnaryOp):
-            return SAFE_OPERATORS[type(node.op)](self._safe_eval(node.operand))
-        else:
-            raise ValueError("Unsupported expression")
-    
-    def execute(self, args: Dict[str, Any], question: str = "") -> str:
-        expr = args["expr"]
-        
-        # Clean up expression
-        e = expr.lower().replace("what is", "").strip()
-        
-        # Handle percentage calculations
-        if "% of" in e:
-            left, right = e.split("% of")
-            x = float(left.strip())
-            y = float(right.strip())
-            return str((x / 100.0) * y)
-
-        # Normalize common phrases
-        e = e.replace("add ", "").replace("plus ", "+").replace(" to the ", " + ")
-
-        # Parse safely using AST
-        node = ast.parse(e, mode='eval').body
-        return str(self._safe_eval(node))
\ No newline at end of file
+
+    def evaluate(self, expr: str, variables: Optional[Dict[str, Any]] = None) -> Any:
+        """Evaluate an expression, optionally binding named variables."""
+        return compile_expression(normalize_expression(expr)).evaluate(variables)
+
+    def evaluate_batch(self, expr: str, columns: Dict[str, Sequence[float]]):
+        """Evaluate one expression over many bindings, e.g. {"x": invoice_totals}."""
+        return compile_expression(normalize_expression(expr)).evaluate_batch(columns)
+
+    def execute(self, args: Dict[str, Any], question: str = "") -> Any:
+        if args.get("values") is not None:
+            results = self.evaluate_batch(args["expr"], {"x": args["values"]})
+            return [float(r) for r in results]
+        return str(self.evaluate(args["expr"]))
@@ -1,5 +1,19 @@
 # agent/tools/kb/__init__.py
-from .tool import KnowledgeBaseTool
-from .kb_agent import KBAgent
+import importlib
 
-__all__ = ['KnowledgeBaseTool', 'KBAgent']
\ No newline at end of file
+# Exported lazily: KBAgent pulls in google.generativeai and KBVectorStore numpy
+_EXPORTS = {
+    'KnowledgeBaseTool': '.tool',
+    'KBAgent': '.kb_agent',
+    'KBIndex': '.index',
+    'KBRetriever': '.retrieval',
+    'KBVectorStore': '.vectors',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
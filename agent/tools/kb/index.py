@@ -0,0 +1,178 @@
+# agent/tools/kb/index.py
+import bisect
+import json
+import os
+import re
+import threading
+from typing import Dict, Any, List, NamedTuple, Optional, Set
+
+# The bundled KB, anchored to the project so every working directory reads the same file
+DEFAULT_KB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))),
+    "data", "kb.json",
+)
+
+_QUESTION_PREFIX = re.compile(r'^(who is|what is)\s+', flags=re.IGNORECASE)
+_NON_WORD = re.compile(r'[^\w\s]')
+
+
+def normalize_query(query: str) -> str:
+    """Strip leading 'who is'/'what is' and punctuation, lowercase the rest."""
+    cleaned = _QUESTION_PREFIX.sub('', query.lower()).strip()
+    return _NON_WORD.sub('', cleaned)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return _NON_WORD.sub(' ', text.lower()).split()
+
+
+class IndexSnapshot(NamedTuple):
+    """One loaded version of the KB; replaced whole, never modified."""
+    entries: List[Dict[str, Any]]
+    names: List[str]
+    postings: Dict[str, Set[int]]
+    vocabulary: List[str]
+    mtime: Optional[float]
+    version: int
+
+
+_EMPTY = IndexSnapshot([], [], {}, [], None, 0)
+
+
+class KBIndex:
+    """In-memory inverted index over the knowledge base file.
+
+    The KB is parsed once and a token -> entry-id postings map is built over
+    entry names (and optionally summaries). The file's mtime is checked on
+    every lookup and the index is rebuilt when it changes. A rebuild is
+    published as one IndexSnapshot, so a lookup running during refresh()
+    sees either the old KB or the new one, never a mix.
+    """
+
+    def __init__(self, kb_file_path: str = DEFAULT_KB_PATH, index_summary: bool = False):
+        self.kb_file_path = kb_file_path
+        self.index_summary = index_summary
+        self.snapshot = _EMPTY
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _current_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.kb_file_path).st_mtime
+        except OSError:
+            return None
+
+    def _load(self, mtime: Optional[float]):
+        """Parse the KB file and rebuild the postings map."""
+        try:
+            with open(self.kb_file_path, "r") as f:
+                data = json.load(f)
+            entries = data.get("entries", [])
+        except Exception:
+            entries = []
+
+        postings: Dict[str, Set[int]] = {}
+        names = []
+        for i, entry in enumerate(entries):
+            name = entry.get("name", "").lower()
+            names.append(name)
+            tokens = tokenize(name)
+            if self.index_summary:
+                tokens += tokenize(entry.get("summary", ""))
+            for token in tokens:
+                postings.setdefault(token, set()).add(i)
+
+        self.snapshot = IndexSnapshot(entries, names, postings, sorted(postings), mtime, self.snapshot.version + 1)
+        self._loaded = True
+
+    def refresh(self):
+        """Reload the index if the KB file changed since the last load."""
+        mtime = self._current_mtime()
+        if self._loaded and mtime == self.snapshot.mtime:
+            return
+        with self._lock:
+            if not self._loaded or mtime != self.snapshot.mtime:
+                self._load(mtime)
+
+    @staticmethod
+    def _token_matches(snapshot: IndexSnapshot, token: str) -> Set[int]:
+        """Entries containing a token that starts with the given prefix."""
+        exact = snapshot.postings.get(token)
+        start = bisect.bisect_left(snapshot.vocabulary, token)
+        matches: Set[int] = set(exact) if exact else set()
+        for word in snapshot.vocabulary[start:]:
+            if not word.startswith(token):
+                break
+            if word != token:
+                matches |= snapshot.postings[word]
+        return matches
+
+    def _candidates(self, snapshot: IndexSnapshot, query: str) -> List[int]:
+        tokens = tokenize(normalize_query(query))
+        if not tokens:
+            return []
+
+        result: Optional[Set[int]] = None
+        for token in sorted(tokens, key=lambda t: len(snapshot.postings.get(t, ()))):
+            matches = self._token_matches(snapshot, token)
+            result = matches if result is None else result & matches
+            if not result:
+                return []
+        return sorted(result)
+
+    def candidates(self, query: str) -> List[int]:
+        """Entry ids whose indexed text contains every query token (prefix match)."""
+        self.refresh()
+        return self._candidates(self.snapshot, query)
+
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """Return the first entry whose name contains the normalized query.
+
+        Names whose words start with the query words are found through the
+        postings map. Only when none matches are all names scanned, so
+        mid-word queries ("velace" -> "Ada Lovelace") still match.
+        """
+        self.refresh()
+        snapshot = self.snapshot
+        cleaned = normalize_query(query)
+        if not cleaned:
+            return None
+        for i in self._candidates(snapshot, query):
+            if cleaned in snapshot.names[i]:
+                return snapshot.entries[i]
+        for i, name in enumerate(snapshot.names):
+            if cleaned in name:
+                return snapshot.entries[i]
+        return None
+
+    @property
+    def entries(self) -> List[Dict[str, Any]]:
+        return self.snapshot.entries
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    @property
+    def mtime(self) -> Optional[float]:
+        """mtime of the KB file as of the last load."""
+        return self.snapshot.mtime
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self.snapshot.entries)
+
+
+_shared_indexes: Dict[str, KBIndex] = {}
+_shared_lock = threading.Lock()
+
+
+def get_kb_index(kb_file_path: str = DEFAULT_KB_PATH) -> KBIndex:
+    """Return the process-wide index for a KB file, creating it on first use."""
+    key = os.path.abspath(kb_file_path)
+    with _shared_lock:
+        index = _shared_indexes.get(key)
+        if index is None:
+            index = _shared_indexes[key] = KBIndex(key)
+        return index
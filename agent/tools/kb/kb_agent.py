@@ -1,37 +1,56 @@
 # agent/tools/kb/kb_agent.py
-import json
-import google.generativeai as genai
+from agent.models import get_model_pool
+from .index import DEFAULT_KB_PATH, get_kb_index
+from .retrieval import KBRetriever
 
 class KBAgent:
-    def __init__(self, api_key: str, kb_file_path: str = "data/kb.json"):
-        """Simple KB agent for intelligent searching."""
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name="gemini-1.5-flash")
+    def __init__(self, api_key: str, kb_file_path: str = DEFAULT_KB_PATH,
+                 top_k: int = 5, confidence: float = 0.9, provider=None):
+        """Simple KB agent for intelligent searching.
+
+        Candidates are retrieved locally first; the model is only asked to pick
+        among the top_k of them, and not at all when the best candidate's name
+        score reaches `confidence` and clearly beats the runner-up. The model
+        comes from `provider` (an LLMProvider), or Gemini when there is none.
+        """
+        # Picking an index is simple; the "kb" model can be cheaper than the agent's
+        if provider is not None:
+            self.model = provider.model("kb")
+        else:
+            models = get_model_pool()
+            models.configure(api_key)
+            self.model = models.get("kb")
         self.kb_file_path = kb_file_path
-        self.kb_data = self._load_kb()
-    
-    def _load_kb(self):
-        """Load knowledge base data."""
-        try:
-            with open(self.kb_file_path, "r") as f:
-                return json.load(f)
-        except Exception:
-            return {"entries": []}
-    
+        self.index = get_kb_index(kb_file_path)
+        self.retriever = KBRetriever(self.index)
+        self.top_k = top_k
+        self.confidence = confidence
+
+    def _is_confident(self, candidates) -> bool:
+        best = candidates[0]
+        if best.name_score < self.confidence:
+            return False
+        return len(candidates) == 1 or candidates[1].name_score < best.name_score
+
     def search(self, user_question: str) -> str:
-        """Smart search in KB using AI agent."""
+        """Smart search in KB using local retrieval, falling back to the AI agent."""
         try:
-            # Get all KB entries as text
-            kb_entries = []
-            for i, entry in enumerate(self.kb_data.get("entries", [])):
-                kb_entries.append(f"{i}: {entry.get('name', '')} - {entry.get('summary', '')}")
-            
-            if not kb_entries:
+            if len(self.index) == 0:
                 return "Knowledge base is empty."
-            
+
+            candidates = self.retriever.search(user_question, top_k=self.top_k)
+            if not candidates:
+                return "No entry found."
+
+            if self._is_confident(candidates):
+                return candidates[0].summary or "No summary available."
+
+            # Only the shortlisted entries go into the prompt
+            kb_entries = [f"{i}: {c.name} - {c.summary}" for i, c in enumerate(candidates)]
+
             # Create prompt for the agent
             prompt = f"""
-You are a knowledge base search assistant. 
+You are a knowledge base search assistant.
 
 User question: "{user_question}"
 
@@ -48,24 +67,24 @@ Rules:
 
 Response format: Just the index number or "NO_MATCH"
 """
-            
+
             # Ask the agent
             response = self.model.generate_content(prompt)
             result = response.text.strip()
-            
+
             # Handle the response
             if result == "NO_MATCH":
                 return "No entry found."
-            
+
             # Try to get the entry by index
             try:
                 index = int(result)
-                if 0 <= index < len(self.kb_data["entries"]):
-                    return self.kb_data["entries"][index].get("summary", "No summary available.")
+                if 0 <= index < len(candidates):
+                    return candidates[index].summary or "No summary available."
                 else:
                     return "No entry found."
             except ValueError:
                 return "No entry found."
-                
+
         except Exception as e:
-            return f"KB search error: {str(e)}"
\ No newline at end of file
+            return f"KB search error: {str(e)}"
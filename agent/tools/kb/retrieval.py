@@ -0,0 +1,175 @@
+# agent/tools/kb/retrieval.py
+import math
+import threading
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Set, Tuple
+
+from .index import KBIndex, normalize_query, tokenize
+
+# Words that carry no signal for picking a KB entry
+STOP_WORDS = {
+    "a", "an", "the", "is", "was", "are", "who", "what", "tell", "me", "about",
+    "of", "in", "on", "for", "and", "to", "do", "you", "know", "please", "give",
+    "info", "information",
+}
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"#{token}#"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class KBCandidate:
+    """A KB entry scored against a question."""
+    index: int
+    name: str
+    summary: str
+    name_score: float
+    bm25: float
+    score: float
+
+
+class KBRetriever:
+    """Local candidate retrieval over a KBIndex.
+
+    Ranks entries by BM25 over name + summary tokens combined with a fuzzy
+    name score (character trigram lookup refined with edit-distance ratio),
+    so that "Simon" still finds "Saymon" without asking the model.
+    """
+
+    def __init__(self, index: KBIndex, k1: float = 1.5, b: float = 0.75,
+                 min_similarity: float = 0.6):
+        self.index = index
+        self.k1 = k1
+        self.b = b
+        self.min_similarity = min_similarity
+        self._version = -1
+        self._lock = threading.Lock()
+
+    def _build(self, entries: List[Dict[str, Any]]):
+        """Rebuild BM25 statistics and the fuzzy name vocabulary."""
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lengths = []
+        name_tokens: List[List[str]] = []
+        name_postings: Dict[str, Set[int]] = {}
+
+        for i, entry in enumerate(entries):
+            names = tokenize(entry.get("name", ""))
+            tokens = names + tokenize(entry.get("summary", ""))
+            doc_lengths.append(len(tokens))
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append((i, tf))
+            name_tokens.append(names)
+            for token in names:
+                name_postings.setdefault(token, set()).add(i)
+
+        trigram_index: Dict[str, Set[str]] = {}
+        for token in name_postings:
+            for gram in _trigrams(token):
+                trigram_index.setdefault(gram, set()).add(token)
+
+        n = len(entries)
+        self._entries = entries
+        self._postings = postings
+        self._idf = {
+            token: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for token, docs in postings.items()
+        }
+        self._doc_lengths = doc_lengths
+        self._avgdl = (sum(doc_lengths) / n) if n else 0.0
+        self._name_tokens = name_tokens
+        self._name_postings = name_postings
+        self._trigram_index = trigram_index
+
+    def _ensure_built(self):
+        self.index.refresh()
+        # Entries and version from one snapshot, even if the index reloads meanwhile
+        snapshot = self.index.snapshot
+        if self._version == snapshot.version:
+            return
+        with self._lock:
+            if self._version != snapshot.version:
+                self._build(snapshot.entries)
+                self._version = snapshot.version
+
+    def _bm25(self, tokens: List[str]) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        for token in tokens:
+            idf = self._idf.get(token)
+            if idf is None:
+                continue
+            for doc, tf in self._postings[token]:
+                norm = 1 - self.b + self.b * self._doc_lengths[doc] / (self._avgdl or 1)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return scores
+
+    def _similar_name_tokens(self, token: str, limit: int = 50) -> Dict[str, float]:
+        """Name-vocabulary tokens close to the query token, with their similarity."""
+        if token in self._name_postings:
+            return {token: 1.0}
+        if len(token) < 3:
+            return {}
+
+        shared: Dict[str, int] = {}
+        for gram in _trigrams(token):
+            for word in self._trigram_index.get(gram, ()):
+                shared[word] = shared.get(word, 0) + 1
+        nearest = sorted(shared, key=shared.get, reverse=True)[:limit]
+
+        similar = {}
+        for word in nearest:
+            ratio = SequenceMatcher(None, token, word).ratio()
+            if ratio >= self.min_similarity:
+                similar[word] = ratio
+        return similar
+
+    def _name_scores(self, tokens: List[str]) -> Dict[int, float]:
+        """Fraction of each entry's name matched by query tokens, weighted by similarity."""
+        best: Dict[int, Dict[str, float]] = {}
+        for token in tokens:
+            for word, ratio in self._similar_name_tokens(token).items():
+                for doc in self._name_postings[word]:
+                    matched = best.setdefault(doc, {})
+                    matched[word] = max(matched.get(word, 0.0), ratio)
+
+        scores = {}
+        for doc, matched in best.items():
+            names = self._name_tokens[doc]
+            scores[doc] = sum(matched.get(word, 0.0) for word in names) / len(names)
+        return scores
+
+    def search(self, question: str, top_k: int = 5) -> List[KBCandidate]:
+        """Return up to top_k candidates, best first."""
+        self._ensure_built()
+        tokens = [t for t in tokenize(normalize_query(question)) if t not in STOP_WORDS]
+        if not tokens:
+            return []
+
+        bm25 = self._bm25(tokens)
+        name_scores = self._name_scores(tokens)
+        top_bm25 = max(bm25.values(), default=0.0) or 1.0
+
+        ranked = []
+        for doc in set(bm25) | set(name_scores):
+            name_score = name_scores.get(doc, 0.0)
+            lexical = bm25.get(doc, 0.0)
+            ranked.append((name_score + 0.5 * lexical / top_bm25, name_score, lexical, doc))
+        ranked.sort(reverse=True)
+
+        entries = self._entries
+        return [
+            KBCandidate(
+                index=doc,
+                name=entries[doc].get("name", ""),
+                summary=entries[doc].get("summary", ""),
+                name_score=name_score,
+                bm25=lexical,
+                score=score,
+            )
+            for score, name_score, lexical, doc in ranked[:top_k]
+        ]
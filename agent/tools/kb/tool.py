@@ -1,20 +1,36 @@
 # agent/tools/kb/tool.py
-import json
-import re
 import os
 from typing import Dict, Any
 from agent.base_tool import BaseTool
 from agent.schemas import TOOL_SCHEMAS, ToolType
-from .kb_agent import KBAgent
+from .index import DEFAULT_KB_PATH, get_kb_index
 
 class KnowledgeBaseTool(BaseTool):
     """Knowledge base lookup tool with smart AI search."""
     
     def __init__(self):
         super().__init__(TOOL_SCHEMAS[ToolType.KB])
-        # Initialize KB agent
-        api_key = os.getenv("GEMINI_API_KEY")
-        self.kb_agent = KBAgent(api_key) if api_key else None
+        self.index = get_kb_index(DEFAULT_KB_PATH)
+        # Optional semantic search over precomputed vectors (data/kb.npy)
+        self.vector_store = None
+        if os.getenv("KB_SEMANTIC_SEARCH", "false").lower() in ("1", "true", "yes"):
+            from .vectors import KBVectorStore
+            if KBVectorStore.available():
+                self.vector_store = KBVectorStore(DEFAULT_KB_PATH)
+        self._kb_agent = None
+    
+    @property
+    def kb_agent(self):
+        """KB agent for smart search, built on first use.
+
+        It asks the agent's provider for its model; without one it needs GEMINI_API_KEY.
+        """
+        if self._kb_agent is None:
+            api_key = os.getenv("GEMINI_API_KEY")
+            if self.provider is not None or api_key:
+                from .kb_agent import KBAgent
+                self._kb_agent = KBAgent(api_key, provider=self.provider)
+        return self._kb_agent
     
     def execute(self, args: Dict[str, Any], question: str = "") -> str:
         query = args["q"]
@@ -24,6 +40,12 @@ class KnowledgeBaseTool(BaseTool):
         if simple_result != "No entry found.":
             return simple_result
         
+        # Paraphrased questions can often be resolved from the vectors alone
+        if self.vector_store:
+            entry = self.vector_store.lookup(question or query)
+            if entry is not None:
+                return entry.get("summary", "")
+        
         # If simple search fails, use KB agent for smart search
         if self.kb_agent:
             return self.kb_agent.search(question or query)
@@ -31,18 +53,11 @@ class KnowledgeBaseTool(BaseTool):
         return "No entry found."
     
     def _simple_search(self, query: str) -> str:
-        """Original simple keyword search method."""
+        """Keyword search over the in-memory KB name index."""
         try:
-            cleaned_query = re.sub(r'^(who is|what is)\s+', '', query.lower(), flags=re.IGNORECASE).strip()
-            cleaned_query = re.sub(r'[^\w\s]', '', cleaned_query)
-            
-            with open("data/kb.json", "r") as f:
-                data = json.load(f)
-            
-            for item in data.get("entries", []):
-                if cleaned_query in item.get("name", "").lower():
-                    return item.get("summary", "")
-            
-            return "No entry found."
+            entry = self.index.lookup(query)
+            if entry is None:
+                return "No entry found."
+            return entry.get("summary", "")
         except Exception:
             return "No entry found."
\ No newline at end of file
@@ -0,0 +1,162 @@
+# agent/tools/kb/vectors.py
+"""
+Optional semantic search over the knowledge base.
+
+Entries are embedded with a deterministic hashed bag of words and character
+trigrams, computed offline into a .npy file next to the KB:
+
+    python -m agent.tools.kb.vectors data/kb.json
+
+At query time the file is memory-mapped and searched with a vectorized
+cosine top-k, so startup does not parse or embed anything.
+"""
+import os
+import sys
+import threading
+import zlib
+from typing import Any, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # semantic search is optional
+    np = None
+
+from .index import DEFAULT_KB_PATH, IndexSnapshot, KBIndex, get_kb_index, normalize_query, tokenize
+from .retrieval import STOP_WORDS
+
+DEFAULT_DIM = 256
+TRIGRAM_WEIGHT = 0.25
+
+
+def default_vectors_path(kb_file_path: str) -> str:
+    """data/kb.json -> data/kb.npy"""
+    return os.path.splitext(kb_file_path)[0] + ".npy"
+
+
+def _add_feature(vector, feature: str, weight: float):
+    h = zlib.crc32(feature.encode("utf-8"))
+    sign = 1.0 if h & 0x80000000 else -1.0
+    vector[h % len(vector)] += sign * weight
+
+
+def embed_text(text: str, dim: int = DEFAULT_DIM):
+    """Hash word and character-trigram features of text into a unit vector."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in tokenize(text):
+        if token in STOP_WORDS:
+            continue
+        _add_feature(vector, token, 1.0)
+        padded = f"#{token}#"
+        for i in range(len(padded) - 2):
+            _add_feature(vector, padded[i:i + 3], TRIGRAM_WEIGHT)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def build_vectors(kb_file_path: str = DEFAULT_KB_PATH, vectors_path: Optional[str] = None,
+                  dim: int = DEFAULT_DIM) -> str:
+    """Embed every KB entry and save the matrix as .npy. Returns the output path."""
+    if np is None:
+        raise RuntimeError("numpy is required to build KB vectors")
+
+    index = KBIndex(kb_file_path)
+    index.refresh()
+    matrix = np.zeros((len(index.entries), dim), dtype=np.float32)
+    for i, entry in enumerate(index.entries):
+        matrix[i] = embed_text(f"{entry.get('name', '')} {entry.get('summary', '')}", dim)
+
+    vectors_path = vectors_path or default_vectors_path(kb_file_path)
+    np.save(vectors_path, matrix)
+    return vectors_path
+
+
+class KBVectorStore:
+    """Memory-mapped KB embeddings searched with cosine similarity."""
+
+    def __init__(self, kb_file_path: str = DEFAULT_KB_PATH, vectors_path: Optional[str] = None):
+        self.index = get_kb_index(kb_file_path)
+        self.vectors_path = vectors_path or default_vectors_path(kb_file_path)
+        # (mapped matrix, file mtime), replaced together so readers never mix them
+        self._mapped: Optional[Tuple[Any, float]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available() -> bool:
+        return np is not None
+
+    def _load(self) -> Optional[Tuple[Any, float]]:
+        """Map the vectors file, remapping when it changes.
+
+        Returns (vectors, mtime), or None when unusable.
+        """
+        if np is None:
+            return None
+        try:
+            mtime = os.stat(self.vectors_path).st_mtime
+        except OSError:
+            return None
+        mapped = self._mapped
+        if mapped is None or mtime != mapped[1]:
+            with self._lock:
+                if self._mapped is None or mtime != self._mapped[1]:
+                    self._mapped = (np.load(self.vectors_path, mmap_mode="r"), mtime)
+                mapped = self._mapped
+        return mapped
+
+    def _current(self) -> Optional[Tuple[Any, IndexSnapshot]]:
+        """Vectors and the one KB snapshot they were built from, or None when stale.
+
+        Callers use both for the whole request, so a KB reload in between
+        cannot pair a search result with an entry from another version.
+        """
+        mapped = self._load()
+        if mapped is None:
+            return None
+        vectors, mtime = mapped
+        self.index.refresh()
+        snapshot = self.index.snapshot
+        if vectors.shape[0] != len(snapshot.entries) or mtime < (snapshot.mtime or 0.0):
+            return None
+        return vectors, snapshot
+
+    def is_stale(self) -> bool:
+        """True when the vectors are missing or were built from another KB version."""
+        return self._current() is None
+
+    @staticmethod
+    def _search(vectors, question: str, top_k: int) -> List[Tuple[int, float]]:
+        query = normalize_query(question)
+        q = embed_text(query, dim=vectors.shape[1])
+        if not q.any():
+            return []
+
+        scores = vectors @ q
+        top_k = min(top_k, len(scores))
+        if top_k == 0:
+            return []
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def search(self, question: str, top_k: int = 5) -> List[Tuple[int, float]]:
+        """Return up to top_k (entry index, cosine score) pairs, best first."""
+        current = self._current()
+        if current is None:
+            return []
+        return self._search(current[0], question, top_k)
+
+    def lookup(self, question: str, min_score: float = 0.2):
+        """Best matching entry if its similarity clears min_score, else None."""
+        current = self._current()
+        if current is None:
+            return None
+        vectors, snapshot = current
+        results = self._search(vectors, question, 1)
+        if not results or results[0][1] < min_score:
+            return None
+        return snapshot.entries[results[0][0]]
+
+
+if __name__ == "__main__":
+    kb_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_KB_PATH
+    print(f"Wrote {build_vectors(kb_path)}")
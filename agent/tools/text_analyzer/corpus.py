@@ -0,0 +1,128 @@
+# agent/tools/text_analyzer/corpus.py
+"""
+Corpus mode: analyze many text files across CPU cores.
+
+    python -m agent.tools.text_analyzer.corpus docs/ [--sentiment] [--workers 8]
+
+Files are grouped into shards of similar total size and each shard runs in a
+worker process (map), which streams its files through TextStats and returns
+per-document counters. The parent merges them into the corpus totals
+(reduce). Only counters cross process boundaries, never text.
+"""
+import argparse
+import heapq
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .stats import DEFAULT_CHUNK_SIZE, TextStats, read_chunks
+
+# (position in the input, stats or None, error or None)
+DocumentStats = Tuple[int, Optional[TextStats], Optional[str]]
+
+
+def _analyze_shard(documents: Sequence[Tuple[int, str]], sentiment: bool, chunk_size: int) -> List[DocumentStats]:
+    """Map step, run in a worker: stats for each (position, path) in a shard."""
+    results = []
+    for i, path in documents:
+        stats = TextStats(sentiment=sentiment)
+        try:
+            for chunk in read_chunks(path, chunk_size):
+                stats.feed(chunk)
+            results.append((i, stats.close(), None))
+        except OSError as e:
+            results.append((i, None, str(e)))
+    return results
+
+
+def make_shards(paths: Sequence[str], shards: int) -> List[List[Tuple[int, str]]]:
+    """Split (position, path) pairs into at most `shards` groups of similar total file size.
+
+    Largest files are placed first, each into the currently lightest shard,
+    so one huge file does not leave the other workers idle at the end.
+    """
+    def size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    heap = [(0, shard) for shard in range(max(1, min(shards, len(paths))))]
+    groups: List[List[Tuple[int, str]]] = [[] for _ in heap]
+    for file_size, i, path in sorted(((size(path), i, path) for i, path in enumerate(paths)), reverse=True):
+        load, shard = heapq.heappop(heap)
+        groups[shard].append((i, path))
+        heapq.heappush(heap, (load + file_size, shard))
+    return [group for group in groups if group]
+
+
+def analyze_corpus(paths: Iterable[str], analysis_type: str = "basic", workers: Optional[int] = None,
+                   shards_per_worker: int = 4, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """Analyze files in parallel and report per-document and aggregate results.
+
+    `workers` defaults to the CPU count; with one worker (or one file) the
+    files are analyzed in this process. Unreadable files are listed with an
+    "error" and left out of the totals.
+    """
+    paths = list(paths)
+    sentiment = analysis_type == "sentiment"
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(paths)) or 1
+
+    if workers == 1:
+        mapped = [_analyze_shard(list(enumerate(paths)), sentiment, chunk_size)]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        shards = make_shards(paths, workers * shards_per_worker)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            mapped = list(executor.map(_analyze_shard, shards, [sentiment] * len(shards),
+                                       [chunk_size] * len(shards)))
+
+    # Reduce: merge every document's counters into the corpus totals
+    documents: List[Dict[str, Any]] = [{}] * len(paths)
+    total = TextStats(sentiment=sentiment)
+    errors = 0
+    for shard in mapped:
+        for i, stats, error in shard:
+            if stats is None:
+                documents[i] = {"path": paths[i], "error": error}
+                errors += 1
+            else:
+                documents[i] = {"path": paths[i], **stats.result(analysis_type)}
+                total.merge(stats)
+
+    aggregate = total.result(analysis_type)
+    aggregate.update({"documents": len(paths) - errors, "errors": errors})
+    return {"aggregate": aggregate, "documents": documents}
+
+
+def collect_paths(targets: Iterable[str], suffixes: Tuple[str, ...] = (".txt", ".md")) -> List[str]:
+    """Files named directly plus files under directories with one of `suffixes`."""
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            for root, dirs, files in os.walk(target):
+                dirs.sort()
+                paths.extend(os.path.join(root, name) for name in sorted(files) if name.endswith(suffixes))
+        else:
+            paths.append(target)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze a corpus of text files in parallel.")
+    parser.add_argument("targets", nargs="+", help="files or directories (.txt/.md files are used)")
+    parser.add_argument("--sentiment", action="store_true", help="include sentiment tallies")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--aggregate-only", action="store_true", help="omit per-document results")
+    args = parser.parse_args()
+
+    report = analyze_corpus(collect_paths(args.targets), "sentiment" if args.sentiment else "basic",
+                            workers=args.workers)
+    if args.aggregate_only:
+        report = report["aggregate"]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
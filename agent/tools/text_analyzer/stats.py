@@ -0,0 +1,204 @@
+# agent/tools/text_analyzer/stats.py
+"""
+Streaming text statistics.
+
+TextStats consumes text in chunks of any size and keeps only running
+counters, so a document never has to be in memory at once. Each chunk is cut
+at its last whitespace and the tail carried into the next one; counting then
+works on whole tokens with str.split/str.count; sentiment looks up each
+distinct token in a weighted lexicon. A token longer than MAX_CARRY (base64,
+minified code, unspaced CJK text) is counted as it arrives instead of being
+carried, keeping only enough of its last word for the lexicon lookup.
+"""
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator
+
+# Weighted sentiment lexicon: positive words > 0, negative words < 0
+SENTIMENT_LEXICON: Dict[str, float] = {
+    "good": 1.0, "great": 1.5, "excellent": 2.0, "amazing": 2.0, "wonderful": 2.0,
+    "fantastic": 2.0, "love": 2.0, "loved": 2.0, "loves": 2.0, "like": 1.0, "liked": 1.0,
+    "likes": 1.0, "happy": 1.5, "joy": 1.5,
+    "bad": -1.0, "terrible": -2.0, "awful": -2.0, "horrible": -2.0, "hate": -2.0,
+    "hated": -2.0, "hates": -2.0, "dislike": -1.0, "disliked": -1.0, "dislikes": -1.0,
+    "sad": -1.0, "angry": -1.5, "disappointed": -1.5,
+}
+
+_WORD = re.compile(r"[a-z]+(?:'[a-z]+)*")
+_SPACE = re.compile(r"\s")
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+# Longest token carried whole between chunks; longer runs are counted piecewise
+MAX_CARRY = 1024
+
+
+class TextStats:
+    """Running word/character/sentence counts and sentiment tallies.
+
+    Counts match the classic definitions: words are whitespace-separated,
+    sentences are non-blank '.'-separated segments, and the no-spaces count
+    drops only ' ' characters. Sentiment looks up whole lowercase tokens in
+    SENTIMENT_LEXICON, so "dislike" never counts as "like".
+    """
+
+    def __init__(self, sentiment: bool = False, lexicon: Dict[str, float] = SENTIMENT_LEXICON):
+        self.sentiment = sentiment
+        self.lexicon = lexicon
+        self.words = 0
+        self.chars = 0
+        self.spaces = 0
+        self.sentences = 0
+        self.lexicon_hits: Counter = Counter()
+        self._carry = ""
+        # Whether the '.'-segment currently being read has non-blank text
+        self._open_sentence = False
+        # A long token is being counted piecewise; _word_tail is its possibly unfinished last word
+        self._in_run = False
+        self._word_tail = ""
+        self._max_word = max(map(len, lexicon), default=0)
+
+    def feed(self, chunk: str):
+        """Consume the next chunk of text."""
+        if self._in_run:
+            space = _SPACE.search(chunk)
+            end = space.start() if space else len(chunk)
+            self._count_run(chunk[:end])
+            if space is None:
+                return
+            self._end_run()
+            chunk = chunk[end:]
+
+        text = self._carry + chunk
+        if not text or text[-1].isspace():
+            cut = len(text)
+        else:
+            # Split after the last whitespace so no token straddles two chunks
+            cut = len(text) - len(text.rsplit(None, 1)[-1])
+        self._carry = text[cut:]
+        self._count(text[:cut])
+        if len(self._carry) > MAX_CARRY:
+            run, self._carry = self._carry, ""
+            self._count_run(run)
+
+    def _count_sentences(self, piece: str):
+        segments = piece.split(".")
+        open_sentence = self._open_sentence
+        for segment in segments[:-1]:
+            if open_sentence or segment.strip():
+                self.sentences += 1
+            open_sentence = False
+        self._open_sentence = open_sentence or bool(segments[-1].strip())
+
+    def _count(self, piece: str):
+        if not piece:
+            return
+        self.chars += len(piece)
+        self.spaces += piece.count(" ")
+        # Lowercasing never creates or removes whitespace, so one split serves both counts
+        tokens = piece.lower().split() if self.sentiment else piece.split()
+        self.words += len(tokens)
+        self._count_sentences(piece)
+
+        if self.sentiment:
+            # Tokenize each distinct whitespace token once, however often it occurs
+            lexicon, hits = self.lexicon, self.lexicon_hits
+            for token, n in Counter(tokens).items():
+                if token in lexicon:
+                    hits[token] += n
+                    continue
+                for word in _WORD.findall(token):
+                    if word in lexicon:
+                        hits[word] += n
+
+    def _count_run(self, piece: str):
+        """Count the next piece of a whitespace-free token too long to carry."""
+        self.chars += len(piece)
+        self._count_sentences(piece)
+        if not self._in_run:
+            self.words += 1
+            self._in_run = True
+        if not self.sentiment:
+            return
+        # Such a token is never a lexicon word itself, so only the words inside it count
+        text = self._word_tail + piece.lower()
+        last = None
+        for match in _WORD.finditer(text):
+            if last is not None and last.group() in self.lexicon:
+                self.lexicon_hits[last.group()] += 1
+            last = match
+        self._word_tail = ""
+        if last is not None:
+            rest = text[last.end():]
+            if rest in ("", "'"):
+                # The word may go on in the next piece. Past the longest lexicon
+                # word it can never match, so a placeholder of that length will do
+                word = last.group() if len(last.group()) <= self._max_word else "x" * (self._max_word + 1)
+                self._word_tail = word + rest
+            elif last.group() in self.lexicon:
+                self.lexicon_hits[last.group()] += 1
+
+    def _end_run(self):
+        for word in _WORD.findall(self._word_tail):
+            if word in self.lexicon:
+                self.lexicon_hits[word] += 1
+        self._in_run = False
+        self._word_tail = ""
+
+    def close(self) -> "TextStats":
+        """Count the carried tail; call once after the last chunk."""
+        if self._in_run:
+            self._end_run()
+        carry, self._carry = self._carry, ""
+        self._count(carry)
+        if self._open_sentence:
+            self.sentences += 1
+            self._open_sentence = False
+        return self
+
+    def merge(self, other: "TextStats") -> "TextStats":
+        """Add the counts of another closed TextStats (e.g. another document)."""
+        self.words += other.words
+        self.chars += other.chars
+        self.spaces += other.spaces
+        self.sentences += other.sentences
+        self.lexicon_hits.update(other.lexicon_hits)
+        return self
+
+    def result(self, analysis_type: str = "basic") -> Dict[str, Any]:
+        """Tool result dict; call after close()."""
+        result: Dict[str, Any] = {
+            "word_count": self.words,
+            "character_count": self.chars,
+            "character_count_no_spaces": self.chars - self.spaces,
+            "sentence_count": self.sentences,
+            "analysis_type": analysis_type,
+        }
+        if analysis_type == "sentiment":
+            positive = sum(n for word, n in self.lexicon_hits.items() if self.lexicon[word] > 0)
+            negative = sum(n for word, n in self.lexicon_hits.items() if self.lexicon[word] < 0)
+            score = sum(self.lexicon[word] * n for word, n in self.lexicon_hits.items())
+            result.update({
+                "sentiment": "positive" if score > 0 else "negative" if score < 0 else "neutral",
+                "sentiment_score": round(score, 3),
+                "positive_words_found": positive,
+                "negative_words_found": negative,
+            })
+        return result
+
+
+def analyze_chunks(chunks: Iterable[str], analysis_type: str = "basic") -> Dict[str, Any]:
+    """Analyze text given as an iterable of string chunks."""
+    stats = TextStats(sentiment=analysis_type == "sentiment")
+    for chunk in chunks:
+        stats.feed(chunk)
+    return stats.close().result(analysis_type)
+
+
+def read_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, encoding: str = "utf-8") -> Iterator[str]:
+    """Yield a text file's contents `chunk_size` characters at a time."""
+    with open(path, "r", encoding=encoding, errors="replace", newline="") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
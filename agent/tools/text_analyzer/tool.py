@@ -1,7 +1,8 @@
 # agent/tools/text_analyzer/tool.py
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Optional, Union
 from agent.base_tool import BaseTool
 from agent.schemas import TOOL_SCHEMAS, ToolType
+from .stats import DEFAULT_CHUNK_SIZE, analyze_chunks, read_chunks
 
 class TextAnalyzerTool(BaseTool):
     """Text analyzer for basic text statistics and sentiment analysis."""
@@ -9,44 +10,24 @@ class TextAnalyzerTool(BaseTool):
     def __init__(self):
         super().__init__(TOOL_SCHEMAS[ToolType.TEXT_ANALYZER])
     
+    def analyze(self, text: Union[str, Iterable[str]], analysis_type: str = "basic") -> Dict[str, Any]:
+        """Analyze a string, or an iterable of string chunks, in one pass."""
+        chunks = text
+        if isinstance(text, str):
+            # Sliced so per-chunk temporaries (token lists) stay small for huge strings
+            chunks = (text[i:i + DEFAULT_CHUNK_SIZE] for i in range(0, len(text), DEFAULT_CHUNK_SIZE))
+        return analyze_chunks(chunks, analysis_type)
+    
+    def analyze_file(self, path: str, analysis_type: str = "basic",
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+        """Analyze a text file `chunk_size` characters at a time, without loading it whole."""
+        return analyze_chunks(read_chunks(path, chunk_size), analysis_type)
+    
+    def analyze_corpus(self, paths: Iterable[str], analysis_type: str = "basic",
+                       workers: Optional[int] = None) -> Dict[str, Any]:
+        """Analyze many files across worker processes; see corpus.analyze_corpus."""
+        from .corpus import analyze_corpus
+        return analyze_corpus(paths, analysis_type, workers=workers)
+    
     def execute(self, args: Dict[str, Any], question: str = "") -> Dict[str, Any]:
-        text = args["text"]
-        analysis_type = args.get("analysis_type", "basic")
-        
-        # Basic analysis
-        word_count = len(text.split())
-        char_count = len(text)
-        char_count_no_spaces = len(text.replace(" ", ""))
-        sentence_count = len([s for s in text.split('.') if s.strip()])
-        
-        result = {
-            "word_count": word_count,
-            "character_count": char_count,
-            "character_count_no_spaces": char_count_no_spaces,
-            "sentence_count": sentence_count,
-            "analysis_type": analysis_type
-        }
-        
-        # Simple sentiment analysis if requested
-        if analysis_type == "sentiment":
-            positive_words = ["good", "great", "excellent", "amazing", "wonderful", "fantastic", "love", "like", "happy", "joy"]
-            negative_words = ["bad", "terrible", "awful", "horrible", "hate", "dislike", "sad", "angry", "disappointed"]
-            
-            text_lower = text.lower()
-            positive_count = sum(1 for word in positive_words if word in text_lower)
-            negative_count = sum(1 for word in negative_words if word in text_lower)
-            
-            if positive_count > negative_count:
-                sentiment = "positive"
-            elif negative_count > positive_count:
-                sentiment = "negative"
-            else:
-                sentiment = "neutral"
-            
-            result.update({
-                "sentiment": sentiment,
-                "positive_words_found": positive_count,
-                "negative_words_found": negative_count
-            })
-        
-        return result
\ No newline at end of file
+        return self.analyze(args["text"], args.get("analysis_type", "basic"))
@@ -2,14 +2,33 @@
 from typing import Dict, Any
 from agent.base_tool import BaseTool
 from agent.schemas import TOOL_SCHEMAS, ToolType
+from .units import get_unit_registry
+
+def _format(value: float, unit: str) -> str:
+    # Round away float noise (0.1 + 0.2 style) without hiding real precision
+    number = float(f"{value:.12g}")
+    return f"{number}{unit}" if unit.startswith("°") else f"{number} {unit}"
 
 class UnitConverterTool(BaseTool):
-    """Unit conversion tool."""
+    """Unit conversion tool backed by the precompiled unit registry."""
     
     def __init__(self):
         super().__init__(TOOL_SCHEMAS[ToolType.UNIT_CONVERTER])
+        self.registry = get_unit_registry()
     
-    def execute(self, args: Dict[str, Any], question: str = "") -> str:
-        celsius = float(args["celsius"])
-        fahrenheit = (celsius * 9 / 5) + 32
-        return f"{celsius}°C = {fahrenheit}°F"
\ No newline at end of file
+    def execute(self, args: Dict[str, Any], question: str = "") -> Any:
+        if args.get("celsius") is not None:
+            args = {"value": args["celsius"], "from_unit": "°C", "to_unit": "°F"}
+        from_unit, to_unit = args.get("from_unit"), args.get("to_unit")
+        if not from_unit or not to_unit:
+            raise ValueError("from_unit and to_unit are required")
+        from_unit, to_unit = from_unit.strip(), to_unit.strip()
+
+        if args.get("values") is not None:
+            results = self.registry.convert_many(args["values"], from_unit, to_unit)
+            return [float(r) for r in results]
+        if args.get("value") is None:
+            raise ValueError("value or values is required")
+        value = float(args["value"])
+        result = self.registry.convert(value, from_unit, to_unit)
+        return f"{_format(value, from_unit)} = {_format(result, to_unit)}"
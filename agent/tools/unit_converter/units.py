@@ -0,0 +1,297 @@
+# agent/tools/unit_converter/units.py
+"""
+Unit registry with a precompiled conversion graph.
+
+Units are declared as multiples of other units ("mi" = 1760 "yd", "L" =
+0.001 "m^3", "°F" = 5/9 "K" + 255.372...), which forms a graph rooted at the
+SI base units m, kg, s, bit and K. When the registry is built the graph is
+resolved once into a (factor, offset, dimension) triple per unit, and every
+pair of units with the same dimension gets a direct (scale, offset) entry, so
+a conversion is one dict lookup and one multiply-add. Compound units such as
+km/h, m/s^2 or GiB/s are parsed from their parts on first use and cached.
+"""
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # batch conversion falls back to a list comprehension
+    np = None
+
+# Exponents of (length, mass, time, data, temperature)
+Dimension = Tuple[int, int, int, int, int]
+_BASE_DIMENSIONS: Dict[str, Dimension] = {
+    "m": (1, 0, 0, 0, 0),
+    "kg": (0, 1, 0, 0, 0),
+    "s": (0, 0, 1, 0, 0),
+    "bit": (0, 0, 0, 1, 0),
+    "K": (0, 0, 0, 0, 1),
+}
+DIMENSION_NAMES: Dict[Dimension, str] = {
+    (1, 0, 0, 0, 0): "length",
+    (2, 0, 0, 0, 0): "area",
+    (3, 0, 0, 0, 0): "volume",
+    (0, 1, 0, 0, 0): "mass",
+    (0, 0, 1, 0, 0): "time",
+    (0, 0, 0, 1, 0): "data size",
+    (0, 0, 0, 0, 1): "temperature",
+    (1, 0, -1, 0, 0): "speed",
+    (1, 0, -2, 0, 0): "acceleration",
+    (0, 0, -1, 1, 0): "data rate",
+}
+
+# (aliases, factor, reference unit, offset): 1 unit = factor * reference + offset.
+# The first alias is the canonical symbol. Case-insensitive lookups prefer
+# units listed earlier, so bytes come before bits ("mb" means megabyte);
+# UnitRegistry.is_ambiguous reports names that depend on that choice.
+DEFINITIONS: List[Tuple[Sequence[str], float, Optional[str], float]] = [
+    # length
+    (("m", "meter", "meters", "metre", "metres"), 1.0, None, 0.0),
+    (("km", "kilometer", "kilometers", "kilometre", "kilometres"), 1000.0, "m", 0.0),
+    (("cm", "centimeter", "centimeters", "centimetre", "centimetres"), 0.01, "m", 0.0),
+    (("mm", "millimeter", "millimeters", "millimetre", "millimetres"), 0.001, "m", 0.0),
+    (("µm", "um", "micrometer", "micrometers", "micron", "microns"), 1e-6, "m", 0.0),
+    (("nm", "nanometer", "nanometers", "nanometre", "nanometres"), 1e-9, "m", 0.0),
+    (("in", "inch", "inches", '"'), 0.0254, "m", 0.0),
+    (("ft", "foot", "feet", "'"), 12.0, "in", 0.0),
+    (("yd", "yard", "yards"), 3.0, "ft", 0.0),
+    (("mi", "mile", "miles"), 1760.0, "yd", 0.0),
+    (("nmi", "nautical mile", "nautical miles"), 1852.0, "m", 0.0),
+    # mass
+    (("kg", "kilogram", "kilograms", "kilo", "kilos"), 1.0, None, 0.0),
+    (("g", "gram", "grams"), 0.001, "kg", 0.0),
+    (("mg", "milligram", "milligrams"), 0.001, "g", 0.0),
+    (("µg", "ug", "microgram", "micrograms"), 1e-6, "g", 0.0),
+    (("t", "tonne", "tonnes", "metric ton", "metric tons"), 1000.0, "kg", 0.0),
+    (("lb", "lbs", "pound", "pounds"), 0.45359237, "kg", 0.0),
+    (("oz", "ounce", "ounces"), 1 / 16, "lb", 0.0),
+    (("st", "stone", "stones"), 14.0, "lb", 0.0),
+    # volume
+    (("L", "l", "liter", "liters", "litre", "litres"), 0.001, "m^3", 0.0),
+    (("mL", "ml", "milliliter", "milliliters", "millilitre", "millilitres"), 0.001, "L", 0.0),
+    (("cL", "cl", "centiliter", "centiliters", "centilitre", "centilitres"), 0.01, "L", 0.0),
+    (("dL", "dl", "deciliter", "deciliters", "decilitre", "decilitres"), 0.1, "L", 0.0),
+    (("cc",), 1.0, "cm^3", 0.0),
+    (("gal", "gallon", "gallons", "us gallon", "us gallons"), 3.785411784, "L", 0.0),
+    (("qt", "quart", "quarts"), 0.25, "gal", 0.0),
+    (("pt", "pint", "pints"), 0.5, "qt", 0.0),
+    (("cup", "cups"), 0.5, "pt", 0.0),
+    (("fl oz", "floz", "fluid ounce", "fluid ounces"), 0.125, "cup", 0.0),
+    (("tbsp", "tablespoon", "tablespoons"), 0.5, "fl oz", 0.0),
+    (("tsp", "teaspoon", "teaspoons"), 1 / 3, "tbsp", 0.0),
+    (("imp gal", "imperial gallon", "imperial gallons"), 4.54609, "L", 0.0),
+    # time
+    (("s", "sec", "secs", "second", "seconds"), 1.0, None, 0.0),
+    (("ms", "millisecond", "milliseconds"), 0.001, "s", 0.0),
+    (("µs", "us", "microsecond", "microseconds"), 1e-6, "s", 0.0),
+    (("ns", "nanosecond", "nanoseconds"), 1e-9, "s", 0.0),
+    (("min", "mins", "minute", "minutes"), 60.0, "s", 0.0),
+    (("h", "hr", "hrs", "hour", "hours"), 60.0, "min", 0.0),
+    (("d", "day", "days"), 24.0, "h", 0.0),
+    (("wk", "week", "weeks"), 7.0, "d", 0.0),
+    (("yr", "year", "years"), 365.25, "d", 0.0),
+    # data size: bytes before bits, SI before binary prefixes
+    (("B", "byte", "bytes"), 8.0, "bit", 0.0),
+    (("kB", "KB", "kilobyte", "kilobytes"), 1000.0, "B", 0.0),
+    (("MB", "megabyte", "megabytes"), 1000.0, "kB", 0.0),
+    (("GB", "gigabyte", "gigabytes"), 1000.0, "MB", 0.0),
+    (("TB", "terabyte", "terabytes"), 1000.0, "GB", 0.0),
+    (("PB", "petabyte", "petabytes"), 1000.0, "TB", 0.0),
+    (("KiB", "kibibyte", "kibibytes"), 1024.0, "B", 0.0),
+    (("MiB", "mebibyte", "mebibytes"), 1024.0, "KiB", 0.0),
+    (("GiB", "gibibyte", "gibibytes"), 1024.0, "MiB", 0.0),
+    (("TiB", "tebibyte", "tebibytes"), 1024.0, "GiB", 0.0),
+    (("PiB", "pebibyte", "pebibytes"), 1024.0, "TiB", 0.0),
+    (("bit", "bits"), 1.0, None, 0.0),
+    (("kbit", "Kb", "kilobit", "kilobits"), 1000.0, "bit", 0.0),
+    (("Mbit", "Mb", "megabit", "megabits"), 1000.0, "kbit", 0.0),
+    (("Gbit", "Gb", "gigabit", "gigabits"), 1000.0, "Mbit", 0.0),
+    (("Tbit", "Tb", "terabit", "terabits"), 1000.0, "Gbit", 0.0),
+    # temperature
+    (("K", "kelvin", "kelvins"), 1.0, None, 0.0),
+    (("°C", "C", "degC", "celsius", "centigrade"), 1.0, "K", 273.15),
+    (("°F", "F", "degF", "fahrenheit"), 5 / 9, "K", 459.67 * 5 / 9),
+    (("°R", "R", "degR", "rankine"), 5 / 9, "K", 0.0),
+    # named compound units
+    (("kph", "kmh", "kmph"), 1.0, "km/h", 0.0),
+    (("mph",), 1.0, "mi/h", 0.0),
+    (("kn", "kt", "knot", "knots"), 1.0, "nmi/h", 0.0),
+    (("bps",), 1.0, "bit/s", 0.0),
+    (("kbps",), 1.0, "kbit/s", 0.0),
+    (("Mbps",), 1.0, "Mbit/s", 0.0),
+    (("Gbps",), 1.0, "Gbit/s", 0.0),
+]
+
+_EXPONENT = re.compile(r"^(?P<name>.+?)(?:\^|\*\*)?(?P<power>-?\d+)$")
+_SUPERSCRIPTS = str.maketrans({"²": "^2", "³": "^3"})
+
+
+@dataclass(frozen=True)
+class Unit:
+    """A unit resolved to the SI base: base value = value * factor + offset."""
+    symbol: str
+    factor: float
+    offset: float
+    dimension: Dimension
+
+    @property
+    def kind(self) -> str:
+        return DIMENSION_NAMES.get(self.dimension, "compound")
+
+
+@dataclass(frozen=True)
+class Conversion:
+    """Direct conversion between two units: to = from * scale + offset."""
+    scale: float
+    offset: float
+
+    def __call__(self, value: float) -> float:
+        return value * self.scale + self.offset
+
+
+def _normalize(text: str) -> str:
+    text = " ".join(text.strip().translate(_SUPERSCRIPTS).split())
+    text = re.sub(r"^(?:degrees?|deg)\s+(?=[a-z])", "", text, flags=re.IGNORECASE)
+    text = re.sub(r"\s+per\s+", "/", text, flags=re.IGNORECASE)
+    text = re.sub(r"^(square|sq|cubic)\s+(.+)$",
+                  lambda m: f"{m[2]}^{3 if m[1].lower() == 'cubic' else 2}", text, flags=re.IGNORECASE)
+    return re.sub(r"\s*([/*·])\s*", r"\1", text)
+
+
+class UnitRegistry:
+    """Resolves unit names and converts between compatible units."""
+
+    def __init__(self, definitions=DEFINITIONS):
+        self._definitions: Dict[str, Tuple[float, Optional[str], float]] = {}
+        self._aliases: Dict[str, str] = {}
+        self._folded: Dict[str, str] = {}
+        # Lowercase names shared by different units ("mb": MB or Mb)
+        self._ambiguous: Set[str] = set()
+        for aliases, factor, reference, offset in definitions:
+            symbol = aliases[0]
+            self._definitions[symbol] = (factor, reference, offset)
+            for alias in aliases:
+                self._aliases[alias] = symbol
+                if self._folded.setdefault(alias.lower(), symbol) != symbol:
+                    self._ambiguous.add(alias.lower())
+
+        # Resolve the definition graph down to the base units
+        self.units: Dict[str, Unit] = {}
+        for symbol in self._definitions:
+            self._resolve(symbol, ())
+
+        # Direct scale/offset for every same-dimension pair
+        by_dimension: Dict[Dimension, List[Unit]] = {}
+        for unit in self.units.values():
+            by_dimension.setdefault(unit.dimension, []).append(unit)
+        self.pairs: Dict[Tuple[str, str], Conversion] = {
+            (a.symbol, b.symbol): self._direct(a, b)
+            for units in by_dimension.values() for a in units for b in units
+        }
+        self.conversion = lru_cache(maxsize=4096)(self._conversion)
+
+    def _resolve(self, symbol: str, path: Tuple[str, ...]) -> Unit:
+        unit = self.units.get(symbol)
+        if unit is not None:
+            return unit
+        if symbol in path:
+            raise ValueError(f"Circular unit definition: {' -> '.join(path + (symbol,))}")
+        factor, reference, offset = self._definitions[symbol]
+        if reference is None:
+            unit = Unit(symbol, factor, offset, _BASE_DIMENSIONS[symbol])
+        else:
+            base = self._parse(reference, path + (symbol,))
+            unit = Unit(symbol, factor * base.factor, offset * base.factor + base.offset, base.dimension)
+        self.units[symbol] = unit
+        return unit
+
+    def _lookup(self, name: str, path: Tuple[str, ...] = ()) -> Optional[Unit]:
+        symbol = self._aliases.get(name) or self._folded.get(name.lower())
+        if symbol is None:
+            return None
+        return self.units.get(symbol) or self._resolve(symbol, path)
+
+    def _parse(self, text: str, path: Tuple[str, ...] = ()) -> Unit:
+        """Unit for a name or a compound like 'km/h', 'm/s^2' or 'kg*m'."""
+        unit = self._lookup(text, path)
+        if unit is not None:
+            return unit
+
+        factor, dimension, parts = 1.0, [0] * 5, text.split("/")
+        for i, part in enumerate(parts):
+            sign = 1 if i == 0 else -1
+            for term in re.split(r"[*·]", part):
+                power, unit = 1, self._lookup(term, path)
+                if unit is None:
+                    match = _EXPONENT.match(term)
+                    unit = self._lookup(match["name"], path) if match else None
+                    if unit is None:
+                        raise ValueError(f"Unknown unit: {text!r}")
+                    power = int(match["power"])
+                if unit.offset:
+                    raise ValueError(f"{unit.symbol} has an offset and cannot be part of a compound unit")
+                factor *= unit.factor ** (sign * power)
+                for axis, exponent in enumerate(unit.dimension):
+                    dimension[axis] += sign * power * exponent
+        return Unit(text, factor, 0.0, tuple(dimension))
+
+    def parse(self, text: str) -> Unit:
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError("Unit must be a non-empty string")
+        return self._parse(_normalize(text))
+
+    def is_ambiguous(self, text: str) -> bool:
+        """Whether the unit only resolves case-insensitively to a name several
+        units share, e.g. "mb" (megabyte or megabit) or "kb/s"."""
+        text = _normalize(text)
+        if text in self._aliases or text.lower() in self._folded:
+            return text not in self._aliases and text.lower() in self._ambiguous
+        for term in re.split(r"[/*·]", text):
+            match = _EXPONENT.match(term)
+            for name in (term, match["name"]) if match else (term,):
+                if name in self._aliases:
+                    break
+                if name.lower() in self._folded:
+                    if name.lower() in self._ambiguous:
+                        return True
+                    break
+        return False
+
+    @staticmethod
+    def _direct(source: Unit, target: Unit) -> Conversion:
+        return Conversion(source.factor / target.factor, (source.offset - target.offset) / target.factor)
+
+    def _conversion(self, from_unit: str, to_unit: str) -> Conversion:
+        source, target = self.parse(from_unit), self.parse(to_unit)
+        if source.dimension != target.dimension:
+            raise ValueError(f"Cannot convert {from_unit} ({source.kind}) to {to_unit} ({target.kind})")
+        return self.pairs.get((source.symbol, target.symbol)) or self._direct(source, target)
+
+    def convert(self, value: float, from_unit: str, to_unit: str) -> float:
+        return self.conversion(from_unit, to_unit)(float(value))
+
+    def convert_many(self, values, from_unit: str, to_unit: str):
+        """Convert a sequence or NumPy array in one vectorized multiply-add.
+
+        Returns a float64 array with NumPy, otherwise a list.
+        """
+        conversion = self.conversion(from_unit, to_unit)
+        if np is None:
+            return [value * conversion.scale + conversion.offset for value in values]
+        return np.asarray(values, dtype=np.float64) * conversion.scale + conversion.offset
+
+
+_shared_registry: Optional[UnitRegistry] = None
+_shared_lock = threading.Lock()
+
+
+def get_unit_registry() -> UnitRegistry:
+    """Return the process-wide unit registry, building it on first use."""
+    global _shared_registry
+    with _shared_lock:
+        if _shared_registry is None:
+            _shared_registry = UnitRegistry()
+        return _shared_registry
@@ -1,52 +1,96 @@
 # agent/tools/weather/tool.py
+import logging
 import os
-import requests
 from typing import Dict, Any
 from agent.base_tool import BaseTool
+from agent.cache import TTLCache
 from agent.schemas import TOOL_SCHEMAS, ToolType
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEATHER_API_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+def normalize_city(city: str) -> str:
+    """Cache key for a city: case-folded with whitespace collapsed."""
+    return " ".join(city.split()).casefold()
+
+def format_weather(weather_data: Dict[str, Any]) -> str:
+    """Local template used to phrase weather data without a model call."""
+    return (
+        f"The temperature in {weather_data['city'].title()} is "
+        f"{weather_data['temp']}°C with {weather_data['description']}."
+    )
+
 class WeatherTool(BaseTool):
     """Weather tool for getting weather information."""
-    
+
     def __init__(self):
         super().__init__(TOOL_SCHEMAS[ToolType.WEATHER])
-    
-    def execute(self, args: Dict[str, Any], question: str = "") -> str:
-        city = args["city"]
+        self.api_url = os.getenv("WEATHER_API_URL", DEFAULT_WEATHER_API_URL)
+        # Same few hundred cities make up most traffic; keep provider calls down
+        self.cache = TTLCache(
+            max_size=int(os.getenv("WEATHER_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("WEATHER_CACHE_TTL", "600")),
+        )
+        # A second model call just for phrasing doubles latency; make it opt-in
+        self.llm_phrasing = os.getenv("WEATHER_LLM_PHRASING", "false").lower() in ("1", "true", "yes")
+        self._phrasing_model = None
+
+    def _fetch_weather(self, city: str) -> Dict[str, Any]:
+        """Fetch current weather for a city from OpenWeatherMap."""
         api_key = os.getenv("WEATHER_API_KEY")
-        
+
         if not api_key:
             raise Exception("WEATHER_API_KEY not set in .env file")
-        
-        url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
-        response = requests.get(url, timeout=5)
+
+        params = {"q": city, "appid": api_key, "units": "metric"}
+        response = self.http.get(self.api_url, params=params)
         response.raise_for_status()
         data = response.json()
-        
-        weather_data = {
+
+        return {
             "temp": data["main"]["temp"],
-            "description": data["weather"][0]["description"].lower(),
-            "city": city
+            "description": data["weather"][0]["description"].lower()
         }
-        
-        # Generate natural response using question context
-        if question:
+
+    def get_weather(self, city: str) -> Dict[str, Any]:
+        """Weather data for a city, served from cache when fresh."""
+        key = normalize_city(city)
+        weather_data = self.cache.get_or_load(key, lambda: self._fetch_weather(key))
+        return {**weather_data, "city": city}
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters of the weather cache."""
+        return self.cache.stats()
+
+    def _get_phrasing_model(self):
+        """Model used for optional LLM phrasing, from the agent's provider or the model pool."""
+        if self._phrasing_model is None:
+            if self.provider is not None:
+                self._phrasing_model = self.provider.model("weather")
+            else:
+                from agent.models import get_model_pool
+                self._phrasing_model = get_model_pool().get("weather")
+        return self._phrasing_model
+
+    def phrase(self, weather_data: Dict[str, Any], question: str = "") -> str:
+        """Turn weather data into an answer; uses the LLM only when opted in."""
+        if question and self.llm_phrasing:
             try:
-                import google.generativeai as genai
-                response_model = genai.GenerativeModel(model_name="gemini-1.5-flash")
                 prompt = (
-                    f"User asked: '{question}'. Weather data for {city}: "
+                    f"User asked: '{question}'. Weather data for {weather_data['city']}: "
                     f"temperature is {weather_data['temp']}°C, description is '{weather_data['description']}'. "
                     f"Generate a natural response addressing the user's prompt using this weather data."
                 )
-                
-                weather_response = response_model.generate_content(prompt)
-                return getattr(weather_response, "text", None) or (
-                    f"The temperature in {city.title()} is {weather_data['temp']}°C with {weather_data['description']}."
-                )
+                weather_response = self._get_phrasing_model().generate_content(prompt)
+                text = getattr(weather_response, "text", None)
+                if text:
+                    return text
             except Exception as e:
-                print(f"DEBUG: Error generating weather response: {str(e)}")
-                return f"The temperature in {city.title()} is {weather_data['temp']}°C with {weather_data['description']}."
-        
-        # Fallback to simple response
-        return f"The temperature in {city.title()} is {weather_data['temp']}°C with {weather_data['description']}."
\ No newline at end of file
+                logger.warning("Weather phrasing failed, using the template: %s", e)
+
+        return format_weather(weather_data)
+
+    def execute(self, args: Dict[str, Any], question: str = "") -> str:
+        weather_data = self.get_weather(args["city"])
+        return self.phrase(weather_data, question)
@@ -0,0 +1,73 @@
+# benchmarks/bench_corpus.py
+"""
+Scaling of the parallel text analyzer corpus mode with worker count.
+
+    python benchmarks/bench_corpus.py [--files 400] [--kb-per-file 250] [--workers 1,2,4,8]
+
+Writes a synthetic corpus to a temporary directory, then analyzes it with
+each worker count (best of --runs) and reports throughput, speedup over the
+first worker count and parallel efficiency. Every run must produce identical totals.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_suite import synthetic_text
+
+
+def write_corpus(directory: str, files: int, chars: int):
+    paths = []
+    for i in range(files):
+        path = os.path.join(directory, f"doc{i:05d}.txt")
+        with open(path, "w") as f:
+            # Vary sizes so the shard balancing has something to do
+            f.write(synthetic_text(chars // 2 + (i * 7919) % chars, seed=i))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--kb-per-file", type=int, default=250, help="average file size in KB (about)")
+    cpus = os.cpu_count() or 1
+    default_workers = ",".join(str(n) for n in sorted({1, 2, 4, 8, cpus}) if n <= cpus)
+    parser.add_argument("--workers", default=default_workers, help="comma-separated worker counts")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--sentiment", action="store_true")
+    args = parser.parse_args()
+
+    from agent.tools.text_analyzer.corpus import analyze_corpus
+
+    analysis = "sentiment" if args.sentiment else "basic"
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_corpus(tmp, args.files, args.kb_per_file * 1000)
+        megabytes = sum(os.path.getsize(path) for path in paths) / 1e6
+        print(f"corpus: {len(paths)} files, {megabytes:.0f} MB, {cpus} CPUs, {analysis} analysis")
+        print(f"{'workers':>8}{'seconds':>10}{'MB/s':>10}{'speedup':>10}{'efficiency':>12}")
+
+        baseline, expected = None, None
+        for workers in (int(n) for n in args.workers.split(",")):
+            best = float("inf")
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                report = analyze_corpus(paths, analysis, workers=workers)
+                best = min(best, time.perf_counter() - start)
+            if expected is None:
+                expected = report["aggregate"]
+            assert report["aggregate"] == expected, "totals differ between worker counts"
+            if baseline is None:
+                # Speedup is relative to the first worker count (1 by default)
+                baseline = (best, workers)
+            speedup = baseline[0] / best
+            efficiency = speedup / (workers / baseline[1])
+            print(f"{workers:>8}{best:>10.2f}{megabytes / best:>10.1f}{speedup:>10.2f}{efficiency:>12.0%}")
+
+
+if __name__ == "__main__":
+    main()
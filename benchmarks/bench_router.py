@@ -0,0 +1,140 @@
+# benchmarks/bench_router.py
+"""
+Accuracy and latency of the local intent router on a labelled question set.
+
+    python benchmarks/bench_router.py [--model-ms 600] [--runs 3]
+
+Reports how many questions are routed locally (hit rate), whether they went
+to the right tool (precision), the router's own cost per question, and the
+end-to-end time of Agent.answer with and without the router against a fake
+model that sleeps --model-ms per call to stand in for a Gemini round trip.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# (question, tool the question should be routed to, or None for the model)
+LABELLED = [
+    ("15 + 25", "calc"),
+    ("What is 15 + 25?", "calc"),
+    ("what's 2^10", "calc"),
+    ("calculate (3 + 4) * 12", "calc"),
+    ("What is 12.5% of 243?", "calc"),
+    ("compute 1000 / 8 - 3", "calc"),
+    ("7 * 6 =", "calc"),
+    ("Convert 25 Celsius to Fahrenheit", "unit_converter"),
+    ("100 c to f", "unit_converter"),
+    ("convert -40 degrees celsius into fahrenheit", "unit_converter"),
+    ("What's the weather in London?", "weather"),
+    ("weather in new york right now", "weather"),
+    ("How's the weather like in Paris today?", "weather"),
+    ("Who is Ada Lovelace?", None),
+    ("Tell me about Alan Turing", None),
+    ("Summarize today's weather in Paris in 3 words", None),
+    ("Add 10 to the average temperature in Paris and London right now.", None),
+    ("Analyze the sentiment of: I love this product", None),
+    ("What is the square root of the number of planets?", None),
+    ("2024", None),
+    ("hello", None),
+    ("Write a haiku about numbers", None),
+    ("What is 5 plus 7?", None),
+    ("Is it warmer in Paris or Rome?", None),
+]
+
+
+class SleepyModel:
+    """Stands in for Gemini: every call costs `delay` seconds and returns text."""
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        content = SimpleNamespace(parts=[SimpleNamespace(function_call=None, text="ok")])
+        return SimpleNamespace(candidates=[SimpleNamespace(content=content)], text="ok")
+
+
+def accuracy(router):
+    routed = correct = false_routes = 0
+    for question, expected in LABELLED:
+        route = router.route(question)
+        if route is None:
+            continue
+        routed += 1
+        if route.tool == expected:
+            correct += 1
+        elif expected is None:
+            false_routes += 1
+    routable = sum(1 for _, expected in LABELLED if expected)
+    return {
+        "questions": len(LABELLED),
+        "routed": routed,
+        "precision": correct / routed if routed else 0.0,
+        "recall": correct / routable if routable else 0.0,
+        "false_routes": false_routes,
+    }
+
+
+def router_cost_us(router, runs: int) -> float:
+    questions = [q for q, _ in LABELLED]
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for question in questions:
+            router.route(question)
+        timings.append((time.perf_counter() - start) / len(questions) * 1e6)
+    return statistics.median(timings)
+
+
+def end_to_end(model_ms: float, use_router: bool):
+    from agent.agent import Agent
+    from agent.router import IntentRouter
+
+    agent = Agent(api_key="bench_key")
+    agent.router = IntentRouter() if use_router else None
+    agent.model = SleepyModel(model_ms / 1000)
+
+    # Weather routes would hit the network; keep the timing pass offline
+    questions = [q for q, expected in LABELLED if expected != "weather"]
+    start = time.perf_counter()
+    for question in questions:
+        agent.answer(question)
+    return time.perf_counter() - start, agent.model.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model-ms", type=float, default=600.0,
+                        help="simulated model round trip in milliseconds")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    import contextlib
+    import io
+    from agent.router import IntentRouter
+
+    router = IntentRouter()
+    stats = accuracy(router)
+    print(f"labelled questions   {stats['questions']}")
+    print(f"routed locally       {stats['routed']} (hit rate {stats['routed'] / stats['questions']:.0%})")
+    print(f"precision            {stats['precision']:.0%}")
+    print(f"recall               {stats['recall']:.0%}")
+    print(f"false routes         {stats['false_routes']}")
+    print(f"router cost          {router_cost_us(IntentRouter(), args.runs * 100):.1f} us/question")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        without_s, without_calls = end_to_end(args.model_ms, use_router=False)
+        with_s, with_calls = end_to_end(args.model_ms, use_router=True)
+    print(f"answer() w/o router  {without_s:.2f} s ({without_calls} model calls)")
+    print(f"answer() w/ router   {with_s:.2f} s ({with_calls} model calls)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/bench_server.py
+"""
+Load test of the multi-session chat server with the offline fake model.
+
+    python benchmarks/bench_server.py [--sessions 500] [--messages 5] [--model-ms 200]
+
+Each simulated user holds one keep-alive connection and sends --messages
+messages in its own session. Reports throughput, latency percentiles and how
+many requests were shed by backpressure (429/503).
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+async def user(port: int, session: str, messages: int, latencies: list, statuses: Counter):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for i in range(messages):
+            body = json.dumps({"session": session, "message": f"message {i}"}).encode()
+            start = time.perf_counter()
+            writer.write(b"POST /chat HTTP/1.1\r\nHost: bench\r\n"
+                         + f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line == b"\r\n":
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+async def run(args):
+    from agent.llm import FakeProvider
+    from agent.server import ChatServer, agent_factory
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        factory = agent_factory(FakeProvider(latency=args.model_ms / 1000))
+    server = ChatServer(factory, max_sessions=args.max_sessions, max_inflight=args.max_inflight,
+                        max_pending=args.max_pending)
+    _, port = await server.start(port=0)
+
+    latencies, statuses = [], Counter()
+    start = time.perf_counter()
+    await asyncio.gather(*(user(port, f"user{i}", args.messages, latencies, statuses)
+                           for i in range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    stats = server.stats()
+    await server.stop()
+    return elapsed, latencies, statuses, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=5, help="messages per session")
+    parser.add_argument("--model-ms", type=float, default=200.0, help="simulated model latency")
+    parser.add_argument("--max-inflight", type=int, default=256)
+    parser.add_argument("--max-pending", type=int, default=1024)
+    parser.add_argument("--max-sessions", type=int, default=1000)
+    args = parser.parse_args()
+
+    elapsed, latencies, statuses, stats = asyncio.run(run(args))
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+
+    print(f"requests        {len(latencies)} in {elapsed:.2f} s ({len(latencies) / elapsed:.0f} req/s)")
+    print(f"latency ms      p50 {pct(50):.1f}  p95 {pct(95):.1f}  p99 {pct(99):.1f}  "
+          f"mean {statistics.mean(latencies) * 1000:.1f}")
+    print(f"statuses        {dict(sorted(statuses.items()))}")
+    print(f"sessions        {stats['sessions']} live, {stats['evicted']} evicted")
+
+
+if __name__ == "__main__":
+    main()
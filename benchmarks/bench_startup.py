@@ -0,0 +1,60 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start cost of tool registration, measured in fresh interpreters.
+
+    python benchmarks/bench_startup.py [--runs 10]
+
+Compares the lazy registry used by ToolManager with eagerly importing and
+instantiating every tool (the old discover_tools() path).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "import agent.tools": "import agent.tools",
+    "ToolManager() (lazy)": (
+        "from agent.tool_manager import ToolManager; ToolManager()"
+    ),
+    "discover + instantiate (eager)": (
+        "from agent.tools import discover_tools; [cls() for cls in discover_tools()]"
+    ),
+}
+
+TIMER = (
+    "import time, io, contextlib; _t = time.perf_counter()\n"
+    "with contextlib.redirect_stdout(io.StringIO()):\n"
+    "    {stmt}\n"
+    "print((time.perf_counter() - _t) * 1000)"
+)
+
+
+def measure(stmt: str, runs: int) -> list:
+    """Wall-clock milliseconds of stmt, each run in a fresh interpreter."""
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", TIMER.format(stmt=stmt)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        timings.append(float(out.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<34}{'median ms':>12}{'min ms':>10}")
+    for name, stmt in SCENARIOS.items():
+        timings = measure(stmt, args.runs)
+        print(f"{name:<34}{statistics.median(timings):>12.1f}{min(timings):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/bench_stream.py
+"""
+Time to first token of Agent.answer vs Agent.answer_stream.
+
+    python benchmarks/bench_stream.py [--chunks 20] [--chunk-ms 40] [--runs 5]
+
+A fake model streams --chunks text chunks, one every --chunk-ms, standing in
+for Gemini's generate_content(stream=True). answer() can only show text once
+the last chunk is in; answer_stream() shows the first chunk as soon as it
+arrives.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _response(text):
+    content = SimpleNamespace(parts=[SimpleNamespace(function_call=None, text=text)])
+    return SimpleNamespace(candidates=[SimpleNamespace(content=content)], text=text)
+
+
+class StreamingModel:
+    def __init__(self, chunks: int, delay: float):
+        self.chunks = chunks
+        self.delay = delay
+
+    def _stream(self):
+        for i in range(self.chunks):
+            time.sleep(self.delay)
+            yield _response(f"word{i} ")
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        if stream:
+            return self._stream()
+        chunks = list(self._stream())
+        return _response("".join(chunk.text for chunk in chunks))
+
+
+def measure(agent, streaming: bool):
+    """(time to first text, total time) in milliseconds."""
+    start = time.perf_counter()
+    if streaming:
+        first = None
+        for _ in agent.answer_stream("Tell me a story"):
+            if first is None:
+                first = time.perf_counter() - start
+    else:
+        agent.answer("Tell me a story")
+        first = time.perf_counter() - start
+    return first * 1000, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--chunk-ms", type=float, default=40.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    import contextlib
+    import io
+    from agent.agent import Agent
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = Agent(api_key="bench_key")
+    agent.router = None
+    agent.model = StreamingModel(args.chunks, args.chunk_ms / 1000)
+
+    print(f"{'mode':<16}{'first text ms':>15}{'total ms':>12}")
+    for name, streaming in (("answer", False), ("answer_stream", True)):
+        timings = [measure(agent, streaming) for _ in range(args.runs)]
+        first = statistics.median(t[0] for t in timings)
+        total = statistics.median(t[1] for t in timings)
+        print(f"{name:<16}{first:>15.1f}{total:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+# benchmarks/bench_suite.py
+"""
+Offline latency and throughput suite for every tool and the agent loop.
+
+    python benchmarks/bench_suite.py [--only kb] [--kb-sizes 1000,100000,1000000]
+                                     [--out results.json] [--compare old.json]
+
+Each case is warmed up, then timed in --repeat samples of enough iterations
+to last at least --min-time seconds; the report gives the median, p95 and
+spread per call plus throughput. Cases cover CalculatorTool,
+TextAnalyzerTool, UnitConverterTool, KnowledgeBaseTool on synthetic KBs,
+ToolManager startup (in-process and in fresh interpreters) and Agent.answer
+against the offline fake model. No network or API key is used.
+
+Results are written as JSON (default .cache/bench/<commit>.json); pass an
+earlier file with --compare to print the change per case.
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORDS = ("the quick brown fox jumps over a lazy dog while good friends love "
+         "great coffee and hate bad weather on a sad rainy day").split()
+
+
+@dataclass
+class CaseResult:
+    name: str
+    group: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    samples: int = 0
+    iterations: int = 0
+    median_ms: float = 0.0
+    mean_ms: float = 0.0
+    p95_ms: float = 0.0
+    min_ms: float = 0.0
+    stdev_ms: float = 0.0
+    ops_per_sec: float = 0.0
+
+
+def _summarize(name: str, group: str, params: Dict[str, Any], per_call: List[float], iterations: int) -> CaseResult:
+    per_call = sorted(per_call)
+    median = statistics.median(per_call)
+    return CaseResult(
+        name=name,
+        group=group,
+        params=params,
+        samples=len(per_call),
+        iterations=iterations,
+        median_ms=median * 1000,
+        mean_ms=statistics.fmean(per_call) * 1000,
+        p95_ms=per_call[min(len(per_call) - 1, int(0.95 * len(per_call)))] * 1000,
+        min_ms=per_call[0] * 1000,
+        stdev_ms=(statistics.stdev(per_call) if len(per_call) > 1 else 0.0) * 1000,
+        ops_per_sec=1 / median if median else float("inf"),
+    )
+
+
+def bench(name: str, group: str, fn: Callable[[], Any], warmup: int, repeat: int, min_time: float,
+          **params) -> CaseResult:
+    """Time fn(): warm up, calibrate iterations per sample, then take `repeat` samples."""
+    for _ in range(warmup):
+        fn()
+
+    # Grow the iteration count until one sample lasts min_time
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or iterations >= 1 << 20:
+            break
+        iterations *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    per_call = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        per_call.append((time.perf_counter() - start) / iterations)
+    return _summarize(name, group, params, per_call, iterations)
+
+
+def synthetic_text(chars: int, seed: int = 0) -> str:
+    """Sentences of random WORDS totalling about `chars` characters."""
+    rng = random.Random(seed)
+    sentences, size = [], 0
+    while size < chars:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 16))).capitalize() + "."
+        sentences.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(sentences)
+
+
+def write_synthetic_kb(path: str, entries: int, seed: int = 0):
+    """KB file of `entries` people with unique names."""
+    rng = random.Random(seed)
+    first = ["Ada", "Alan", "Grace", "Edsger", "Barbara", "Donald", "Margaret", "Dennis", "Frances", "Claude"]
+    with open(path, "w") as f:
+        f.write('{"entries": [')
+        for i in range(entries):
+            name = f"{rng.choice(first)} Person{i}"
+            summary = f"{name} is synthetic entry {i} about " + " ".join(rng.choice(WORDS) for _ in range(12)) + "."
+            f.write(("," if i else "") + json.dumps({"name": name, "summary": summary}))
+        f.write("]}")
+
+
+def tool_cases(args) -> List[CaseResult]:
+    from agent.tools.calculator.tool import CalculatorTool
+    from agent.tools.text_analyzer.tool import TextAnalyzerTool
+    from agent.tools.unit_converter.tool import UnitConverterTool
+
+    results = []
+    run = lambda name, group, fn, **params: results.append(
+        bench(name, group, fn, args.warmup, args.repeat, args.min_time, **params))
+
+    calc = CalculatorTool()
+    run("calc simple", "calc", lambda: calc.validate_and_execute({"expr": "(15 + 25) * 3 / 7"}))
+    run("calc percent", "calc", lambda: calc.validate_and_execute({"expr": "What is 12.5% of 243?"}))
+    values = [float(i) for i in range(10_000)]
+    run("calc batch", "calc", lambda: calc.validate_and_execute({"expr": "x * 1.2 + 3", "values": values}),
+        values=len(values))
+
+    converter = UnitConverterTool()
+    run("unit_converter celsius", "unit_converter", lambda: converter.validate_and_execute({"celsius": 36.6}))
+    run("unit_converter compound", "unit_converter", lambda: converter.validate_and_execute(
+        {"value": 100, "from_unit": "km/h", "to_unit": "m/s"}))
+    run("unit_converter batch", "unit_converter", lambda: converter.validate_and_execute(
+        {"values": values, "from_unit": "mph", "to_unit": "km/h"}), values=len(values))
+
+    analyzer = TextAnalyzerTool()
+    for chars in (10_000, 1_000_000):
+        text = synthetic_text(chars)
+        for analysis in ("basic", "sentiment"):
+            run(f"text_analyzer {analysis} {chars // 1000}k", "text_analyzer",
+                lambda text=text, analysis=analysis: analyzer.validate_and_execute(
+                    {"text": text, "analysis_type": analysis}),
+                chars=chars, analysis_type=analysis)
+    return results
+
+
+def kb_cases(args) -> List[CaseResult]:
+    from agent.tools.kb.index import KBIndex
+    from agent.tools.kb.tool import KnowledgeBaseTool
+
+    results = []
+    # Offline: a miss must not fall through to the Gemini-backed KB agent
+    os.environ.pop("GEMINI_API_KEY", None)
+    tool = KnowledgeBaseTool()
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.kb_sizes:
+            path = os.path.join(tmp, f"kb_{size}.json")
+            write_synthetic_kb(path, size)
+
+            start = time.perf_counter()
+            tool.index = KBIndex(path)
+            tool.index.refresh()
+            load = time.perf_counter() - start
+            results.append(_summarize(f"kb load {size}", "kb", {"entries": size}, [load], 1))
+
+            rng = random.Random(size)
+            hits = [f"Who is Person{rng.randrange(size)}?" for _ in range(64)]
+            queries = itertools.cycle(hits)
+            run = lambda name, fn: results.append(
+                bench(name, "kb", fn, args.warmup, args.repeat, args.min_time, entries=size))
+            run(f"kb hit {size}", lambda: tool.validate_and_execute({"q": next(queries)}))
+            run(f"kb miss {size}", lambda: tool.validate_and_execute({"q": "Who is Nobody Unknown?"}))
+            run(f"kb prefix {size}", lambda: tool.validate_and_execute({"q": "Grace Person1"}))
+            tool.index = None
+    return results
+
+
+def startup_cases(args) -> List[CaseResult]:
+    from bench_startup import SCENARIOS, measure
+    from agent.tool_manager import ToolManager
+
+    results = [bench("ToolManager() in-process", "startup", ToolManager, args.warmup, args.repeat, args.min_time)]
+    for name, stmt in SCENARIOS.items():
+        timings = [t / 1000 for t in measure(stmt, args.startup_runs)]
+        results.append(_summarize(f"cold {name}", "startup", {"runs": args.startup_runs}, timings, 1))
+    return results
+
+
+def agent_cases(args) -> List[CaseResult]:
+    from agent.agent import Agent
+    from agent.llm import FakeProvider
+
+    provider = FakeProvider([
+        (r"add (\d+) and (\d+)", lambda m: [("calc", {"expr": f"{m[1]} + {m[2]}"})]),
+        (r"convert (\d+)", lambda m: [("unit_converter", {"celsius": float(m[1])})]),
+    ])
+    from agent.router import IntentRouter
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = Agent(api_key=None, provider=provider)
+        routed = Agent(api_key=None, provider=provider)
+    # Every call should reach the model (or router) rather than a cache
+    agent.response_cache = routed.response_cache = None
+    agent.router, routed.router = None, IntentRouter()
+
+    results = []
+    run = lambda name, fn, **params: results.append(
+        bench(name, "agent", fn, args.warmup, args.repeat, args.min_time, **params))
+    run("agent text answer", lambda: agent.answer("Tell me a story"))
+    run("agent one tool step", lambda: agent.answer("add 15 and 25"))
+    run("agent routed (no model)", lambda: routed.answer("What is 15 + 25?"))
+    return results
+
+
+GROUPS = {
+    "tools": tool_cases,
+    "kb": kb_cases,
+    "startup": startup_cases,
+    "agent": agent_cases,
+}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[CaseResult], baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = {case["name"]: case for case in json.load(f)["results"]}
+    print(f"\nvs {baseline_path}")
+    print(f"{'case':<36}{'old ms':>12}{'new ms':>12}{'change':>10}")
+    for case in results:
+        old = baseline.get(case.name)
+        if not old or not old["median_ms"]:
+            continue
+        change = case.median_ms / old["median_ms"] - 1
+        print(f"{case.name:<36}{old['median_ms']:>12.4f}{case.median_ms:>12.4f}{change:>+10.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", action="append", choices=sorted(GROUPS), help="run only these groups")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed calls before sampling")
+    parser.add_argument("--repeat", type=int, default=15, help="timed samples per case")
+    parser.add_argument("--min-time", type=float, default=0.02, help="minimum seconds per sample")
+    parser.add_argument("--kb-sizes", default="1000,100000,1000000",
+                        help="comma-separated synthetic KB sizes")
+    parser.add_argument("--startup-runs", type=int, default=5, help="fresh interpreters per startup scenario")
+    parser.add_argument("--out", help="JSON results file (default .cache/bench/<commit>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier results file to compare against")
+    args = parser.parse_args()
+    args.kb_sizes = [int(size) for size in args.kb_sizes.split(",") if size]
+
+    results: List[CaseResult] = []
+    print(f"{'case':<36}{'median ms':>12}{'p95 ms':>12}{'stdev ms':>12}{'ops/s':>12}")
+    for group, cases in GROUPS.items():
+        if args.only and group not in args.only:
+            continue
+        for case in cases(args):
+            results.append(case)
+            print(f"{case.name:<36}{case.median_ms:>12.4f}{case.p95_ms:>12.4f}"
+                  f"{case.stdev_ms:>12.4f}{case.ops_per_sec:>12.0f}")
+
+    commit = _git_commit()
+    out = args.out or os.path.join(ROOT, ".cache", "bench", f"{commit or 'results'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {"warmup": args.warmup, "repeat": args.repeat, "min_time": args.min_time},
+            "results": [asdict(case) for case in results],
+        }, f, indent=2)
+    print(f"\nWrote {out}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
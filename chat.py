@@ -2,22 +2,27 @@
 import os
 from dotenv import load_dotenv
 from agent.interactive_agent import InteractiveAgent
+from agent.llm import get_provider
+from agent.log import configure_logging
 
 load_dotenv()
 
 def main():
+    configure_logging()
     print("🤖 Interactive Agent Chat (with memory)")
     print("Type 'quit', 'exit', or 'bye' to stop")
     print("Type 'history' to see conversation history")
     print("-" * 50)
     
-    # Initialize agent
+    # Initialize agent (LLM_PROVIDER=fake|replay|record runs without/with recorded Gemini)
     api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        print("Error: GEMINI_API_KEY not set in .env file")
+    try:
+        provider = get_provider(os.getenv("LLM_PROVIDER", "gemini"), api_key)
+    except ValueError as e:
+        print(e)
         return
     
-    agent = InteractiveAgent(api_key)
+    agent = InteractiveAgent(api_key, provider=provider, on_tool=lambda name: print(f"🔧 Using tool: {name}"))
     # Add this to chat.py after creating agent
     print("Available tools:", agent.tool_manager.list_tools())
     while True:
@@ -41,8 +46,9 @@ def main():
             
             # Get response
             print("🤖 Assistant: ", end="", flush=True)
-            response = agent.ask(question)
-            print(response)
+            for chunk in agent.ask_stream(question):
+                print(chunk, end="", flush=True)
+            print()
             
         except KeyboardInterrupt:
             print("\n👋 Goodbye!")
@@ -1,18 +1,59 @@
 # main.py
+import argparse
+import os
 import sys
 from agent.llm import LLM
+from agent.log import configure_logging
+from agent.metrics import get_metrics
 
 def main():
-    if len(sys.argv) < 2:
+    parser = argparse.ArgumentParser(description="Answer a question, or a JSONL file of questions.")
+    parser.add_argument("question", nargs="*", help="question to answer")
+    parser.add_argument("--batch", metavar="INPUT", help="JSONL file of {\"id\", \"question\"} records")
+    parser.add_argument("--out", metavar="OUTPUT", help="JSONL file to append results to (batch mode)")
+    parser.add_argument("--concurrency", type=int, default=8, help="questions in flight at once (batch mode)")
+    parser.add_argument("--rate", type=float, default=None, help="max questions started per second (batch mode)")
+    parser.add_argument("--provider", default=os.getenv("LLM_PROVIDER", "gemini"),
+                        help="gemini, fake, replay or record (default: $LLM_PROVIDER or gemini)")
+    parser.add_argument("--no-stream", action="store_true", help="print the answer only once it is complete")
+    parser.add_argument("--metrics", action="store_true", help="print latency histograms and counters to stderr at exit")
+    args = parser.parse_args()
+
+    configure_logging()
+    if args.metrics:
+        get_metrics().enabled = True
+    try:
+        _run(parser, args)
+    finally:
+        if get_metrics().enabled:
+            print(get_metrics().to_json(), file=sys.stderr)
+
+def _run(parser, args):
+    if args.batch:
+        if not args.out:
+            parser.error("--batch requires --out")
+        from agent.batch import run_batch
+
+        llm = LLM(provider=args.provider)
+        stats = run_batch(llm, args.batch, args.out, concurrency=args.concurrency, rate_limit=args.rate)
+        print(f"Answered {stats['answered']}, skipped {stats['skipped']} already done, {stats['errors']} errors")
+        return
+
+    if not args.question:
         print("Usage: python main.py \"your question here\"")
+        print("       python main.py --batch questions.jsonl --out results.jsonl")
         sys.exit(1)
 
-    question = " ".join(sys.argv[1:])
+    question = " ".join(args.question)
 
-    # Initialize with Gemini
-    llm = LLM(provider="gemini")
-    response = llm.answer(question)
-    print(response)
+    # Initialize with the chosen provider
+    llm = LLM(provider=args.provider)
+    if args.no_stream:
+        print(llm.answer(question))
+        return
+    for chunk in llm.answer_stream(question):
+        print(chunk, end="", flush=True)
+    print()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -18,4 +18,53 @@ def setup_test_env():
         os.environ["GEMINI_API_KEY"] = "test_key_123"
     if not os.getenv("WEATHER_API_KEY"):
         os.environ["WEATHER_API_KEY"] = "test_weather_key"
-    yield
\ No newline at end of file
+    yield
+
+@pytest.fixture
+def weather_stub_server(monkeypatch):
+    """Local OpenWeatherMap stand-in; points WEATHER_API_URL at it."""
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import urlparse, parse_qs
+
+    # "failures" is a list of status codes to answer with before succeeding
+    state = {"requests": [], "ports": [], "delay": 0.0, "failures": [], "lock": threading.Lock()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            with state["lock"]:
+                state["requests"].append(query)
+                state["ports"].append(self.client_address[1])
+                status = state["failures"].pop(0) if state["failures"] else None
+            time.sleep(state["delay"])
+            if status:
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = json.dumps({
+                "main": {"temp": 18.5},
+                "weather": [{"description": "Light Rain"}],
+                "name": query.get("q", [""])[0],
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("WEATHER_API_URL", f"http://127.0.0.1:{server.server_port}/data/2.5/weather")
+    yield state
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,1064 @@
+# tests/test_agent.py
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from agent.agent import Agent
+
+
+def make_response(text=None, calls=()):
+    """Build a Gemini-shaped response with optional function_call parts."""
+    parts = [SimpleNamespace(function_call=SimpleNamespace(name=name, args=args)) for name, args in calls]
+    if text is not None:
+        parts.append(SimpleNamespace(function_call=None, text=text))
+    content = SimpleNamespace(parts=parts)
+    return SimpleNamespace(candidates=[SimpleNamespace(content=content)], text=text)
+
+
+class ScriptedModel:
+    """Returns queued responses; async calls wait `delay` seconds first."""
+    def __init__(self, responses, delay=0.0):
+        self.responses = list(responses)
+        self.delay = delay
+        self.prompts = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return self.responses.pop(0)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.delay)
+        return self.responses.pop(0)
+
+
+class TestAsyncAgent:
+    """Test the asyncio agent path against a scripted model."""
+
+    def test_answer_async_runs_tool(self):
+        agent = Agent(api_key="test_key_123")
+        agent.model = ScriptedModel([make_response(calls=[("calc", {"expr": "15 + 25"})])])
+
+        assert asyncio.run(agent.answer_async("What is 15 + 25?")) == "40"
+
+    def test_tool_manager_async_validation(self):
+        agent = Agent(api_key="test_key_123")
+
+        result = asyncio.run(agent.tool_manager.execute_tool_async("calc", {}))
+        assert not result.success
+        assert "Missing required parameter" in result.error
+
+        result = asyncio.run(agent.tool_manager.execute_tool_async("nope", {}))
+        assert result.error == "Unknown tool: nope"
+
+    def test_many_questions_in_flight(self):
+        agent = Agent(api_key="test_key_123")
+        agent.model = ScriptedModel([make_response(text="hi")] * 100, delay=0.2)
+
+        async def ask_all():
+            return await asyncio.gather(*(agent.answer_async(f"q{i}") for i in range(100)))
+
+        start = time.perf_counter()
+        answers = asyncio.run(ask_all())
+        assert answers == ["hi"] * 100
+        # 100 x 0.2s of model latency overlap instead of adding up
+        assert time.perf_counter() - start < 2.0
+
+
+class TestParallelToolCalls:
+    """Test that every function call in one model turn is executed, concurrently."""
+
+    CALLS = [
+        ("weather", {"city": "Paris"}),
+        ("weather", {"city": "London"}),
+        ("calc", {"expr": "20% of 300"}),
+    ]
+
+    def test_answer_runs_all_calls_concurrently(self, weather_stub_server):
+        weather_stub_server["delay"] = 0.3
+        agent = Agent(api_key="test_key_123")
+        agent.model = ScriptedModel([make_response(calls=self.CALLS)])
+
+        start = time.perf_counter()
+        answer = agent.answer("weather in Paris and London and 20% of 300")
+        elapsed = time.perf_counter() - start
+
+        assert answer.splitlines() == [
+            "The temperature in Paris is 18.5°C with light rain.",
+            "The temperature in London is 18.5°C with light rain.",
+            "60.0",
+        ]
+        assert elapsed < 0.55
+
+    def test_answer_async_runs_all_calls(self):
+        agent = Agent(api_key="test_key_123")
+        agent.model = ScriptedModel([make_response(calls=[("calc", {"expr": "1 + 1"}), ("calc", {"expr": "2 * 3"})])])
+
+        assert asyncio.run(agent.answer_async("1+1 and 2*3")) == "2\n6"
+
+    def test_interactive_sends_results_back_together(self):
+        from agent.interactive_agent import InteractiveAgent
+
+        class RecordingChat:
+            def __init__(self, responses):
+                self.responses = list(responses)
+                self.messages = []
+
+            def send_message(self, message):
+                self.messages.append(message)
+                return self.responses.pop(0)
+
+        agent = InteractiveAgent(api_key="test_key_123")
+        agent.chat = RecordingChat([
+            make_response(calls=[("calc", {"expr": "15 + 25"}), ("unit_converter", {"celsius": 100})]),
+            make_response(text="40, and 100°C is 212°F."),
+        ])
+
+        assert agent.ask("15 + 25 and 100C in F") == "40, and 100°C is 212°F."
+        parts = agent.chat.messages[1]
+        assert [p.function_response.name for p in parts] == ["calc", "unit_converter"]
+        assert parts[0].function_response.response["result"] == "40"
+
+    def test_function_responses_are_json_safe(self):
+        np = pytest.importorskip("numpy")
+        from agent.base_tool import ToolResult
+        from agent.tool_manager import ToolManager
+
+        manager = ToolManager()
+        calls = [("text_analyzer", {}), ("calc", {})]
+        results = [
+            ToolResult(True, {"score": np.float64(0.5), "counts": np.array([1, 2]), "pair": (1, "a")}),
+            ToolResult(True, np.int64(7)),
+        ]
+
+        parts = manager.function_responses_for_gemini(calls, results)
+        assert dict(parts[0].function_response.response["result"]) == {
+            "score": 0.5, "counts": [1.0, 2.0], "pair": [1.0, "a"]}
+        assert parts[1].function_response.response["result"] == 7
+
+    def test_close_shuts_down_the_executor(self):
+        from agent.tool_manager import ToolManager
+
+        manager = ToolManager()
+        manager.execute_tools([("calc", {"expr": "1 + 1"}), ("calc", {"expr": "2 * 3"})])
+        executor = manager._executor
+        assert executor is not None
+
+        manager.close()
+        assert manager._executor is None
+        with pytest.raises(RuntimeError):
+            executor.submit(print)
+        manager.close()
+
+
+class TestBatchMode:
+    """Test JSONL batch answering with a fake model backend."""
+
+    class EchoLLM:
+        def __init__(self, delay=0.0, fail_on=None, error_on=None):
+            self.delay = delay
+            self.fail_on = fail_on
+            self.error_on = error_on
+            self.questions = []
+
+        async def answer_async(self, question):
+            self.questions.append(question)
+            await asyncio.sleep(self.delay)
+            if question == self.fail_on:
+                raise RuntimeError("boom")
+            if question == self.error_on:
+                # Agent.answer_async catches exceptions and returns them as text
+                return "Error: 503 unavailable"
+            return question.upper()
+
+    def _write_input(self, path, n):
+        import json
+        path.write_text("".join(json.dumps({"id": f"q{i}", "question": f"question {i}"}) + "\n" for i in range(n)))
+
+    def test_batch_concurrency_and_resume(self, tmp_path):
+        import json
+        from agent.batch import run_batch
+
+        input_path, out_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        self._write_input(input_path, 50)
+        # Simulate a crashed run: two finished records and a truncated one
+        out_path.write_text(
+            json.dumps({"id": "q0", "answer": "QUESTION 0"}) + "\n"
+            + json.dumps({"id": "q1", "answer": "QUESTION 1"}) + "\n"
+            + '{"id": "q2", "ans'
+        )
+
+        llm = self.EchoLLM(delay=0.1, fail_on="question 7", error_on="question 9")
+        start = time.perf_counter()
+        stats = run_batch(llm, str(input_path), str(out_path), concurrency=25)
+        assert time.perf_counter() - start < 1.0
+
+        assert stats == {"answered": 46, "skipped": 2, "errors": 2}
+        assert "question 0" not in llm.questions
+
+        records = {}
+        for line in out_path.read_text().splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records[record["id"]] = record
+        assert len(records) == 50
+        assert records["q2"]["answer"] == "QUESTION 2"
+        assert records["q7"]["error"] == "boom"
+        assert records["q9"] == {"id": "q9", "question": "question 9", "error": "503 unavailable",
+                                 "latency_ms": records["q9"]["latency_ms"]}
+
+        # A second run retries only the failed questions
+        llm = self.EchoLLM()
+        assert run_batch(llm, str(input_path), str(out_path)) == {"answered": 2, "skipped": 48, "errors": 0}
+        assert sorted(llm.questions) == ["question 7", "question 9"]
+
+    def test_rate_limit(self, tmp_path):
+        from agent.batch import run_batch
+
+        input_path, out_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        self._write_input(input_path, 6)
+
+        start = time.perf_counter()
+        run_batch(self.EchoLLM(), str(input_path), str(out_path), concurrency=6, rate_limit=10)
+        # Burst of 10 tokens covers all six, so no throttling...
+        assert time.perf_counter() - start < 0.3
+
+        out_path.unlink()
+        start = time.perf_counter()
+        run_batch(self.EchoLLM(), str(input_path), str(out_path), concurrency=6, rate_limit=5)
+        # ...but at 5/s the sixth question waits ~0.2s for a token
+        assert time.perf_counter() - start >= 0.15
+
+
+class TestModelPool:
+    """Test that configured models are built once and shared."""
+
+    def test_agents_share_one_model(self):
+        from agent.interactive_agent import InteractiveAgent
+
+        first = Agent(api_key="test_key_123")
+        second = Agent(api_key="test_key_123")
+        chat_agent = InteractiveAgent(api_key="test_key_123")
+        other_chat_agent = InteractiveAgent(api_key="test_key_123")
+
+        assert first.model is second.model is chat_agent.model
+        # Conversations stay separate even though the model is shared
+        assert chat_agent.chat is not other_chat_agent.chat
+
+    def test_per_purpose_settings(self, monkeypatch):
+        from agent.models import ModelConfig, ModelPool
+
+        monkeypatch.setenv("GEMINI_KB_MODEL", "gemini-1.5-flash-8b")
+        pool = ModelPool()
+        pool.configure("test_key_123")
+
+        kb_model = pool.get("kb")
+        assert pool.get("kb") is kb_model
+        assert pool.get("agent") is not kb_model
+        assert kb_model.model_name == "models/gemini-1.5-flash-8b"
+        assert kb_model._generation_config["temperature"] == 0.0
+        assert kb_model._generation_config["max_output_tokens"] == 8
+
+        # Changing the override later builds a new model instead of reusing the old one
+        monkeypatch.setenv("GEMINI_KB_MODEL", "gemini-1.5-pro")
+        pro_model = pool.get("kb")
+        assert pro_model is not kb_model
+        assert pro_model.model_name == "models/gemini-1.5-pro"
+        assert pool.get("kb") is pro_model
+        pool.configs["kb"] = ModelConfig("gemini-1.5-pro", temperature=0.5)
+        assert pool.get("kb")._generation_config == {"temperature": 0.5}
+
+
+class TestResponseCache:
+    """Test the persistent answer cache in front of Agent.answer."""
+
+    def test_repeated_question_skips_model(self, tmp_path):
+        from agent.response_cache import ResponseCache
+
+        cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+        agent = Agent(api_key="test_key_123", response_cache=cache)
+        agent.model = ScriptedModel([make_response(calls=[("calc", {"expr": "12.5% of 243"})])])
+
+        assert agent.answer("What is 12.5% of 243?") == "30.375"
+        # Same question, different casing/punctuation: no model call left to make
+        assert agent.answer("what is 12.5% of 243") == "30.375"
+        assert asyncio.run(agent.answer_async("What is 12.5% of 243?")) == "30.375"
+        assert cache.stats()["hits"] == 2
+
+        # Persisted across processes
+        assert ResponseCache(str(tmp_path / "responses.sqlite")).get("What is 12.5% of 243?") == "30.375"
+
+    def test_failed_tool_calls_are_not_cached(self, tmp_path):
+        from agent.response_cache import ResponseCache
+
+        cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+        agent = Agent(api_key="test_key_123", response_cache=cache)
+        agent.model = ScriptedModel([make_response(calls=[("calc", {"expr": "1/0"})])])
+
+        assert agent.answer("1/0") == "division by zero"
+        assert cache.get("1/0") is None
+
+    def test_expiry_rules(self, tmp_path, monkeypatch):
+        import os
+        from agent import response_cache
+        from agent.response_cache import ResponseCache
+
+        kb_file = tmp_path / "kb.json"
+        kb_file.write_text("{}")
+        cache = ResponseCache(str(tmp_path / "responses.sqlite"), file_dependencies={"kb": [str(kb_file)]})
+        cache.put("15 + 25", "40", ["calc"])
+        cache.put("weather in paris", "18°C", ["weather"])
+        cache.put("who is ada lovelace", "A mathematician.", ["kb"])
+        cache.put("tell me a joke", "Why did the chicken...", [])
+
+        now = time.time()
+        monkeypatch.setattr(response_cache.time, "time", lambda: now + 3600)
+        assert cache.get("15 + 25") == "40"
+        assert cache.get("tell me a joke") is None
+        assert cache.get("weather in paris") is None
+        assert cache.get("who is ada lovelace") == "A mathematician."
+
+        stat = os.stat(kb_file)
+        os.utime(kb_file, (stat.st_atime, stat.st_mtime + 10))
+        assert cache.get("who is ada lovelace") is None
+
+    def test_kb_dependency_is_anchored_to_the_project(self, tmp_path, monkeypatch):
+        import os
+        from agent.response_cache import FILE_DEPENDENCIES, ResponseCache
+
+        (kb_path,) = FILE_DEPENDENCIES["kb"]
+        assert os.path.isabs(kb_path) and os.path.exists(kb_path)
+
+        cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+        monkeypatch.chdir(tmp_path)
+        cache.put("who is ada lovelace", "A mathematician.", ["kb"])
+        assert cache.get("who is ada lovelace") == "A mathematician."
+        row = cache._db.execute("SELECT deps FROM responses").fetchone()
+        assert json.loads(row[0]) == {kb_path: os.stat(kb_path).st_mtime}
+
+        # The tool reads the same file from any working directory
+        from agent.tools.kb.tool import KnowledgeBaseTool
+        tool = KnowledgeBaseTool()
+        assert tool.index.kb_file_path == kb_path
+        assert "computing pioneer" in tool.execute({"q": "Ada Lovelace"})
+
+    def test_units_differing_only_in_case_are_cached_separately(self, tmp_path):
+        from agent.response_cache import ResponseCache
+
+        cache = ResponseCache(str(tmp_path / "responses.sqlite"), near_duplicates=True)
+        cache.put("convert 8 Mb to MB", "8.0 Mb = 1.0 MB", ["unit_converter"])
+
+        assert cache.get("Convert 8 Mb to MB?") == "8.0 Mb = 1.0 MB"
+        assert cache.get("convert 8 MB to Mb") is None
+        assert cache.get("please convert 8 mb to mb") is None
+        # Case-insensitive units still share one entry
+        cache.put("convert 5 km to mi", "3.11 mi", ["unit_converter"])
+        assert cache.get("Convert 5 KM to MI") == "3.11 mi"
+
+    def test_near_duplicates_and_schema_version(self, tmp_path):
+        from agent.response_cache import ResponseCache
+
+        path = str(tmp_path / "responses.sqlite")
+        cache = ResponseCache(path, near_duplicates=True)
+        cache.put("Who is Ada Lovelace?", "A mathematician.", ["kb"])
+        cache.put("2 + 3", "5", ["calc"])
+
+        assert cache.get("tell me about ada lovelace") == "A mathematician."
+        assert cache.get("2 - 3") is None
+        assert ResponseCache(path, version="other-schemas").get("2 + 3") is None
+
+
+class TestIntentRouter:
+    """Test the local router that answers simple questions without the model."""
+
+    def test_routes_and_extracts_args(self):
+        from agent.router import IntentRouter
+
+        router = IntentRouter()
+        assert router.route("What is 15 + 25?").args == {"expr": "15 + 25"}
+        assert router.route("what's 2^10").args == {"expr": "2**10"}
+        assert router.route("Convert 25 Celsius to Fahrenheit").args == {"celsius": 25.0}
+        assert router.route("What's the weather in New York?").args == {"city": "New York"}
+
+        # Ambiguous or open-ended questions go to the model
+        assert router.route("2024") is None
+        assert router.route("Who is Ada Lovelace?") is None
+        assert router.route("Summarize today's weather in Paris in 3 words") is None
+        assert router.route("weather in the text analyzer") is None
+        assert router.stats() == {"hits": 4, "misses": 4, "hit_rate": 0.5}
+
+    def test_routes_general_unit_conversions(self):
+        from agent.router import IntentRouter
+
+        router = IntentRouter()
+        assert router.route("convert 100 km/h to m/s").args == {"value": 100.0, "from_unit": "km/h", "to_unit": "m/s"}
+        assert router.route("what is 2 gib in mib?").args == {"value": 2.0, "from_unit": "GiB", "to_unit": "MiB"}
+        # Lowercased "mb"/"gb" could be bytes or bits, so the model decides
+        assert router.route("Convert 100 Mb to MB") is None
+        assert router.route("convert 1 Gb to MB") is None
+        assert router.route("convert 1 gb/s to mbps") is None
+        # Unknown or incompatible units go to the model
+        assert router.route("3 apples to oranges") is None
+        assert router.route("5 kg to m") is None
+        assert router.route("what is 20 degrees in paris?") is None
+
+    def test_answer_skips_model_for_routed_questions(self):
+        agent = Agent(api_key="test_key_123")
+        agent.model = ScriptedModel([make_response(text="model answer")])
+
+        assert agent.answer("15 + 25") == "40"
+        assert asyncio.run(agent.answer_async("convert 0 c to f")) == "0.0°C = 32.0°F"
+        assert agent.model.prompts == []
+
+        # A routed call that fails falls back to the model
+        assert agent.answer("1/0") == "model answer"
+        assert agent.model.prompts == ["1/0"]
+
+
+class TestConversationMemory:
+    """Test bounded InteractiveAgent memory."""
+
+    class HistoryChat:
+        """Chat stub that records how much history each message was sent with."""
+        def __init__(self, responses):
+            self.responses = list(responses)
+            self.history = []
+            self.sent_history_sizes = []
+
+        def send_message(self, message):
+            self.sent_history_sizes.append(len(self.history))
+            return self.responses.pop(0)
+
+    def test_history_stays_bounded(self):
+        from google.generativeai.types import content_types
+        from agent.interactive_agent import InteractiveAgent
+        from agent.memory import ConversationMemory
+
+        agent = InteractiveAgent(api_key="test_key_123", memory=ConversationMemory(max_turns=3, token_budget=400))
+        agent.chat = self.HistoryChat([make_response(text=f"Answer number {i}.") for i in range(50)])
+
+        agent.ask("My name is Ada.")
+        for i in range(1, 50):
+            assert agent.ask(f"Question {i}?") == f"Answer number {i}."
+
+        # Summary pair + 3 verbatim turns, no matter how long the session runs
+        assert max(agent.chat.sent_history_sizes) == 8
+        assert agent.memory.tokens() <= 400
+        assert [turn.question for turn in agent.memory.turns] == ["Question 47?", "Question 48?", "Question 49?"]
+        assert "Question 46?" in agent.memory.summary
+        # The history is valid Gemini content
+        assert len(content_types.to_contents(agent.memory.history())) == 8
+
+    def test_tool_results_are_stored_compactly(self):
+        from agent.interactive_agent import InteractiveAgent
+
+        agent = InteractiveAgent(api_key="test_key_123")
+        agent.chat = self.HistoryChat([
+            make_response(calls=[("calc", {"expr": "15 + 25"}), ("calc", {"expr": "1/0"})]),
+            make_response(text="40, and 1/0 is undefined."),
+        ])
+
+        agent.ask("15 + 25 and 1/0")
+        assert agent.memory.turns[0].tools == ["calc(expr=15 + 25) -> 40", "calc(expr=1/0) -> error: division by zero"]
+        assert agent.memory.history()[1]["parts"][0] == (
+            "[tools used: calc(expr=15 + 25) -> 40; calc(expr=1/0) -> error: division by zero]"
+        )
+
+    def test_model_summarizer_falls_back_locally(self):
+        from agent.memory import ConversationMemory, ModelSummarizer
+
+        memory = ConversationMemory(max_turns=1, summarizer=ModelSummarizer(ScriptedModel([make_response(text="Ada likes tea.")])))
+        memory.add_turn("I like tea, I'm Ada", "Noted!")
+        memory.add_turn("hi", "hello")
+        assert memory.summary == "Ada likes tea."
+
+        memory.add_turn("bye", "goodbye")  # the scripted model has nothing left and raises
+        assert memory.summary.splitlines()[-1] == "User asked: hi | Answer: hello"
+
+
+class TestChatServer:
+    """Test the multi-session chat server against the offline fake provider."""
+
+    async def _post(self, port, payload):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        body = json.dumps(payload).encode()
+        writer.write(b"POST /chat HTTP/1.1\r\nHost: x\r\nConnection: close\r\n"
+                     + f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        raw = await reader.read()
+        writer.close()
+        head, _, body = raw.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(body)
+
+    def test_sessions_share_tools_and_run_concurrently(self):
+        from agent.llm import FakeProvider
+        from agent.server import ChatServer, agent_factory
+
+        server = ChatServer(agent_factory(FakeProvider(latency=0.2)), max_inflight=50)
+
+        async def scenario():
+            _, port = await server.start(port=0)
+            start = time.perf_counter()
+            replies = await asyncio.gather(*(self._post(port, {"session": f"s{i}", "message": f"hi {i}"}) for i in range(50)))
+            elapsed = time.perf_counter() - start
+            await server.stop()
+            return replies, elapsed
+
+        replies, elapsed = asyncio.run(scenario())
+        assert [body["answer"] for _, body in replies] == [f"echo: hi {i}" for i in range(50)]
+        assert elapsed < 2.0
+        agents = [session.agent for session in server.store.sessions.values()]
+        assert len(agents) == 50
+        assert len({id(agent.tool_manager) for agent in agents}) == 1
+        assert len({id(agent.model) for agent in agents}) == 1
+
+    def test_eviction_spills_and_restores_memory(self, tmp_path):
+        from agent.llm import FakeProvider
+        from agent.server import ChatServer, agent_factory
+
+        server = ChatServer(agent_factory(FakeProvider()), max_sessions=2, store_dir=str(tmp_path))
+
+        async def scenario():
+            _, port = await server.start(port=0)
+            await self._post(port, {"session": "alice", "message": "my name is Alice"})
+            await self._post(port, {"session": "bob", "message": "hi"})
+            await self._post(port, {"session": "carol", "message": "hi"})
+            evicted = "alice" not in server.store.sessions
+            await self._post(port, {"session": "alice", "message": "what is my name?"})
+            await server.stop()
+            return evicted
+
+        assert asyncio.run(scenario())
+        assert (tmp_path / "alice.json").exists()
+        assert server.store.restored == 1
+        stored = json.loads((tmp_path / "alice.json").read_text())
+        assert [turn["question"] for turn in stored["turns"]] == ["my name is Alice", "what is my name?"]
+
+        server.store.max_sessions, server.store.idle_timeout = 10, 0.0
+        server.store.get("dave")
+        assert server.store.evict_idle() == 1
+
+    def test_backpressure(self):
+        from agent.llm import FakeProvider
+        from agent.server import ChatServer, agent_factory
+
+        server = ChatServer(agent_factory(FakeProvider(latency=0.3)),
+                            max_inflight=2, max_pending=3, max_session_pending=1)
+
+        async def scenario():
+            _, port = await server.start(port=0)
+            same_session = await asyncio.gather(*(self._post(port, {"session": "s", "message": "x"}) for _ in range(2)))
+            crowd = await asyncio.gather(*(self._post(port, {"message": "x"}) for _ in range(10)))
+            bad = await self._post(port, {"session": "../etc", "message": "x"})
+            await server.stop()
+            return same_session, crowd, bad
+
+        same_session, crowd, bad = asyncio.run(scenario())
+        assert sorted(status for status, _ in same_session) == [200, 429]
+        statuses = [status for status, _ in crowd]
+        assert statuses.count(200) == 5 and statuses.count(503) == 5
+        assert bad[0] == 400
+
+
+    def test_full_table_and_malformed_requests(self):
+        from agent.llm import FakeProvider
+        from agent.server import ChatServer, agent_factory
+
+        server = ChatServer(agent_factory(FakeProvider(latency=0.3)), max_sessions=1)
+
+        async def raw(port, request):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return int(response.split()[1])
+
+        async def scenario():
+            _, port = await server.start(port=0)
+            # The only slot is busy, so a second session cannot evict it
+            busy = asyncio.ensure_future(self._post(port, {"session": "a", "message": "x"}))
+            await asyncio.sleep(0.1)
+            full = await self._post(port, {"session": "b", "message": "x"})
+            await busy
+
+            statuses = [await raw(port, b"POST /chat HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n")
+                        for length in (b"abc", b"-5")]
+            server.stats = lambda: 1 / 0
+            statuses.append(await raw(port, b"GET /stats HTTP/1.1\r\nConnection: close\r\n\r\n"))
+            await server.stop()
+            return busy.result(), full, statuses
+
+        busy, full, statuses = asyncio.run(scenario())
+        assert busy[0] == 200
+        assert full == (503, {"error": "too many active sessions"})
+        assert list(server.store.sessions) == ["a"]
+        assert statuses == [400, 400, 500]
+
+    def test_model_summary_runs_off_the_event_loop(self):
+        import threading
+        from agent.interactive_agent import InteractiveAgent
+        from agent.llm import FakeProvider
+        from agent.memory import ConversationMemory, ModelSummarizer
+
+        threads = []
+
+        class SummaryModel:
+            def generate_content(self, prompt):
+                threads.append(threading.current_thread())
+                return SimpleNamespace(text="summary")
+
+        memory = ConversationMemory(max_turns=1, summarizer=ModelSummarizer(SummaryModel()))
+        agent = InteractiveAgent(None, memory=memory, provider=FakeProvider())
+
+        async def ask_twice():
+            await agent.ask_async("hello")
+            await agent.ask_async("again")
+
+        asyncio.run(ask_twice())
+        assert memory.summary == "summary"
+        assert threads and threads[0] is not threading.main_thread()
+
+
+class TestStreaming:
+    """Test answer_stream / ask_stream against streamed fake responses."""
+
+    @staticmethod
+    def slow_stream(chunks, delay):
+        """Streamed response that takes `delay` seconds per chunk."""
+        for chunk in chunks:
+            time.sleep(delay)
+            yield chunk
+
+    def test_answer_stream_yields_before_completion(self):
+        agent = Agent(api_key="test_key_123")
+        agent.model = ScriptedModel([self.slow_stream([make_response(text=w) for w in ("Ada ", "was ", "a ", "mathematician.")], 0.1)])
+
+        start = time.perf_counter()
+        stream = agent.answer_stream("Who was Ada Lovelace?")
+        first = next(stream)
+        time_to_first = time.perf_counter() - start
+        rest = list(stream)
+
+        assert first == "Ada "
+        assert "".join([first] + rest) == "Ada was a mathematician."
+        assert time_to_first < 0.2 < time.perf_counter() - start
+
+    def test_answer_stream_handles_calls_mid_stream(self):
+        from google.generativeai import protos
+
+        agent = Agent(api_key="test_key_123")
+        chunks = [
+            make_response(text="Let me check. "),
+            SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[
+                protos.Part(function_call=protos.FunctionCall(name="calc", args={"expr": "15 + 25"})),
+            ]))]),
+        ]
+        agent.model = ScriptedModel([chunks])
+
+        assert list(agent.answer_stream("add fifteen and twenty-five")) == ["Let me check. ", "\n40"]
+        # Routed and cached answers stream as a single chunk
+        assert list(agent.answer_stream("15 + 25")) == ["40"]
+
+    def test_ask_stream_sends_results_back_and_remembers(self):
+        from agent.interactive_agent import InteractiveAgent
+
+        class StreamingChat:
+            def __init__(self, responses):
+                self.responses = list(responses)
+                self.history = []
+                self.streamed = []
+
+            def send_message(self, message, stream=False):
+                self.streamed.append(stream)
+                return self.responses.pop(0)
+
+        agent = InteractiveAgent(api_key="test_key_123")
+        agent.chat = StreamingChat([
+            [make_response(calls=[("unit_converter", {"celsius": 100})])],
+            [make_response(text="100°C "), make_response(text="is 212°F.")],
+        ])
+
+        assert list(agent.ask_stream("100C in F?")) == ["100°C ", "is 212°F."]
+        assert agent.chat.streamed == [True, True]
+        turn = agent.memory.turns[0]
+        assert turn.answer == "100°C is 212°F."
+        assert turn.tools == ["unit_converter(celsius=100) -> 100.0°C = 212.0°F"]
+
+
+class TestProviders:
+    """Test the pluggable LLM providers offline."""
+
+    RULES = [
+        (r"analyze this text: '(.*)'", lambda m: [("text_analyzer", {"text": m.group(1)})]),
+        (r"calculate (.*)", lambda m: [("calc", {"expr": m.group(1)})]),
+        (r"my name", "Your name is Saymon."),
+    ]
+
+    def test_fake_provider_drives_agent_and_chat(self):
+        from agent.interactive_agent import InteractiveAgent
+        from agent.llm import LLM, FakeProvider
+
+        provider = FakeProvider(self.RULES)
+        llm = LLM(provider=provider)
+        assert llm.provider == "fake"
+        assert "3" in llm.answer("Analyze this text: 'Hello world test'")
+        assert "".join(llm.answer_stream("tell me a story")) == "echo: tell me a story"
+        assert len(list(llm.answer_stream("tell me a story"))) == 5
+
+        agent = InteractiveAgent(None, provider=provider)
+        assert agent.ask("Calculate 10 + 5") == "15"
+        assert agent.ask("What's my name?") == "Your name is Saymon."
+        assert asyncio.run(agent.ask_async("Calculate 2 * 3")) == "6"
+
+    def test_record_then_replay(self, tmp_path):
+        from agent.interactive_agent import InteractiveAgent
+        from agent.llm import LLM, FakeProvider, ReplayProvider
+
+        path = str(tmp_path / "recordings.json")
+        questions = ["Analyze this text: 'I love it'", "what is the meaning of life"]
+        recorder = ReplayProvider(path, inner=FakeProvider(self.RULES), mode="record")
+        recorded = [LLM(provider=recorder).answer(q) for q in questions]
+        chat = InteractiveAgent(None, provider=recorder)
+        recorded_chat = [chat.ask("Calculate 10 + 5"), chat.ask("hello")]
+
+        replayer = ReplayProvider(path)
+        assert [LLM(provider=replayer).answer(q) for q in questions] == recorded
+        chat = InteractiveAgent(None, provider=replayer)
+        assert [chat.ask("Calculate 10 + 5"), chat.ask("hello")] == recorded_chat
+        assert "".join(LLM(provider=replayer).answer_stream(questions[1])) == recorded[1]
+        assert "No recorded response" in LLM(provider=replayer).answer("never asked")
+
+    def test_record_multi_step_tool_conversation(self, tmp_path, monkeypatch):
+        from google.generativeai.types import content_types
+        from agent.llm import LLM, FakeProvider, LLMProvider, ReplayProvider
+
+        class StrictModel:
+            """Validates contents like the real Gemini client before answering."""
+            def __init__(self, inner):
+                self.inner = inner
+                self.prompts = []
+
+            def _check(self, prompt):
+                if not isinstance(prompt, str):
+                    content_types.to_contents(prompt)
+                self.prompts.append(prompt)
+
+            def generate_content(self, prompt, stream=False, **kwargs):
+                self._check(prompt)
+                return self.inner.generate_content(prompt, stream=stream)
+
+            async def generate_content_async(self, prompt, **kwargs):
+                self._check(prompt)
+                return await self.inner.generate_content_async(prompt)
+
+        class StrictProvider(LLMProvider):
+            def __init__(self):
+                self.fake = FakeProvider(TestProviders.RULES)
+                self.models = []
+
+            def model(self, purpose="agent", tool_manager=None):
+                self.models.append(StrictModel(self.fake.model(purpose, tool_manager)))
+                return self.models[-1]
+
+        # Send even simple arithmetic to the model instead of the local router
+        monkeypatch.setenv("LOCAL_ROUTER", "false")
+        path = str(tmp_path / "recordings.json")
+        inner = StrictProvider()
+        llm = LLM(provider=ReplayProvider(path, inner=inner, mode="record"))
+        assert llm.answer("Calculate 10 + 5") == "15"
+        assert asyncio.run(llm.answer_async("Calculate 2 * 3")) == "6"
+        assert "".join(llm.answer_stream("Calculate 7 - 4")) == "3"
+        # Every question reached the second step with the tool results
+        assert len(inner.models[0].prompts) == 6
+
+        llm = LLM(provider=ReplayProvider(path))
+        assert llm.answer("Calculate 10 + 5") == "15"
+        assert "".join(llm.answer_stream("Calculate 7 - 4")) == "3"
+
+    def test_kb_fallback_uses_the_agent_provider(self, monkeypatch):
+        from agent.llm import LLM, FakeProvider
+
+        # Without the fix a KB miss would need (and call) the real Gemini API
+        monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+        provider = FakeProvider([
+            (r"knowledge base search assistant", "0"),
+            (r"eda loveless", [("kb", {"q": "Eda Loveless"})]),
+        ])
+        llm = LLM(provider=provider)
+        llm.agent.response_cache = None
+
+        assert "computing pioneer" in llm.answer("Who is Eda Loveless?")
+        # Agent step, KB disambiguation, then the follow-up with the tool result
+        assert provider.calls == 3
+        assert llm.agent.tool_manager.tools["kb"].load().kb_agent.model.provider is provider
+
+    def test_record_real_gemini_stream(self, tmp_path):
+        from google.generativeai import protos
+        from google.generativeai.types.generation_types import GenerateContentResponse
+        from agent.llm import LLMProvider, ReplayProvider
+
+        def chunks():
+            for word in ["Hello ", "world"]:
+                content = protos.Content(parts=[protos.Part(text=word)], role="model")
+                yield protos.GenerateContentResponse(candidates=[protos.Candidate(content=content)])
+
+        class StreamingModel:
+            def generate_content(self, prompt, stream=False, **kwargs):
+                return GenerateContentResponse.from_iterator(chunks())
+
+        class StreamingProvider(LLMProvider):
+            def model(self, purpose="agent", tool_manager=None):
+                return StreamingModel()
+
+        path = str(tmp_path / "recordings.json")
+        recorder = ReplayProvider(path, inner=StreamingProvider(), mode="record")
+        streamed = recorder.model().generate_content("hi", stream=True)
+        assert "".join(chunk.text for chunk in streamed) == "Hello world"
+
+        replayed = ReplayProvider(path).model().generate_content("hi")
+        assert replayed.text == "Hello world"
+
+    def test_get_provider(self):
+        from agent.llm import FakeProvider, LLMProvider, get_provider
+
+        assert isinstance(get_provider("fake"), FakeProvider)
+        with pytest.raises(TypeError):
+            LLMProvider()
+        with pytest.raises(ValueError, match="GEMINI_API_KEY"):
+            get_provider("gemini", None)
+        with pytest.raises(ValueError, match="Unsupported"):
+            get_provider("openai", "key")
+
+
+class TestAgentLoop:
+    """Test the multi-step tool loop in Agent.run."""
+
+    class SlowTool:
+        """Tool that sleeps `args['seconds']` and reports it."""
+        @staticmethod
+        def make(name="sleep"):
+            from dataclasses import replace
+            from agent.base_tool import BaseTool
+            from agent.schemas import TOOL_SCHEMAS, ToolParameter, ToolType
+
+            class Sleep(BaseTool):
+                def execute(self, args, question=""):
+                    time.sleep(args["seconds"])
+                    return f"slept {args['seconds']}"
+
+            schema = replace(TOOL_SCHEMAS[ToolType.CALC], name=name, parameters=[ToolParameter("seconds", "number", "How long")])
+            return Sleep(schema)
+
+    def test_results_are_fed_back_over_several_steps(self):
+        agent = Agent(api_key="test_key_123")
+        agent.model = ScriptedModel([
+            make_response(calls=[("calc", {"expr": "15 + 25"})]),
+            make_response(calls=[("calc", {"expr": "40 * 2"}), ("unit_converter", {"celsius": 80})]),
+            make_response(text="Doubled it's 80, and 80°C is 176°F."),
+        ])
+
+        run = agent.run("Double 15 + 25, then convert that many °C to °F")
+        assert run.answer == "Doubled it's 80, and 80°C is 176°F."
+        assert run.source == "model"
+        assert [step.calls for step in run.steps] == [["calc"], ["calc", "unit_converter"], []]
+        assert all(step.model_seconds >= 0 and step.tool_seconds >= 0 for step in run.steps)
+
+        # Step 3 saw both earlier turns and every function response
+        contents = agent.model.prompts[2]
+        assert [c["role"] if isinstance(c, dict) else "model" for c in contents] == ["user", "model", "user", "model", "user"]
+        assert [p.function_response.response["result"] for p in contents[-1]["parts"]] == ["80", "80.0°C = 176.0°F"]
+
+    def test_step_budget_falls_back_to_last_results(self):
+        agent = Agent(api_key="test_key_123", max_steps=2)
+        agent.model = ScriptedModel([make_response(calls=[("calc", {"expr": f"{i} + 1"})]) for i in range(5)])
+
+        run = agent.run("keep adding")
+        assert run.answer == "2"
+        assert len(run.steps) == 2 and len(agent.model.prompts) == 2
+
+    def test_fallback_answers_are_not_cached(self, tmp_path):
+        from agent.response_cache import ResponseCache
+
+        class FailingSecondStep(ScriptedModel):
+            def generate_content(self, prompt, **kwargs):
+                if len(self.prompts) % 2 == 1:
+                    self.prompts.append(prompt)
+                    raise RuntimeError("503 unavailable")
+                response = super().generate_content(prompt, **kwargs)
+                return [response] if kwargs.get("stream") else response
+
+        cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+        agent = Agent(api_key="test_key_123", response_cache=cache)
+        agent.router = None
+        agent.model = FailingSecondStep([make_response(calls=[("calc", {"expr": "15 + 25"})])] * 2)
+
+        assert agent.answer("add 15 and 25") == "40"
+        assert cache.get("add 15 and 25") is None
+        assert "".join(agent.answer_stream("add 15 and 25")) == "40"
+        assert cache.get("add 15 and 25") is None
+
+    def test_every_path_caches_the_final_step_text(self, tmp_path):
+        from agent.response_cache import ResponseCache
+
+        class PreambleModel(ScriptedModel):
+            """Text plus a call, then the final text; streamed calls get the same parts."""
+            def generate_content(self, prompt, **kwargs):
+                response = super().generate_content(prompt, **kwargs)
+                return [response] if kwargs.get("stream") else response
+
+        def script():
+            first = make_response(text="Let me check. ", calls=[("calc", {"expr": "15 + 25"})])
+            return [first, make_response(text="It is 40.")]
+
+        answers = {}
+        for path in ("run", "run_async", "stream"):
+            cache = ResponseCache(str(tmp_path / f"{path}.sqlite"))
+            agent = Agent(api_key="test_key_123", response_cache=cache)
+            agent.router = None
+            agent.model = PreambleModel(script())
+            if path == "run":
+                answers[path] = agent.answer("add 15 and 25")
+            elif path == "run_async":
+                answers[path] = asyncio.run(agent.answer_async("add 15 and 25"))
+            else:
+                # The preamble is still shown while streaming
+                answers[path] = "".join(agent.answer_stream("add 15 and 25"))
+                assert answers[path] == "Let me check. It is 40."
+            assert cache.get("add 15 and 25") == "It is 40."
+
+        assert answers["run"] == answers["run_async"] == "It is 40."
+
+    def test_deadline_cancels_outstanding_tools(self):
+        agent = Agent(api_key="test_key_123", deadline=0.3)
+        agent.tool_manager.register_tool(self.SlowTool.make())
+        agent.model = ScriptedModel([make_response(calls=[("sleep", {"seconds": 0.05}), ("sleep", {"seconds": 1})])] * 2)
+
+        start = time.perf_counter()
+        answer = agent.answer("sleep twice")
+        assert time.perf_counter() - start < 0.8
+        assert answer.splitlines()[0] == "slept 0.05"
+        assert "timed out" in answer.splitlines()[1]
+
+        async def timed():
+            # Timed inside the loop: asyncio.run itself waits for the abandoned worker thread
+            start = time.perf_counter()
+            answer = await agent.answer_async("sleep twice")
+            return answer, time.perf_counter() - start
+
+        answer, elapsed = asyncio.run(timed())
+        assert elapsed < 0.8
+        assert "timed out" in answer.splitlines()[1]
+
+    def test_interactive_agent_loops_too(self):
+        from agent.interactive_agent import InteractiveAgent
+        from agent.llm import FakeProvider
+
+        class TwoStepProvider(FakeProvider):
+            def respond(self, message):
+                reply = super().respond(message)
+                # Ask for the second calculation once the first result comes back
+                if reply["text"] == "40":
+                    return {"text": None, "calls": [["calc", {"expr": "40 * 2"}]]}
+                return reply
+
+        agent = InteractiveAgent(None, provider=TwoStepProvider([(r"double", [("calc", {"expr": "15 + 25"})])]))
+        assert agent.ask("double 15 + 25") == "80"
+        assert agent.memory.turns[0].tools == ["calc(expr=15 + 25) -> 40", "calc(expr=40 * 2) -> 80"]
+
+
+class TestMetrics:
+    """Test latency histograms, counters and their exports."""
+
+    @staticmethod
+    def _enable(monkeypatch):
+        from agent import metrics as metrics_module
+        metrics = metrics_module.Metrics(enabled=True)
+        monkeypatch.setattr(metrics_module, "_shared_metrics", metrics)
+        return metrics
+
+    def test_histogram_percentiles_are_within_bucket_error(self):
+        from agent.metrics import Histogram
+
+        histogram = Histogram()
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+        assert histogram.count == 1000
+        for p in (50, 90, 99):
+            assert abs(histogram.percentile(p) - p / 100) / (p / 100) < 0.07
+        assert histogram.cumulative([0.1, 10.0])[-1] == (10.0, 1000)
+
+    def test_disabled_metrics_record_nothing(self):
+        from agent.metrics import _NULL_TIMER, Metrics
+
+        metrics = Metrics(enabled=False)
+        assert metrics.timer("x") is _NULL_TIMER
+        metrics.inc("calls_total")
+        metrics.observe("x", 1.0)
+        assert metrics.snapshot() == {"histograms": [], "counters": []}
+
+    def test_agent_records_stages_outcomes_and_tokens(self, monkeypatch):
+        metrics = self._enable(monkeypatch)
+        agent = Agent(api_key="test_key_123")
+        first = make_response(calls=[("calc", {"expr": "2 + 2"}), ("calc", {"expr": "2 +"})])
+        first.usage_metadata = SimpleNamespace(prompt_token_count=12, candidates_token_count=3)
+        agent.model = ScriptedModel([first, make_response(text="4")])
+
+        assert agent.answer("what is 2 + 2 and 2 +") == "4"
+        snapshot = metrics.snapshot()
+        histograms = {(h["name"], tuple(sorted(h["labels"].items()))): h for h in snapshot["histograms"]}
+        counters = {(c["name"], tuple(sorted(c["labels"].items()))): c["value"] for c in snapshot["counters"]}
+        assert histograms[("llm_request_seconds", (("purpose", "agent"),))]["count"] == 2
+        assert histograms[("tool_validate_seconds", (("tool", "calc"),))]["count"] == 2
+        assert histograms[("agent_answer_seconds", (("source", "model"),))]["count"] == 1
+        assert counters[("tool_calls_total", (("outcome", "success"), ("tool", "calc")))] == 1
+        assert counters[("tool_calls_total", (("outcome", "error"), ("tool", "calc")))] == 1
+        assert counters[("llm_tokens_total", (("direction", "input"), ("purpose", "agent")))] == 12
+        assert counters[("llm_tokens_total", (("direction", "output"), ("purpose", "agent")))] == 3
+
+    def test_server_exposes_prometheus_text(self, monkeypatch):
+        from agent.llm import FakeProvider
+        from agent.server import ChatServer, agent_factory
+
+        self._enable(monkeypatch)
+        server = ChatServer(agent_factory(FakeProvider()))
+
+        async def scenario():
+            _, port = await server.start(port=0)
+            await TestChatServer()._post(port, {"session": "s1", "message": "hi"})
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /metrics HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+            raw = await reader.read()
+            writer.close()
+            await server.stop()
+            return raw.decode()
+
+        head, _, body = asyncio.run(scenario()).partition("\r\n\r\n")
+        assert "Content-Type: text/plain" in head
+        assert "# TYPE llm_request_seconds histogram" in body
+        assert 'llm_request_seconds_bucket{purpose="chat",le="+Inf"} 1' in body
+        assert 'server_request_seconds_count{endpoint="/chat",status="200"} 1' in body
+
+    def test_structured_log_lines(self):
+        import logging
+        from agent.log import JSONFormatter, KeyValueFormatter, log_event
+
+        records = []
+        logger = logging.getLogger("agent.test_log")
+        logger.setLevel(logging.DEBUG)
+        handler = logging.Handler()
+        handler.emit = records.append
+        logger.addHandler(handler)
+        try:
+            log_event(logger, logging.DEBUG, "tool_call", tool="calc", args={"expr": "1 + 1"})
+        finally:
+            logger.removeHandler(handler)
+
+        assert KeyValueFormatter().format(records[0]).endswith("tool_call tool=calc args={'expr': '1 + 1'}")
+        payload = json.loads(JSONFormatter().format(records[0]))
+        assert payload["event"] == "tool_call" and payload["args"] == {"expr": "1 + 1"}
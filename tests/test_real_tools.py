@@ -69,4 +69,509 @@ class TestKnowledgeBaseReal:
             data = json.load(f)
         
         assert "entries" in data
-        assert isinstance(data["entries"], list)
\ No newline at end of file
+        assert isinstance(data["entries"], list)
+
+class TestKBIndex:
+    """Test the in-memory KB index against temporary KB files."""
+
+    def _write_kb(self, path, names):
+        entries = [{"name": name, "summary": f"{name} summary"} for name in names]
+        path.write_text(json.dumps({"entries": entries}))
+
+    def test_lookup_normalizes_question(self, tmp_path):
+        from agent.tools.kb.index import KBIndex
+
+        kb_file = tmp_path / "kb.json"
+        self._write_kb(kb_file, ["Ada Lovelace", "Alan Turing"])
+        index = KBIndex(str(kb_file))
+
+        assert index.lookup("Who is Ada Lovelace?")["name"] == "Ada Lovelace"
+        assert index.lookup("turing")["name"] == "Alan Turing"
+        assert index.lookup("ada lov")["name"] == "Ada Lovelace"
+        # Mid-word substrings still match, by scanning the names after the postings miss
+        assert index.lookup("velace")["name"] == "Ada Lovelace"
+        assert index.lookup("a lovel")["name"] == "Ada Lovelace"
+        assert index.lookup("Grace Hopper") is None
+        assert index.lookup("") is None
+
+    def test_reloads_when_file_changes(self, tmp_path):
+        from agent.tools.kb.index import KBIndex
+
+        kb_file = tmp_path / "kb.json"
+        self._write_kb(kb_file, ["Ada Lovelace"])
+        index = KBIndex(str(kb_file))
+        assert index.lookup("Grace Hopper") is None
+        old = index.snapshot
+
+        self._write_kb(kb_file, ["Ada Lovelace", "Grace Hopper"])
+        stat = os.stat(kb_file)
+        os.utime(kb_file, (stat.st_atime, stat.st_mtime + 10))
+
+        assert len(index) == 2
+        assert index.lookup("Grace Hopper")["summary"] == "Grace Hopper summary"
+        # A reload publishes a new snapshot; readers holding the old one keep a consistent view
+        assert index.version == old.version + 1
+        assert len(old.entries) == 1 and "grace" not in old.postings
+
+
+class TestKBRetriever:
+    """Test local KB candidate retrieval and the KB agent shortlist."""
+
+    def _make_index(self, tmp_path):
+        from agent.tools.kb.index import KBIndex
+
+        entries = [
+            {"name": "Ada Lovelace", "summary": "Mathematician and early computing pioneer."},
+            {"name": "Alan Turing", "summary": "Father of theoretical computer science."},
+            {"name": "Saymon Rahman", "summary": "Software engineer who wrote this agent."},
+        ]
+        kb_file = tmp_path / "kb.json"
+        kb_file.write_text(json.dumps({"entries": entries}))
+        return KBIndex(str(kb_file))
+
+    def test_fuzzy_name_match(self, tmp_path):
+        from agent.tools.kb.retrieval import KBRetriever
+
+        retriever = KBRetriever(self._make_index(tmp_path))
+
+        assert retriever.search("Who is Simon Rahman?")[0].name == "Saymon Rahman"
+        assert retriever.search("Tell me about Eda Loveless")[0].name == "Ada Lovelace"
+        assert retriever.search("computer science father")[0].name == "Alan Turing"
+        assert retriever.search("who is") == []
+
+    def test_agent_sends_only_shortlist(self, tmp_path):
+        from agent.tools.kb.kb_agent import KBAgent
+        from agent.tools.kb.retrieval import KBRetriever
+
+        prompts = []
+
+        class RecordingModel:
+            def generate_content(self, prompt):
+                prompts.append(prompt)
+                return type("Response", (), {"text": "0"})()
+
+        agent = KBAgent("test_key_123", top_k=2)
+        agent.index = self._make_index(tmp_path)
+        agent.retriever = KBRetriever(agent.index)
+        agent.model = RecordingModel()
+
+        # Exact name: answered locally without a model call
+        assert "computing pioneer" in agent.search("Tell me about Ada Lovelace")
+        assert prompts == []
+
+        # Fuzzy name: the model only sees the shortlisted candidates
+        assert "Software engineer" in agent.search("Who is Simon?")
+        assert len(prompts) == 1
+        assert "Saymon Rahman" in prompts[0]
+        assert "Alan Turing" not in prompts[0]
+
+
+class TestKBVectorStore:
+    """Test semantic KB search over precomputed, memory-mapped vectors."""
+
+    def test_paraphrased_question(self, tmp_path):
+        pytest.importorskip("numpy")
+        from agent.tools.kb.vectors import KBVectorStore, build_vectors
+
+        kb_file = tmp_path / "kb.json"
+        kb_file.write_text(json.dumps({"entries": [
+            {"name": "Ada Lovelace", "summary": "Mathematician known for work on the Analytical Engine."},
+            {"name": "Alan Turing", "summary": "Father of theoretical computer science and artificial intelligence."},
+        ]}))
+        store = KBVectorStore(str(kb_file))
+
+        # No vectors built yet: semantic search stays out of the way
+        assert store.search("father of artificial intelligence") == []
+
+        build_vectors(str(kb_file))
+        assert store.lookup("Who was the father of artificial intelligence?")["name"] == "Alan Turing"
+        assert store.lookup("who worked on the analytical engine")["name"] == "Ada Lovelace"
+        assert store.lookup("what is the weather like") is None
+
+    def test_lookup_reads_one_snapshot(self, tmp_path):
+        pytest.importorskip("numpy")
+        from agent.tools.kb.vectors import KBVectorStore, build_vectors
+
+        kb_file = tmp_path / "kb.json"
+        kb_file.write_text(json.dumps({"entries": [
+            {"name": "Ada Lovelace", "summary": "Mathematician known for work on the Analytical Engine."},
+            {"name": "Alan Turing", "summary": "Father of theoretical computer science and artificial intelligence."},
+        ]}))
+        build_vectors(str(kb_file))
+        store = KBVectorStore(str(kb_file))
+        store.index.refresh()
+        old = store.index.snapshot
+
+        class ReloadingIndex:
+            """Publishes a reordered KB right after the store takes its snapshot."""
+            def __init__(self, index):
+                self.index = index
+                self.reads = 0
+
+            def refresh(self):
+                pass
+
+            @property
+            def snapshot(self):
+                self.reads += 1
+                return old if self.reads == 1 else old._replace(entries=old.entries[::-1])
+
+            @property
+            def entries(self):
+                return self.snapshot.entries
+
+            @property
+            def mtime(self):
+                return self.snapshot.mtime
+
+        store.index = ReloadingIndex(store.index)
+        assert store.lookup("Who was the father of artificial intelligence?")["name"] == "Alan Turing"
+
+
+class TestWeatherCache:
+    """Test the weather response cache against a local stub server."""
+
+    def test_repeated_cities_hit_cache(self, weather_stub_server):
+        from agent.tools.weather.tool import WeatherTool
+
+        weather = WeatherTool()
+        assert "18.5°C" in weather.execute({"city": "Paris"})
+        assert "light rain" in weather.execute({"city": "  paris "})
+        weather.execute({"city": "London"})
+
+        assert len(weather_stub_server["requests"]) == 2
+        stats = weather.cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+
+    def test_concurrent_misses_are_coalesced(self, weather_stub_server):
+        from concurrent.futures import ThreadPoolExecutor
+        from agent.tools.weather.tool import WeatherTool
+
+        weather_stub_server["delay"] = 0.2
+        weather = WeatherTool()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: weather.get_weather("Dhaka"), range(8)))
+
+        assert all(r["temp"] == 18.5 for r in results)
+        assert len(weather_stub_server["requests"]) == 1
+        assert weather.cache_stats()["coalesced"] == 7
+
+    def test_lru_eviction_and_ttl(self):
+        from agent.cache import TTLCache
+
+        now = [0.0]
+        cache = TTLCache(max_size=2, ttl=10, clock=lambda: now[0])
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+        cache.set("c", 3)  # evicts "b", the least recently used
+        assert cache.get("b") is None
+        assert cache.stats()["evictions"] == 1
+
+        now[0] = 11.0
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+
+
+class TestHTTPClient:
+    """Test the shared pooled HTTP client used by network tools."""
+
+    def test_retries_transient_errors_and_escapes_city(self, weather_stub_server):
+        from agent.http_client import HTTPClient
+        from agent.tools.weather.tool import WeatherTool
+
+        weather_stub_server["failures"] = [503, 429]
+        weather = WeatherTool()
+        weather.http = HTTPClient(backoff=0)
+
+        assert "18.5°C" in weather.execute({"city": "São Paulo&units=imperial"})
+        assert len(weather_stub_server["requests"]) == 3
+        assert weather_stub_server["requests"][-1]["q"] == ["são paulo&units=imperial"]
+        assert weather_stub_server["requests"][-1]["units"] == ["metric"]
+
+    def test_connections_are_reused(self, weather_stub_server):
+        from agent.http_client import HTTPClient
+        from agent.tools.weather.tool import WeatherTool
+
+        weather = WeatherTool()
+        weather.http = HTTPClient()
+        for city in ["Paris", "London", "Dhaka"]:
+            weather.execute({"city": city})
+
+        assert len(set(weather_stub_server["ports"])) == 1
+
+
+class TestWeatherPhrasing:
+    """Test that weather answers need no extra model call unless opted in."""
+
+    def test_template_phrasing_by_default(self, weather_stub_server):
+        from agent.tools.weather.tool import WeatherTool
+
+        weather = WeatherTool()
+        assert not weather.llm_phrasing
+
+        answer = weather.execute({"city": "paris"}, question="How warm is Paris?")
+        assert answer == "The temperature in Paris is 18.5°C with light rain."
+        assert weather._phrasing_model is None
+
+    def test_llm_phrasing_reuses_model(self, weather_stub_server, monkeypatch):
+        from agent.tools.weather.tool import WeatherTool
+
+        monkeypatch.setenv("WEATHER_LLM_PHRASING", "true")
+        weather = WeatherTool()
+        prompts = []
+
+        class RecordingModel:
+            def generate_content(self, prompt):
+                prompts.append(prompt)
+                return type("Response", (), {"text": "Mild and rainy."})()
+
+        weather._phrasing_model = RecordingModel()
+        assert weather.execute({"city": "Paris"}, question="Umbrella?") == "Mild and rainy."
+        assert weather.execute({"city": "London"}, question="Umbrella?") == "Mild and rainy."
+        assert len(prompts) == 2
+        # No question: template only
+        assert "18.5°C" in weather.execute({"city": "Paris"})
+        assert len(prompts) == 2
+
+
+class TestCalculatorEvaluator:
+    """Test the compiled, non-recursive calculator evaluator."""
+
+    def test_functions_comparisons_and_variables(self):
+        calc = CalculatorTool()
+
+        assert calc.execute({"expr": "sqrt(16) + max(1, 2, 3)"}) == "7.0"
+        assert calc.execute({"expr": "What is 12.5% of 243?"}) == "30.375"
+        assert calc.execute({"expr": "1 < 2 <= 2"}) == "True"
+        assert calc.evaluate("price * (1 + rate)", {"price": 200, "rate": 0.5}) == 300.0
+        assert calc.evaluate("round(pi, 2)") == 3.14
+
+        with pytest.raises(ValueError, match="Unknown variable"):
+            calc.evaluate("x + 1")
+        with pytest.raises(ValueError, match="Unsupported expression"):
+            calc.evaluate("__import__('os')")
+
+    def test_huge_exponent_is_refused(self):
+        import time
+        calc = CalculatorTool()
+
+        start = time.perf_counter()
+        result = calc.validate_and_execute({"expr": "9**9**9"})
+        assert not result.success
+        assert result.error == "Exponent too large"
+        assert time.perf_counter() - start < 1.0
+
+    def test_repeated_expressions_hit_cache(self):
+        from agent.tools.calculator.tool import compile_expression
+
+        calc = CalculatorTool()
+        calc.execute({"expr": "17 * 23 + 4"})
+        hits = compile_expression.cache_info().hits
+        calc.execute({"expr": "17 * 23 + 4"})
+        assert compile_expression.cache_info().hits == hits + 1
+
+    def test_deeply_nested_expression(self):
+        calc = CalculatorTool()
+        assert calc.execute({"expr": "+".join(["1"] * 5000)}) == "5000"
+
+    def test_batch_over_arrays(self):
+        np = pytest.importorskip("numpy")
+        calc = CalculatorTool()
+
+        totals = np.arange(1, 50_001, dtype=np.float64)
+        results = calc.evaluate_batch("12.5% of x", {"x": totals})
+        assert results.shape == (50_000,)
+        assert results[7] == pytest.approx(1.0)
+
+        results = calc.evaluate_batch("max(x, y) * (x < 3)", {"x": [1, 2, 3], "y": [2, 1, 0]})
+        assert results.tolist() == [2.0, 2.0, 0.0]
+
+        results = calc.evaluate_batch("2**-1 * x", {"x": [1, 2]})
+        assert results.tolist() == [0.5, 1.0]
+
+    def test_batch_through_schema(self):
+        calc = CalculatorTool()
+
+        result = calc.validate_and_execute({"expr": "x * 1.1", "values": [100, 200]})
+        assert result.success
+        assert result.data == pytest.approx([110.0, 220.0])
+
+        result = calc.validate_and_execute({"expr": "2**-1 * x", "values": [1, 2]})
+        assert result.success
+        assert result.data == pytest.approx([0.5, 1.0])
+
+        result = calc.validate_and_execute({"expr": "x * 1.1", "values": ["a"]})
+        assert result.error == "Parameter values must be an array of numbers"
+
+
+class TestTextAnalyzerStreaming:
+    """Test the single-pass, chunked text analyzer."""
+
+    def test_chunking_does_not_change_counts(self):
+        analyzer = TextAnalyzerTool()
+        text = "Good  morning. I dislike rain...\nBut I love the   sun.  Done"
+        expected = analyzer.analyze(text, "sentiment")
+        assert expected["word_count"] == len(text.split())
+        assert expected["sentence_count"] == len([s for s in text.split(".") if s.strip()])
+        assert expected["character_count_no_spaces"] == len(text.replace(" ", ""))
+
+        for size in (1, 2, 3, 7):
+            chunks = (text[i:i + size] for i in range(0, len(text), size))
+            assert analyzer.analyze(chunks, "sentiment") == expected
+
+    def test_sentiment_matches_whole_words_with_weights(self):
+        analyzer = TextAnalyzerTool()
+
+        result = analyzer.execute({"text": "I dislike it.", "analysis_type": "sentiment"})
+        assert (result["positive_words_found"], result["negative_words_found"]) == (0, 1)
+        assert result["sentiment"] == "negative"
+
+        # One strong negative outweighs one mild positive
+        result = analyzer.execute({"text": "Good food, but I hate the noise!", "analysis_type": "sentiment"})
+        assert result["sentiment_score"] == -1.0
+        assert result["sentiment"] == "negative"
+
+    def test_long_tokens_are_counted_without_carrying_them(self):
+        from agent.tools.text_analyzer.stats import MAX_CARRY, TextStats
+
+        token = "x" * MAX_CARRY + "love.hate'" + "y" * MAX_CARRY + "'s.good"
+        text = f"I {token} it. {'z' * 3 * MAX_CARRY}"
+        expected = TextStats(sentiment=True)
+        expected.feed(text)
+        expected = expected.close().result("sentiment")
+        assert (expected["word_count"], expected["sentence_count"]) == (4, 4)
+        assert (expected["positive_words_found"], expected["negative_words_found"]) == (1, 0)
+
+        stats = TextStats(sentiment=True)
+        for i in range(0, len(text), 100):
+            stats.feed(text[i:i + 100])
+            assert len(stats._carry) <= MAX_CARRY + 100
+        assert stats.close().result("sentiment") == expected
+
+    def test_analyze_file(self, tmp_path):
+        analyzer = TextAnalyzerTool()
+        text = "The quick brown fox jumps over the lazy dog. " * 1000
+        path = tmp_path / "doc.txt"
+        path.write_text(text)
+
+        result = analyzer.analyze_file(str(path), chunk_size=100)
+        assert result == analyzer.execute({"text": text})
+        assert (result["word_count"], result["sentence_count"]) == (9000, 1000)
+
+
+class TestTextAnalyzerCorpus:
+    """Test the multi-process corpus mode of the text analyzer."""
+
+    def test_parallel_matches_serial_and_keeps_order(self, tmp_path):
+        analyzer = TextAnalyzerTool()
+        texts = ["I love it. Great work.", "I hate this. Bad day. Sad.", "plain words only", "Good. " * 500]
+        paths = []
+        for i, text in enumerate(texts):
+            path = tmp_path / f"doc{i}.txt"
+            path.write_text(text)
+            paths.append(str(path))
+        paths.insert(2, str(tmp_path / "missing.txt"))
+
+        serial = analyzer.analyze_corpus(paths, "sentiment", workers=1)
+        parallel = analyzer.analyze_corpus(paths, "sentiment", workers=2)
+        assert parallel == serial
+
+        documents = parallel["documents"]
+        assert [doc["path"] for doc in documents] == paths
+        assert "error" in documents[2]
+        assert documents[0] == {"path": paths[0], **analyzer.analyze(texts[0], "sentiment")}
+
+        aggregate = parallel["aggregate"]
+        assert (aggregate["documents"], aggregate["errors"]) == (4, 1)
+        assert aggregate["word_count"] == sum(len(text.split()) for text in texts)
+        assert aggregate["positive_words_found"] == 2 + 500
+
+    def test_shards_balance_file_sizes(self, tmp_path):
+        from agent.tools.text_analyzer.corpus import make_shards
+
+        paths = []
+        for i, size in enumerate([900, 500, 400, 300, 200, 100]):
+            path = tmp_path / f"doc{i}.txt"
+            path.write_text("x" * size)
+            paths.append(str(path))
+
+        shards = make_shards(paths, 2)
+        loads = sorted(sum(len(open(path).read()) for _, path in shard) for shard in shards)
+        assert loads == [1200, 1200]
+        assert sorted(i for shard in shards for i, _ in shard) == list(range(6))
+
+
+class TestUnitConverter:
+    """Test the unit registry and the general unit converter."""
+
+    def test_converts_across_dimensions(self):
+        from agent.tools.unit_converter.units import get_unit_registry
+
+        registry = get_unit_registry()
+        assert registry.convert(100, "km/h", "m/s") == pytest.approx(27.7777777778)
+        assert registry.convert(1, "mile", "km") == pytest.approx(1.609344)
+        assert registry.convert(1, "lb", "g") == pytest.approx(453.59237)
+        assert registry.convert(1, "gal", "L") == pytest.approx(3.785411784)
+        assert registry.convert(2, "h", "min") == pytest.approx(120)
+        assert registry.convert(1, "GiB", "MB") == pytest.approx(1073.741824)
+        assert registry.convert(100, "Mbps", "MB/s") == pytest.approx(12.5)
+        assert registry.convert(98.6, "fahrenheit", "K") == pytest.approx(310.15)
+        assert registry.convert(-40, "degrees celsius", "°F") == pytest.approx(-40)
+        assert registry.convert(9.81, "m/s^2", "ft/s²") == pytest.approx(32.1850394)
+        # Lowercase lookups prefer bytes over bits, and say when that was a guess
+        assert registry.convert(1, "mb", "kb") == pytest.approx(1000)
+        assert registry.is_ambiguous("mb") and registry.is_ambiguous("kb/s")
+        assert not registry.is_ambiguous("MB") and not registry.is_ambiguous("Mbit")
+
+        # Simple units convert through one precompiled pair
+        assert ("mi", "km") in registry.pairs
+        for bad in [("kg", "m"), ("°C/s", "K/s"), ("furlong", "m")]:
+            with pytest.raises(ValueError):
+                registry.convert(1, *bad)
+
+    def test_tool_single_batch_and_errors(self):
+        converter = UnitConverterTool()
+        assert converter.execute({"value": 100, "from_unit": "km/h", "to_unit": "m/s"}) == \
+            "100.0 km/h = 27.7777777778 m/s"
+        assert converter.execute({"value": 0, "from_unit": "C", "to_unit": "°F"}) == "0.0 C = 32.0°F"
+
+        values = [0, 10.5, 100]
+        batch = converter.execute({"values": values, "from_unit": "°C", "to_unit": "°F"})
+        assert batch == pytest.approx([32.0, 50.9, 212.0])
+
+        result = converter.validate_and_execute({"value": 1, "from_unit": "kg", "to_unit": "m"})
+        assert not result.success and "mass" in result.error
+        assert not converter.validate_and_execute({"value": 1}).success
+
+
+class TestLazyToolRegistry:
+    """Test that tool modules are only imported when a tool first runs."""
+
+    def test_tools_load_on_first_use(self):
+        import subprocess
+        import sys
+
+        code = (
+            "import sys\n"
+            "from agent.tool_manager import ToolManager\n"
+            "tm = ToolManager()\n"
+            "assert set(tm.list_tools()) == {'calc', 'kb', 'text_analyzer', 'unit_converter', 'weather'}\n"
+            "assert not any(m.endswith('.tool') for m in sys.modules if m.startswith('agent.tools.'))\n"
+            "assert 'google.generativeai' not in sys.modules and 'requests' not in sys.modules\n"
+            "assert tm.execute_tool('calc', {'expr': '2 + 3'}).data == '5'\n"
+            "assert 'agent.tools.calculator.tool' in sys.modules\n"
+            "assert 'agent.tools.weather.tool' not in sys.modules\n"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+
+    def test_lazy_tool_delegates_to_real_tool(self, weather_stub_server):
+        from agent.tool_manager import ToolManager
+
+        tm = ToolManager()
+        assert tm.execute_tool("weather", {"city": "Paris"}).success
+        assert tm.get_tool("weather").cache_stats()["misses"] == 1
+        assert tm.execute_tool("calc", {}).error == "Missing required parameter: expr"